@@ -1,64 +1,105 @@
-from flask import Flask, jsonify, render_template
-from pymongo import MongoClient
+import click
+from flask import Flask, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
 from bson import ObjectId
 from datetime import datetime
-import json
-
-app = Flask(__name__)
-
-# MongoDB Connection
-client = MongoClient("mongodb://localhost:27017/")
-db = client["flight_tracking"]
+from config import Config
 
 # Helper to make ObjectId JSON serializable
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
+class JSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
         if isinstance(o, ObjectId):
             return str(o)
         if isinstance(o, datetime):
             return o.isoformat()
-        return json.JSONEncoder.default(self, o)
+        return DefaultJSONProvider.default(o)
 
-app.json_encoder = JSONEncoder
 
+def create_app():
+    """Build the Flask app and register the API blueprints"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.json = JSONProvider(app)
 
-# ---- ROUTE: GET ALL FLIGHTS ----
-@app.route("/api/flights", methods=["GET"])
-def get_all_flights():
-    """Returns all flights stored in the database"""
-    flights = list(db.flights.find())
+    from routes.flight_routes import flight_bp
+    from routes.tracking_routes import tracking_bp
+    from routes.analytics_routes import analytics_bp
+    from routes.alert_routes import alert_bp
+    from routes.live_routes import live_bp
+    from routes.geofence_routes import geofence_bp
+    from routes.receiver_routes import receiver_bp
+    from routes.feed_routes import feed_bp
+    app.register_blueprint(flight_bp)
+    app.register_blueprint(tracking_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(alert_bp)
+    app.register_blueprint(live_bp)
+    app.register_blueprint(geofence_bp)
+    app.register_blueprint(receiver_bp)
+    app.register_blueprint(feed_bp)
     
-    if not flights:
-        return jsonify({"error": "No flights found"}), 404
-
-    for flight in flights:
-        flight["_id"] = str(flight["_id"])
+    if Config.METRICS_ENABLED:
+        from utils import metrics
+        from routes.metrics_routes import metrics_bp
+        metrics.init_app(app)
+        app.register_blueprint(metrics_bp)
+    
+    from utils import profiling
+    from routes.profiling_routes import profiling_bp
+    from routes.cache_routes import cache_bp
+    profiling.init_app(app)
+    app.register_blueprint(profiling_bp)
+    app.register_blueprint(cache_bp)
 
-    return jsonify({"flights": flights}), 200
+    # ---- ROUTE: SHOW FLIGHT MAP PAGE ----
+    @app.route("/flight_map")
+    def show_flight_map():
+        """Displays the frontend map for tracking flights"""
+        return redirect(url_for("flights.flight_map"))
 
+    # ---- COMMAND: REBUILD ANALYTICS ROLLUPS ----
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups():
+        """Recompute the airline/route/hourly rollups from flight_logs (backfill)"""
+        from services.analytics_service import AnalyticsService
+        counts = AnalyticsService().rebuild_rollups()
+        for collection, count in counts.items():
+            print(f"{collection}: {count} documents")
 
-# ---- ROUTE: GET FLIGHT HISTORY ----
-@app.route("/api/flights/<flight_id>/history", methods=["GET"])
-def get_flight_history(flight_id):
-    """Returns all tracking updates for a specific flight"""
-    records = list(db.tracking_updates.find({"flight_id": flight_id}))
-    
-    if not records:
-        return jsonify({"error": "Flight history not found"}), 404
-    
-    for record in records:
-        record["_id"] = str(record["_id"])
-        record["created_at"] = record["created_at"].isoformat()
+    # ---- COMMAND: INVALIDATE CACHED FLIGHT LOGS ----
+    @app.cli.command("invalidate-flight-log-cache")
+    def invalidate_flight_log_cache():
+        """Run after rewriting flight_logs: every server process drops its cached logs"""
+        from models.storage import get_storage
+        generation = get_storage().bump_archive_generation()
+        print(f"archive generation: {generation} (caches refresh within "
+              f"{Config.FLIGHT_LOG_CACHE_GENERATION_CHECK:g}s)")
 
-    return jsonify({"history": records}), 200
+    # ---- COMMAND: REBUILD THE SHARED LIVE STATE ----
+    @app.cli.command("rebuild-live-state")
+    def rebuild_live_state():
+        """Reload the LIVE_STATE_PATH table from the flights in storage"""
+        from models.live_state import live_state
+        table = live_state()
+        if table is None:
+            print("LIVE_STATE_PATH is not set")
+            return
+        print(f"{table.rebuild()} flights loaded into {table.path}")
 
+    # ---- COMMAND: SIGN A REQUEST FOR PROFILING ----
+    @app.cli.command("sign-request")
+    @click.argument("method")
+    @click.argument("path")
+    @click.option("--admin", is_flag=True, help="Sign an /admin/cache call (X-Admin-Signature)")
+    def sign_request(method, path, admin):
+        """Print the X-Profile-Signature header value for METHOD PATH (with its query string);
+        it is valid for PROFILING_SIGNATURE_MAX_AGE seconds"""
+        from utils.profiling import sign_request
+        print(sign_request(method, path, scope='admin' if admin else 'profile'))
 
-# ---- ROUTE: SHOW FLIGHT MAP PAGE ----
-@app.route("/flight_map")
-def show_flight_map():
-    """Displays the frontend map for tracking flights"""
-    return render_template("flight_map.html")
+    return app
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
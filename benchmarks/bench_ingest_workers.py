@@ -0,0 +1,98 @@
+"""Ingest throughput of the flight-affinity worker pool against in-process ingestion.
+
+Each worker applies its share of the updates to its own in-memory store, so the run measures how
+ingestion scales with processes (use a machine with at least as many cores as the largest count):
+
+    python -m benchmarks.bench_ingest_workers --aircraft 500 --workers 1,2,4,8 --output ingest.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+from benchmarks.run_benchmark import _git_commit
+from benchmarks.traffic import build_fleet, generate_updates
+
+def run_inline(updates: list) -> dict:
+    """Apply the updates in this process (INGEST_WORKERS=0)"""
+    from models.memory_storage import MemoryStorage
+    from services.tracking_service import TrackingService
+    service = TrackingService(MemoryStorage())
+    started = time.perf_counter()
+    for data in updates:
+        service.process_tracking_update(data)
+    elapsed = time.perf_counter() - started
+    return {'updates_per_s': round(len(updates) / elapsed), 'elapsed_s': round(elapsed, 3)}
+
+def run_pool(updates: list, workers: int, batch: int) -> dict:
+    """Submit the updates to `workers` processes in chunks of `batch` and wait for all of them"""
+    from services.ingest_workers import IngestPool
+    from services.tracking_service import TrackingService
+    from models.memory_storage import MemoryStorage
+    publisher = TrackingService(MemoryStorage())
+    pool = IngestPool(workers, publish=publisher.publish_tracking_update,
+                      storage_backend='memory', allow_private_storage=True)
+    pool.start()
+    pool.submit_many(updates[:1])  # wait for the workers to come up before timing
+    pool.drain()
+
+    started = time.perf_counter()
+    for i in range(1, len(updates), batch):
+        pool.submit_many(updates[i:i + batch])
+    pool.drain()
+    elapsed = time.perf_counter() - started
+    pool.close()
+    return {'updates_per_s': round((len(updates) - 1) / elapsed), 'elapsed_s': round(elapsed, 3),
+            **pool.stats()}
+
+def run(args) -> dict:
+    start = datetime(2024, 1, 15, 10, 0)
+    fleet = build_fleet(args.aircraft, start, seed=args.seed)
+    updates = list(generate_updates(fleet, start, args.duration, args.interval,
+                                    overlap=args.overlap, seed=args.seed))
+
+    results = {'inline': run_inline(updates)}
+    for workers in args.workers:
+        stats = run_pool(updates, workers, args.batch)
+        stats['speedup'] = round(stats['updates_per_s'] / results['inline']['updates_per_s'], 2)
+        results[f'workers_{workers}'] = stats
+
+    return {
+        'benchmark': 'ingest_workers',
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {
+            'aircraft': args.aircraft,
+            'updates': len(updates),
+            'overlap': args.overlap,
+            'batch': args.batch,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aircraft', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=300, help='simulated seconds of traffic')
+    parser.add_argument('--interval', type=float, default=5)
+    parser.add_argument('--overlap', type=int, default=2)
+    parser.add_argument('--workers', type=lambda v: [int(w) for w in v.split(',')], default=[1, 2, 4])
+    parser.add_argument('--batch', type=int, default=200, help='updates per submit_many call')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    body = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(body)
+    else:
+        print(body)
+
+if __name__ == '__main__':
+    main()
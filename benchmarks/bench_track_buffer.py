@@ -0,0 +1,98 @@
+"""Memory per point and throughput of TrackBuffer against the list-of-dicts it replaces.
+
+    python -m benchmarks.bench_track_buffer --points 100000 --output track_buffer.json
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.run_benchmark import _git_commit
+from benchmarks.traffic import build_fleet
+from models.track_buffer import TrackBuffer
+
+def make_points(count: int) -> list:
+    start = datetime(2024, 1, 15, 10, 0)
+    plane = build_fleet(1, start)[0]
+    return [(plane.position_at(start + timedelta(seconds=i)), start + timedelta(seconds=i))
+            for i in range(count)]
+
+def build_dicts(points: list) -> list:
+    return [{**position, 'timestamp': timestamp} for position, timestamp in points]
+
+def build_buffer(points: list) -> TrackBuffer:
+    buffer = TrackBuffer()
+    for position, timestamp in points:
+        buffer.append(position, timestamp)
+    return buffer
+
+def measure_memory(build, points: list) -> float:
+    """Bytes allocated per point by `build(points)`"""
+    tracemalloc.start()
+    result = build(points)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / len(points)
+
+def timed(func, repeat: int = 5) -> float:
+    """Best wall time of `repeat` runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run(count: int) -> dict:
+    points = make_points(count)
+    dicts = build_dicts(points)
+    buffer = build_buffer(points)
+    window_start, window_end = points[count // 2][1], points[count // 2][1] + timedelta(hours=1)
+
+    def dict_window():
+        return [p for p in dicts if window_start <= p['timestamp'] <= window_end]
+
+    def dict_geojson():
+        return [[p['longitude'], p['latitude'], p['altitude']] for p in dicts]
+
+    results = {
+        'list_of_dicts': {
+            'bytes_per_point': round(measure_memory(build_dicts, points), 1),
+            'append_points_per_s': round(count / timed(lambda: build_dicts(points), 3)),
+            'window_ms': round(timed(dict_window) * 1000, 3),
+            'geojson_ms': round(timed(dict_geojson) * 1000, 3),
+        },
+        'track_buffer': {
+            'bytes_per_point': round(measure_memory(build_buffer, points), 1),
+            'append_points_per_s': round(count / timed(lambda: build_buffer(points), 3)),
+            'window_ms': round(timed(lambda: buffer.slice(window_start, window_end)) * 1000, 3),
+            'geojson_ms': round(timed(lambda: buffer.coordinates().tolist()) * 1000, 3),
+        }
+    }
+    return {
+        'benchmark': 'track_buffer',
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'parameters': {'points': count},
+        'results': results
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--output', help='write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    body = json.dumps(run(args.points), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(body)
+    else:
+        print(body)
+
+if __name__ == '__main__':
+    main()
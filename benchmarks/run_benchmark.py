@@ -0,0 +1,225 @@
+"""End-to-end benchmark: ingest synthetic traffic, hammer the read endpoints, complete flights.
+
+Runs against the in-process Flask app (test client, backed by MongoDB or, with --storage memory,
+by the in-process storage engine) or against a running server over HTTP, and writes machine-readable JSON results that can be
+compared between commits:
+
+    python -m benchmarks.run_benchmark --aircraft 200 --duration 600 --output before.json
+    python -m benchmarks.run_benchmark --aircraft 200 --duration 600 --compare before.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks.traffic import build_fleet, generate_updates
+
+def percentile(samples: list, pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not samples:
+        return None
+    rank = (len(samples) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+def summarise(latencies: list, elapsed: float, errors: int) -> dict:
+    """Throughput and latency percentiles (milliseconds) for one phase"""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else None,
+        'p50_ms': _ms(percentile(ordered, 50)),
+        'p95_ms': _ms(percentile(ordered, 95)),
+        'p99_ms': _ms(percentile(ordered, 99)),
+        'max_ms': _ms(ordered[-1] if ordered else None)
+    }
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+class InProcessTarget:
+    """Drives the Flask app through its test client (no network, no server process)"""
+    name = 'inprocess'
+
+    def __init__(self, storage_backend: str):
+        from config import Config
+        Config.STORAGE_BACKEND = storage_backend
+        from app import create_app
+        self.client = create_app().test_client()
+
+    def seed(self, fleet: list):
+        from models.storage import get_storage
+        for plane in fleet:
+            get_storage().upsert_flight(plane.flight_id, plane.flight_document())
+
+    def request(self, method: str, path: str, payload: dict = None) -> int:
+        return self.client.open(path, method=method, json=payload).status_code
+
+class HttpTarget:
+    """Drives a running server over HTTP"""
+    name = 'http'
+
+    def __init__(self, base_url: str):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def seed(self, fleet: list):
+        pass  # flights are created by the first tracking update
+
+    def request(self, method: str, path: str, payload: dict = None) -> int:
+        return self.session.request(method, self.base_url + path, json=payload).status_code
+
+def run_phase(target, calls: list, concurrency: int) -> dict:
+    """Run (method, path, payload) calls and time each one"""
+    latencies, errors = [], 0
+
+    def timed(call):
+        started = time.perf_counter()
+        status = target.request(*call)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, calls))
+    else:
+        results = [timed(call) for call in calls]
+    elapsed = time.perf_counter() - started
+
+    for latency, status in results:
+        latencies.append(latency)
+        if status >= 400:
+            errors += 1
+    return summarise(latencies, elapsed, errors)
+
+def run(args) -> dict:
+    target = InProcessTarget(args.storage) if args.target == 'inprocess' else HttpTarget(args.target)
+    start = datetime.utcnow().replace(microsecond=0)
+    fleet = build_fleet(args.aircraft, start, seed=args.seed)
+    target.seed(fleet)
+
+    updates = [
+        ('POST', '/api/tracking/update', payload)
+        for payload in generate_updates(fleet, start, args.duration, args.interval,
+                                        receivers=args.receivers, overlap=args.overlap,
+                                        seed=args.seed)
+    ]
+    # Aircraft that land during the run are completed by their destination geofence, so the
+    # read and complete phases only use the ones still airborne at the end
+    end = start + timedelta(seconds=args.duration)
+    flight_ids = [plane.flight_id for plane in fleet if plane.position_at(end)['speed'] > 0] \
+        or [plane.flight_id for plane in fleet]
+    reads = int(args.reads)
+    phases = {}
+
+    phases['ingest'] = run_phase(target, updates, args.concurrency)
+    phases['list_flights'] = run_phase(
+        target, [('GET', '/api/flights', None)] * max(1, reads // 10), args.concurrency)
+    phases['position_latest'] = run_phase(
+        target, [('GET', f'/api/flights/{flight_ids[i % len(flight_ids)]}/position', None)
+                 for i in range(reads)], args.concurrency)
+    phases['position_with_path'] = run_phase(
+        target, [('GET', f'/api/flights/{flight_ids[i % len(flight_ids)]}/position?include_path=true', None)
+                 for i in range(reads)], args.concurrency)
+
+    completed = flight_ids[:max(1, int(len(flight_ids) * args.complete_fraction))]
+    phases['complete_flight'] = run_phase(
+        target, [('POST', f'/api/flights/{flight_id}/complete', None) for flight_id in completed],
+        args.concurrency)
+    phases['flight_history'] = run_phase(
+        target, [('GET', f'/api/flights/{completed[i % len(completed)]}/history', None)
+                 for i in range(reads)], args.concurrency)
+
+    return {
+        'benchmark': 'end_to_end',
+        'commit': _git_commit(),
+        'started_at': start.isoformat() + 'Z',
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'target': target.name,
+        'storage': args.storage if target.name == 'inprocess' else None,
+        'parameters': {
+            'aircraft': args.aircraft,
+            'duration_s': args.duration,
+            'update_interval_s': args.interval,
+            'receivers': args.receivers,
+            'overlap': args.overlap,
+            'reads': reads,
+            'concurrency': args.concurrency,
+            'complete_fraction': args.complete_fraction,
+            'seed': args.seed
+        },
+        'phases': phases
+    }
+
+def compare(current: dict, baseline: dict) -> list:
+    """Lines describing the change of each phase's throughput and p95 against a baseline"""
+    lines = [f"baseline {baseline.get('commit')} -> current {current.get('commit')}"]
+    for phase, stats in current['phases'].items():
+        before = baseline.get('phases', {}).get(phase)
+        if not before:
+            continue
+        lines.append(
+            f"{phase:20s} throughput {_delta(before['throughput_rps'], stats['throughput_rps'])}"
+            f"  p95 {_delta(before['p95_ms'], stats['p95_ms'])}"
+        )
+    return lines
+
+def _delta(before, after) -> str:
+    if not before or after is None:
+        return f'{after}'
+    return f'{before} -> {after} ({(after - before) / before * 100:+.1f}%)'
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', default='inprocess',
+                        help="'inprocess' or the base URL of a running server")
+    parser.add_argument('--storage', default='mongo', choices=['mongo', 'memory'],
+                        help='storage backend for the in-process target')
+    parser.add_argument('--aircraft', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=300,
+                        help='simulated seconds of traffic')
+    parser.add_argument('--interval', type=float, default=5,
+                        help='simulated seconds between updates per aircraft')
+    parser.add_argument('--receivers', type=int, default=10)
+    parser.add_argument('--overlap', type=int, default=1,
+                        help='receivers hearing each position')
+    parser.add_argument('--reads', type=int, default=500,
+                        help='requests per read phase')
+    parser.add_argument('--complete-fraction', type=float, default=0.2,
+                        help='share of the fleet completed at the end')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON results to this file')
+    parser.add_argument('--compare', help='baseline JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    body = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(body)
+    else:
+        print(body)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('\n'.join(compare(results, baseline)), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
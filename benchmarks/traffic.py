@@ -0,0 +1,145 @@
+import random
+from datetime import datetime, timedelta
+from math import radians, degrees, sin, cos, asin, atan2, sqrt
+#Synthetic traffic for load tests: aircraft flying great-circle routes between real airports,
+#each position heard by one or more receivers, as /api/tracking/update payloads.
+
+AIRPORTS = {
+    'KHI': (24.9065, 67.1608),
+    'LHE': (31.5216, 74.4036),
+    'ISB': (33.5607, 72.8516),
+    'DXB': (25.2532, 55.3657),
+    'DOH': (25.2731, 51.6081),
+    'JED': (21.6796, 39.1565),
+    'IST': (41.2753, 28.7519),
+    'LHR': (51.4700, -0.4543),
+    'FRA': (50.0379, 8.5622),
+    'JFK': (40.6413, -73.7781),
+    'SIN': (1.3644, 103.9915),
+    'BKK': (13.6900, 100.7501),
+}
+AIRLINES = ['PIA', 'EK', 'QR', 'TK', 'BA', 'LH', 'SQ']
+
+EARTH_RADIUS_KM = 6371
+CRUISE_ALTITUDE = 35000  # ft
+CRUISE_SPEED = 450       # kts
+CLIMB_FRACTION = 0.1     # share of the route spent climbing (and descending)
+
+def great_circle_point(lat1: float, lon1: float, lat2: float, lon2: float, fraction: float) -> tuple:
+    """Point at `fraction` of the way along the great circle, plus the bearing there"""
+    phi1, lam1, phi2, lam2 = map(radians, [lat1, lon1, lat2, lon2])
+    delta = 2 * asin(sqrt(sin((phi2 - phi1) / 2) ** 2 +
+                          cos(phi1) * cos(phi2) * sin((lam2 - lam1) / 2) ** 2))
+    if delta == 0:
+        return lat1, lon1, 0.0
+
+    a = sin((1 - fraction) * delta) / sin(delta)
+    b = sin(fraction * delta) / sin(delta)
+    x = a * cos(phi1) * cos(lam1) + b * cos(phi2) * cos(lam2)
+    y = a * cos(phi1) * sin(lam1) + b * cos(phi2) * sin(lam2)
+    z = a * sin(phi1) + b * sin(phi2)
+    phi = atan2(z, sqrt(x * x + y * y))
+    lam = atan2(y, x)
+
+    # Bearing from here towards the destination is the track at this point
+    bearing = atan2(sin(lam2 - lam) * cos(phi2),
+                    cos(phi) * sin(phi2) - sin(phi) * cos(phi2) * cos(lam2 - lam))
+    return degrees(phi), degrees(lam), (degrees(bearing) + 360) % 360
+
+def route_length_km(origin: str, destination: str) -> float:
+    lat1, lon1 = AIRPORTS[origin]
+    lat2, lon2 = AIRPORTS[destination]
+    phi1, phi2 = radians(lat1), radians(lat2)
+    a = sin((phi2 - phi1) / 2) ** 2 + cos(phi1) * cos(phi2) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+class SimulatedAircraft:
+    def __init__(self, flight_id: str, airline: str, origin: str, destination: str,
+                 departure: datetime, progress: float = 0.0):
+        self.flight_id = flight_id
+        self.airline = airline
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.progress = progress  # fraction of the route already flown at `departure`
+        # Flight time at cruise speed (1 kt = 1.852 km/h)
+        self.duration = timedelta(hours=route_length_km(origin, destination) / (CRUISE_SPEED * 1.852))
+
+    def position_at(self, when: datetime) -> dict:
+        """Position, track, speed and vertical rate at `when` (clamped to the route)"""
+        fraction = self.progress + (when - self.departure) / self.duration
+        fraction = min(max(fraction, 0.0), 1.0)
+        lat, lon, heading = great_circle_point(*AIRPORTS[self.origin], *AIRPORTS[self.destination], fraction)
+
+        minutes = self.duration.total_seconds() / 60
+        if fraction < CLIMB_FRACTION:
+            altitude = CRUISE_ALTITUDE * fraction / CLIMB_FRACTION
+            vertical_rate = CRUISE_ALTITUDE / (minutes * CLIMB_FRACTION)
+        elif fraction > 1 - CLIMB_FRACTION:
+            altitude = CRUISE_ALTITUDE * (1 - fraction) / CLIMB_FRACTION
+            vertical_rate = -CRUISE_ALTITUDE / (minutes * CLIMB_FRACTION)
+        else:
+            altitude, vertical_rate = CRUISE_ALTITUDE, 0
+
+        return {
+            'latitude': round(lat, 6),
+            'longitude': round(lon, 6),
+            'altitude': round(altitude),
+            'heading': round(heading, 1),
+            'speed': CRUISE_SPEED if 0 < fraction < 1 else 0,
+            'vertical_rate': round(vertical_rate) if 0 < fraction < 1 else 0
+        }
+
+    def flight_document(self) -> dict:
+        """Metadata for the flights collection (what an airline feed would provide)"""
+        return {
+            'flight_id': self.flight_id,
+            'airline': self.airline,
+            'flight_number': self.flight_id,
+            'origin': {'code': self.origin, 'latitude': AIRPORTS[self.origin][0],
+                       'longitude': AIRPORTS[self.origin][1]},
+            'destination': {'code': self.destination, 'latitude': AIRPORTS[self.destination][0],
+                            'longitude': AIRPORTS[self.destination][1]},
+            'scheduled_departure': self.departure,
+            'scheduled_arrival': self.departure + self.duration,
+            'status': 'scheduled'
+        }
+
+def build_fleet(aircraft: int, start: datetime, seed: int = 0) -> list:
+    """Aircraft on random routes, spread along their routes so traffic is mid-flight"""
+    rng = random.Random(seed)
+    codes = sorted(AIRPORTS)
+    fleet = []
+    for i in range(aircraft):
+        origin, destination = rng.sample(codes, 2)
+        airline = rng.choice(AIRLINES)
+        fleet.append(SimulatedAircraft(
+            f'{airline}{1000 + i}', airline, origin, destination,
+            start, progress=rng.uniform(0.05, 0.9)
+        ))
+    return fleet
+
+def generate_updates(fleet: list, start: datetime, duration_s: float, update_interval_s: float,
+                     receivers: int = 10, overlap: int = 1, seed: int = 0):
+    """Yield tracking update payloads in time order
+
+    Every aircraft reports every `update_interval_s` seconds of simulated time and each
+    report is heard by `overlap` distinct receivers (out of `receivers`), so the server
+    sees duplicate positions just like with real overlapping ADS-B coverage.
+    """
+    rng = random.Random(seed)
+    overlap = max(1, min(overlap, receivers))
+    ticks = int(duration_s / update_interval_s)
+    for tick in range(ticks + 1):
+        when = start + timedelta(seconds=tick * update_interval_s)
+        timestamp = when.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        for plane in fleet:
+            position = plane.position_at(when)
+            for receiver in rng.sample(range(receivers), overlap):
+                yield {
+                    'flight_id': plane.flight_id,
+                    'receiver_id': f'REC-{receiver:03d}',
+                    'position': position,
+                    'timestamp': timestamp,
+                    'signal_strength': round(rng.uniform(0.2, 1.0), 2)
+                }
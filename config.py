@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +9,9 @@ class Config:
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
     DATABASE_NAME = os.getenv('DATABASE_NAME', 'flight_tracking')
     
+    # Storage backend: 'mongo' (MongoDB) or 'memory' (in-process, see models/memory_storage.py)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+    
     # Flask Configuration
     DEBUG = os.getenv('DEBUG', False)
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -20,9 +24,91 @@ class Config:
     MAX_TRACKING_POINTS = 10000
     RECENT_PATH_LIMIT = 10
     
+    # Completed flight log cache (see services/flight_log_cache.py), per process; 0 bytes disables it
+    FLIGHT_LOG_CACHE_BYTES = int(os.getenv('FLIGHT_LOG_CACHE_BYTES', 64 * 1024 * 1024))
+    FLIGHT_LOG_CACHE_SERIALIZED = os.getenv('FLIGHT_LOG_CACHE_SERIALIZED', 'true').lower() == 'true'  # keep JSON bodies
+    FLIGHT_LOG_CACHE_GENERATION_CHECK = 5.0  # seconds between archive generation checks
+    
+    # Flight search (see services/search_service.py)
+    SEARCH_RECENT_LOGS = int(os.getenv('SEARCH_RECENT_LOGS', 10000))  # completed flights kept searchable
+    SEARCH_DEFAULT_LIMIT = 20
+    SEARCH_MAX_LIMIT = 100
+    SEARCH_SCAN_LIMIT = 1000  # index entries examined per lookup (bounds the cost of short prefixes)
+    SEARCH_SYNC_INTERVAL = 5.0  # seconds between checks for flights activated/completed elsewhere
+    
+    # Shared live state (see models/live_state.py): current flight state memory-mapped by every
+    # process on the host; unset = every read goes to storage
+    LIVE_STATE_PATH = os.getenv('LIVE_STATE_PATH', '')  # e.g. /dev/shm/flight_tracking.live
+    LIVE_STATE_CAPACITY = int(os.getenv('LIVE_STATE_CAPACITY', 16384))  # flights; fixed when the file is created
+    LIVE_STATE_READ_RETRIES = 1000  # seqlock retries before giving up on a record being rewritten
+    
+    # Ingestion workers (see services/ingest_workers.py): 0 = apply updates in the web process
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 0))
+    INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 10000))  # batches queued per worker
+    INGEST_SUBMIT_TIMEOUT = 1.0  # seconds to wait on a full queue before answering 503
+    INGEST_WORKER_CHECK_INTERVAL = 1.0  # seconds between checks for dead workers (replaced)
+    # flock held by the process running the pool: one pool per host
+    INGEST_LOCK_PATH = os.getenv('INGEST_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'flight_tracking.ingest.lock'))
+    TRACKING_LATEST_RETAINED = 100000  # flights whose newest update time/sequence a process remembers
+    
+    # Metrics Configuration (GET /metrics, Prometheus text format)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # Profiling Configuration (see utils/profiling.py)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile')  # 'cprofile' or 'sampling'
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))  # share of requests
+    PROFILING_ENDPOINTS = [e for e in os.getenv('PROFILING_ENDPOINTS', '').split(',') if e]  # e.g. tracking.get_flight_position
+    PROFILING_MAX_RETAINED = int(os.getenv('PROFILING_MAX_RETAINED', 50))
+    PROFILING_DIR = os.getenv('PROFILING_DIR', 'profiles')
+    PROFILING_SAMPLE_INTERVAL = 0.001  # seconds between stack samples in 'sampling' mode
+    PROFILING_SIGNATURE_MAX_AGE = 300  # seconds a signed request stays valid
+    
+    # Proximity alerts (see services/proximity_service.py)
+    PROXIMITY_HORIZONTAL_NM = float(os.getenv('PROXIMITY_HORIZONTAL_NM', 5))
+    PROXIMITY_VERTICAL_FT = float(os.getenv('PROXIMITY_VERTICAL_FT', 1000))
+    PROXIMITY_MIN_ALTITUDE_FT = float(os.getenv('PROXIMITY_MIN_ALTITUDE_FT', 1500))  # ignore ground traffic
+    PROXIMITY_TICK_INTERVAL = float(os.getenv('PROXIMITY_TICK_INTERVAL', 1.0))  # seconds between evaluations
+    PROXIMITY_STALE_SECONDS = 120  # drop aircraft that stop reporting
+    
+    # Geofences (see services/geofence_service.py)
+    GEOFENCE_CELL_DEG = 0.5  # grid cell size of the fence index
+    GEOFENCE_GENERATION_CHECK = 5.0  # seconds between checks for fences changed by other processes
+    GEOFENCE_FLIGHT_REFRESH = 300    # seconds between re-reads of a tracked flight's destination
+    GEOFENCE_AIRPORT_RADIUS_KM = float(os.getenv('GEOFENCE_AIRPORT_RADIUS_KM', 8))
+    GEOFENCE_AUTO_COMPLETE = os.getenv('GEOFENCE_AUTO_COMPLETE', 'true').lower() == 'true'
+    GEOFENCE_ARRIVAL_MAX_ALTITUDE_FT = float(os.getenv('GEOFENCE_ARRIVAL_MAX_ALTITUDE_FT', 2000))
+    GEOFENCE_ARRIVAL_MAX_SPEED_KTS = float(os.getenv('GEOFENCE_ARRIVAL_MAX_SPEED_KTS', 60))
+    GEOFENCE_ARRIVAL_GRACE_SECONDS = 1800  # ignore updates for this long after an automatic completion
+    GEOFENCE_ARRIVED_RETAINED = 10000      # auto-completed flights remembered for the grace period
+    GEOFENCE_EVENTS_LIMIT = 1000
+    
+    # Receiver rollups (see services/receiver_service.py)
+    RECEIVER_FLUSH_INTERVAL = float(os.getenv('RECEIVER_FLUSH_INTERVAL', 5.0))  # seconds between bulk writes
+    RECEIVER_COVERAGE_CELL_DEG = 1.0  # coverage grid cell size
+    RECEIVER_RETAINED_HOURS = 24      # hourly message/flight buckets kept per receiver
+    
+    # Dead reckoning (see services/extrapolation_service.py)
+    DEAD_RECKONING_MAX_SECONDS = float(os.getenv('DEAD_RECKONING_MAX_SECONDS', 120))  # longest projection
+    DEAD_RECKONING_HORIZONS = (15, 30, 60)  # seconds ahead projected with each live 'position' event
+    DEAD_RECKONING_BASE_NM = 0.05           # confidence radius of a fresh report
+    DEAD_RECKONING_BASE_FT = 100            # altitude band of a fresh report
+    DEAD_RECKONING_DRIFT_RATE = 0.05        # radius per nm flown until enough drift has been measured
+    DEAD_RECKONING_MIN_SAMPLES = 50
+    
+    # Live feed (GET /api/live, Server-Sent Events)
+    LIVE_HEARTBEAT_SECONDS = 15
+    
+    # Analytics Configuration
+    ANALYTICS_HOURLY_WINDOW_HOURS = 24
+    
     # Visualization Configuration
     MAP_ZOOM_START = 5
     DEFAULT_MAP_TILES = 'OpenStreetMap'
+    MAP_FEED_PRECISION = 5          # decimals of feed coordinates (~1 m)
+    MAP_REFRESH_SECONDS = 30        # live map feed polling interval
+    MAP_SHELL_MAX_AGE = 86400       # Cache-Control max-age of the map pages (they carry no data)
+    MAP_PATH_FEED_MAX_AGE = 3600    # archived paths only change through migrations
     
     @classmethod
     def validate_mapbox_config(cls):
@@ -1,10 +1,14 @@
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
 from config import Config
+from models.storage import Storage
+from models.track_buffer import TrackBuffer
+from utils.metrics import mongo_listeners
 
 class Database:
-    def __init__(self):
-        self.client = MongoClient(Config.MONGODB_URI) # creates a mongo client connected to mongo db (self.client is a client obj from pymongo)
-        self.db = self.client[Config.DATABASE_NAME] #made to access collections
+    def __init__(self, uri: str = None, database_name: str = None):
+        self.client = MongoClient(uri or Config.MONGODB_URI, event_listeners=mongo_listeners()) # creates a mongo client connected to mongo db (self.client is a client obj from pymongo)
+        self.db = self.client[database_name or Config.DATABASE_NAME] #made to access collections
         
         # Collections (these lines create refrences to mongo db colections)
         self.flights = self.db.flights                  #active flight documents
@@ -12,6 +16,18 @@ class Database:
         self.flight_logs = self.db.flight_logs          #archived/completed flight logs
         self.receivers = self.db.receivers              #metadata about data receivers
         
+        # Rollups (materialized analytics, updated incrementally on complete_flight)
+        self.airline_rollups = self.db.airline_rollups
+        self.route_rollups = self.db.route_rollups
+        self.hourly_rollups = self.db.hourly_rollups
+        
+        # Geofences and the entry/exit events recorded against them
+        self.geofences = self.db.geofences
+        self.geofence_events = self.db.geofence_events
+        
+        # Markers shared by every process (e.g. the flight_logs archive generation)
+        self.meta = self.db.meta
+        
         self._create_indexes()
         #indexes are used for efficient searching 
     def _create_indexes(self):
@@ -26,15 +42,275 @@ class Database:
         # Index for flights collection
         self.flights.create_index([('flight_id', ASCENDING)])
         self.flights.create_index([('status', ASCENDING)])
+        self.flights.create_index([('airline', ASCENDING), ('status', ASCENDING)])
+        self.flights.create_index([('origin.code', ASCENDING), ('destination.code', ASCENDING)])
         
         # Index for flight logs
         self.flight_logs.create_index([('flight_id', ASCENDING)])
         self.flight_logs.create_index([('completed_at', DESCENDING)])
+        self.flight_logs.create_index([('airline', ASCENDING), ('completed_at', DESCENDING)])
+        self.flight_logs.create_index([
+            ('origin.code', ASCENDING),
+            ('destination.code', ASCENDING),
+            ('completed_at', DESCENDING)
+        ])
         
         # Index for receivers
         self.receivers.create_index([('receiver_id', ASCENDING)])
         
+        # Indexes for rollups (one document per key, so the keys are unique)
+        self.airline_rollups.create_index([('airline', ASCENDING)], unique=True)
+        self.route_rollups.create_index([
+            ('origin', ASCENDING),
+            ('destination', ASCENDING)
+        ], unique=True)
+        self.hourly_rollups.create_index([('hour', ASCENDING)], unique=True)
+        
+        # Indexes for geofences and their events
+        self.geofences.create_index([('fence_id', ASCENDING)], unique=True)
+        self.geofence_events.create_index([('flight_id', ASCENDING), ('timestamp', DESCENDING)])
+        self.geofence_events.create_index([('fence_id', ASCENDING), ('timestamp', DESCENDING)])
+        
         print("Database indexes created successfully")
 
+class MongoStorage(Storage):
+    """Storage backed by the MongoDB collections above"""
+
+    def __init__(self, database: Database = None):
+        self.db = database or db
+
+    def _rollups(self, name: str):
+        return self.db.db[f'{name}_rollups']
+
+    # ---- Active flights ----
+    def get_flight(self, flight_id: str) -> dict:
+        return self.db.flights.find_one({'flight_id': flight_id})
+
+    def find_flights(self, status: str = None, airline: str = None, origin: str = None,
+                     destination: str = None) -> list:
+        # airline+status and origin.code+destination.code are covered by compound indexes
+        query = {}
+        for field, value in (('airline', airline), ('status', status), ('origin.code', origin),
+                             ('destination.code', destination)):
+            if value:
+                query[field] = value
+        return list(self.db.flights.find(query))
+
+    def find_flight_ids(self, status: str = None) -> list:
+        query = {'status': status} if status else {}
+        return [flight['flight_id'] for flight in self.db.flights.find(query, {'_id': 0, 'flight_id': 1})]
+
+    def upsert_flight(self, flight_id: str, fields: dict) -> None:
+        self.db.flights.update_one({'flight_id': flight_id}, {'$set': fields}, upsert=True)
+
+    def update_current_position(self, flight_id: str, position: dict, timestamp: datetime,
+                                fields: dict = None) -> None:
+        # Update pipeline: the timestamp comparison and the write are one atomic operation
+        newer = {'$gt': [timestamp, {'$ifNull': ['$position_timestamp', datetime.min]}]}
+        self.db.flights.update_one({'flight_id': flight_id}, [{'$set': {
+            'current_position': {'$cond': [newer, {'$literal': position}, '$current_position']},
+            'position_timestamp': {'$cond': [newer, timestamp, '$position_timestamp']},
+            **{field: {'$literal': value} for field, value in (fields or {}).items()}
+        }}], upsert=True)
+
+    def delete_flight(self, flight_id: str) -> None:
+        self.db.flights.delete_one({'flight_id': flight_id})
+        self.db.tracking_updates.delete_many({'flight_id': flight_id})
+
+    # ---- Positions ----
+    def insert_position(self, update: dict) -> None:
+        self.db.tracking_updates.insert_one(update)
+
+    def latest_position(self, flight_id: str, at: datetime = None) -> dict:
+        query = {'flight_id': flight_id}
+        if at is not None:
+            query['timestamp'] = {'$lte': at}
+        return self.db.tracking_updates.find_one(query, sort=[('timestamp', DESCENDING)])
+
+    def recent_positions(self, flight_id: str, limit: int) -> list:
+        recent = list(self.db.tracking_updates.find(
+            {'flight_id': flight_id}
+        ).sort('timestamp', DESCENDING).limit(limit))
+        return list(reversed(recent))
+
+    def _range_query(self, flight_id: str, start: datetime = None, end: datetime = None) -> dict:
+        query = {'flight_id': flight_id}
+        if start is not None or end is not None:
+            query['timestamp'] = {}
+            if start is not None:
+                query['timestamp']['$gte'] = start
+            if end is not None:
+                query['timestamp']['$lte'] = end
+        return query
+
+    def position_range(self, flight_id: str, start: datetime = None, end: datetime = None) -> list:
+        query = self._range_query(flight_id, start, end)
+        return list(self.db.tracking_updates.find(query).sort('timestamp', ASCENDING))
+
+    def track(self, flight_id: str, start: datetime = None, end: datetime = None,
+              last: int = None) -> TrackBuffer:
+        query = self._range_query(flight_id, start, end)
+        projection = {'position': 1, 'timestamp': 1, '_id': 0}
+        if last is not None:
+            if last <= 0:
+                return TrackBuffer(0)
+            newest = list(self.db.tracking_updates.find(query, projection)
+                          .sort('timestamp', DESCENDING).limit(last))
+            return TrackBuffer.from_updates(reversed(newest))
+        return TrackBuffer.from_updates(
+            self.db.tracking_updates.find(query, projection).sort('timestamp', ASCENDING)
+        )
+
+    # ---- Archive ----
+    def archive_flight(self, flight_log: dict) -> None:
+        self.db.flight_logs.insert_one(flight_log)
+        self.delete_flight(flight_log['flight_id'])
+
+    def get_flight_log(self, flight_id: str, start: datetime = None, end: datetime = None,
+                       offset: int = 0, limit: int = None, every: int = 1) -> dict:
+        # Slice tracking_path inside the server so only the requested points come over the wire
+        path = '$tracking_path'
+        if start is not None or end is not None:
+            bounds = []
+            if start is not None:
+                bounds.append({'$gte': ['$$point.timestamp', start]})
+            if end is not None:
+                bounds.append({'$lte': ['$$point.timestamp', end]})
+            path = {'$filter': {'input': path, 'as': 'point', 'cond': {'$and': bounds}}}
+        if every > 1:
+            path = {'$let': {'vars': {'path': path}, 'in': {'$map': {
+                'input': {'$range': [0, {'$size': '$$path'}, every]},
+                'as': 'i',
+                'in': {'$arrayElemAt': ['$$path', '$$i']}
+            }}}}
+        
+        pipeline = [
+            {'$match': {'flight_id': flight_id}},
+            {'$limit': 1},
+            {'$set': {'tracking_path': {'$ifNull': [path, []]}}},
+            {'$set': {'tracking_path_count': {'$size': '$tracking_path'}}}
+        ]
+        if offset or limit is not None:
+            # $slice needs a positive count, so "to the end" is the whole (non-empty) size
+            count = limit if limit is not None else {'$max': [{'$size': '$tracking_path'}, 1]}
+            pipeline.append({'$set': {'tracking_path': {'$slice': ['$tracking_path', offset, count]}}})
+        return next(self.db.flight_logs.aggregate(pipeline), None)
+
+    def find_recent_flight_logs(self, limit: int, since: datetime = None) -> list:
+        query = {'completed_at': {'$gte': since}} if since else {}
+        return list(self.db.flight_logs.find(query, {'tracking_path': 0})
+                    .sort('completed_at', DESCENDING).limit(limit))
+
+    def iter_flight_logs(self):
+        return self.db.flight_logs.find({}, {'_id': 0})
+
+    def archive_generation(self) -> int:
+        marker = self.db.meta.find_one({'_id': 'archive_generation'})
+        return marker['value'] if marker else 0
+
+    def bump_archive_generation(self) -> int:
+        marker = self.db.meta.find_one_and_update(
+            {'_id': 'archive_generation'}, {'$inc': {'value': 1}},
+            upsert=True, return_document=ReturnDocument.AFTER)
+        return marker['value']
+
+    # ---- Geofences ----
+    def upsert_geofence(self, fence: dict) -> None:
+        self.db.geofences.replace_one({'fence_id': fence['fence_id']}, fence, upsert=True)
+
+    def delete_geofence(self, fence_id: str) -> bool:
+        return self.db.geofences.delete_one({'fence_id': fence_id}).deleted_count > 0
+
+    def find_geofences(self) -> list:
+        return list(self.db.geofences.find({}, {'_id': 0}))
+
+    def geofence_generation(self) -> int:
+        marker = self.db.meta.find_one({'_id': 'geofence_generation'})
+        return marker['value'] if marker else 0
+
+    def bump_geofence_generation(self) -> int:
+        marker = self.db.meta.find_one_and_update(
+            {'_id': 'geofence_generation'}, {'$inc': {'value': 1}},
+            upsert=True, return_document=ReturnDocument.AFTER)
+        return marker['value']
+
+    def insert_geofence_event(self, event: dict) -> None:
+        self.db.geofence_events.insert_one(dict(event))
+
+    def find_geofence_events(self, flight_id: str = None, fence_id: str = None,
+                             start: datetime = None, end: datetime = None, limit: int = 1000) -> list:
+        query = {}
+        if flight_id:
+            query['flight_id'] = flight_id
+        if fence_id:
+            query['fence_id'] = fence_id
+        if start is not None or end is not None:
+            query['timestamp'] = {}
+            if start is not None:
+                query['timestamp']['$gte'] = start
+            if end is not None:
+                query['timestamp']['$lte'] = end
+        return list(self.db.geofence_events.find(query, {'_id': 0})
+                    .sort('timestamp', DESCENDING).limit(limit))
+
+    # ---- Receivers ----
+    def flush_receiver_stats(self, deltas: list) -> None:
+        operations = []
+        for delta in deltas:
+            signal = delta['signal']
+            update = {
+                '$min': {'first_seen': delta['first_seen']},
+                '$max': {'last_seen': delta['last_seen']},
+                '$inc': {'messages': delta['messages']},
+                '$set': {'updated_at': datetime.utcnow()}
+            }
+            if signal['count']:
+                update['$inc'].update({'signal.count': signal['count'], 'signal.sum': signal['sum'],
+                                       'signal.sum_sq': signal['sum_sq']})
+                update['$min']['signal.min'] = signal['min']
+                update['$max']['signal.max'] = signal['max']
+            for bin_, count in signal['histogram'].items():
+                update['$inc'][f'signal.histogram.{bin_}'] = count
+            for cell, count in delta['coverage'].items():
+                update['$inc'][f'coverage.{cell}'] = count
+            add = {}
+            for hour, bucket in delta['hours'].items():
+                update['$inc'][f'hours.{hour}.messages'] = bucket['messages']
+                add[f'hours.{hour}.flights'] = {'$each': bucket['flights']}
+            update['$addToSet'] = add
+            if delta['expire_hours']:
+                update['$unset'] = {f'hours.{hour}': '' for hour in delta['expire_hours']}
+            operations.append(UpdateOne({'receiver_id': delta['receiver_id']}, update, upsert=True))
+        if operations:
+            self.db.receivers.bulk_write(operations, ordered=False)
+
+    def find_receivers(self) -> list:
+        return list(self.db.receivers.find({}, {'_id': 0}))
+
+    def get_receiver(self, receiver_id: str) -> dict:
+        return self.db.receivers.find_one({'receiver_id': receiver_id}, {'_id': 0})
+
+    # ---- Rollups ----
+    def increment_rollup(self, name: str, key: dict, increments: dict, updated_at: datetime) -> None:
+        self._rollups(name).update_one(
+            key,
+            {'$inc': increments, '$set': {'updated_at': updated_at}},
+            upsert=True
+        )
+
+    def find_rollups(self, name: str, match: dict = None) -> list:
+        return list(self._rollups(name).find(match or {}, {'_id': 0}))
+
+    def find_hourly_rollups(self, start: datetime, end: datetime) -> list:
+        return list(self._rollups('hourly').find(
+            {'hour': {'$gte': start, '$lte': end}}, {'_id': 0}
+        ).sort('hour', ASCENDING))
+
+    def replace_rollups(self, name: str, documents: list) -> None:
+        collection = self._rollups(name)
+        collection.delete_many({})
+        if documents:
+            collection.insert_many(documents)
+
 # Global database instance
 db = Database()
\ No newline at end of file
@@ -1,7 +1,12 @@
 from datetime import datetime
 from typing import Dict, List, Optional
 
+#Position (TrackBuffer rows) and Airport (geofence airports) use __slots__ to stay small (no
+#per-instance __dict__).
+
 class Position:
+    __slots__ = ('latitude', 'longitude', 'altitude', 'heading', 'speed', 'vertical_rate')
+
     def __init__(self, latitude: float, longitude: float, altitude: float, 
                  heading: float, speed: float, vertical_rate: float = 0):
         self.latitude = latitude
@@ -22,19 +27,35 @@ class Position:
         }
 
 class Airport:
-    def __init__(self, code: str, name: str, city: str, country: str):
+    __slots__ = ('code', 'name', 'city', 'country', 'latitude', 'longitude')
+
+    def __init__(self, code: str, name: str, city: str, country: str,
+                 latitude: float = None, longitude: float = None):
         self.code = code
         self.name = name
         self.city = city
         self.country = country
+        self.latitude = latitude
+        self.longitude = longitude
+    
+    @property
+    def has_location(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
     
     def to_dict(self) -> Dict:
         return {
             'code': self.code,
             'name': self.name,
             'city': self.city,
-            'country': self.country
+            'country': self.country,
+            'latitude': self.latitude,
+            'longitude': self.longitude
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Airport':
+        return cls(data.get('code'), data.get('name'), data.get('city'), data.get('country'),
+                   data.get('latitude'), data.get('longitude'))
 
 class Aircraft:
     def __init__(self, registration: str, type: str, model: str):
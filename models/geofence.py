@@ -0,0 +1,92 @@
+from math import cos, radians
+from typing import Dict
+from utils.helpers import calculate_distance
+#Geofences: circles (airport radii) and polygons. Coordinates follow GeoJSON order, [lon, lat].
+#A fence that crosses the antimeridian has a bbox with min lon > max lon (it wraps through 180);
+#such polygons are tested with negative longitudes shifted by +360 so their edges stay contiguous.
+
+KM_PER_DEGREE = 111.32
+
+def _unwrap(polygon: list) -> list:
+    """Polygon points with negative longitudes moved past 180 when an edge crosses the antimeridian"""
+    if not any(abs(x2 - x1) > 180 for (x1, _), (x2, _) in zip(polygon, polygon[1:] + polygon[:1])):
+        return polygon
+    return [(lon + 360 if lon < 0 else lon, lat) for lon, lat in polygon]
+
+class Geofence:
+    __slots__ = ('fence_id', 'name', 'kind', 'center', 'radius_km', 'polygon', 'airport_code', 'bbox', '_ring')
+
+    def __init__(self, fence_id: str, name: str, kind: str, center: tuple = None,
+                 radius_km: float = None, polygon: list = None, airport_code: str = None):
+        self.fence_id = fence_id
+        self.name = name
+        self.kind = kind                  # 'circle' or 'polygon'
+        self.center = center              # (lon, lat) for circles
+        self.radius_km = radius_km
+        self.polygon = polygon            # [(lon, lat), ...] for polygons
+        self.airport_code = airport_code  # set for airport fences
+        self._ring = _unwrap(polygon) if polygon else None
+        self.bbox = self._bbox()          # (min lon, min lat, max lon, max lat)
+
+    @classmethod
+    def airport(cls, code: str, latitude: float, longitude: float, radius_km: float) -> 'Geofence':
+        return cls(f'airport:{code}', code, 'circle', (longitude, latitude), radius_km, airport_code=code)
+
+    def _bbox(self) -> tuple:
+        if self.kind == 'circle':
+            lon, lat = self.center
+            dlat = self.radius_km / KM_PER_DEGREE
+            dlon = self.radius_km / (KM_PER_DEGREE * max(cos(radians(lat)), 0.01))
+            if dlon >= 180:  # around a pole
+                return -180.0, lat - dlat, 180.0, lat + dlat
+            min_lon, min_lat, max_lon, max_lat = lon - dlon, lat - dlat, lon + dlon, lat + dlat
+        else:
+            lons = [p[0] for p in self._ring]
+            lats = [p[1] for p in self._ring]
+            min_lon, min_lat, max_lon, max_lat = min(lons), min(lats), max(lons), max(lats)
+        # Back into [-180, 180]: a fence across the antimeridian ends up with min lon > max lon
+        if min_lon < -180:
+            min_lon += 360
+        if max_lon > 180:
+            max_lon -= 360
+        return min_lon, min_lat, max_lon, max_lat
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        wraps = min_lon > max_lon  # across the antimeridian
+        within_lon = (longitude >= min_lon or longitude <= max_lon) if wraps else min_lon <= longitude <= max_lon
+        if not (min_lat <= latitude <= max_lat and within_lon):
+            return False
+        if self.kind == 'circle':
+            return calculate_distance(latitude, longitude, self.center[1], self.center[0]) <= self.radius_km
+        if wraps and longitude < 0:
+            longitude += 360  # the ring was unwrapped the same way
+        # Ray casting (planar, fine for fences a few hundred km across)
+        inside = False
+        points = self._ring
+        for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+            if (y1 > latitude) != (y2 > latitude):
+                if longitude < x1 + (latitude - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+        return inside
+
+    def to_dict(self) -> Dict:
+        return {
+            'fence_id': self.fence_id,
+            'name': self.name,
+            'type': self.kind,
+            'center': list(self.center) if self.center else None,
+            'radius_km': self.radius_km,
+            'polygon': [list(p) for p in self.polygon] if self.polygon else None,
+            'airport_code': self.airport_code
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Geofence':
+        return cls(
+            data['fence_id'], data.get('name'), data['type'],
+            tuple(data['center']) if data.get('center') else None,
+            data.get('radius_km'),
+            [tuple(p) for p in data['polygon']] if data.get('polygon') else None,
+            data.get('airport_code')
+        )
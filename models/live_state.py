@@ -0,0 +1,348 @@
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from config import Config
+from models.storage import Storage, get_storage
+from models.track_buffer import POSITION_FIELDS
+from utils.metrics import LIVE_STATE_REJECTED, LIVE_STATE_RETRIES
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+#Current flight state shared by every process on the host (LIVE_STATE_PATH). The file is a small
+#header plus a fixed-layout record array, memory-mapped by each process, so one copy serves any
+#number of web and ingest workers. Each record carries a seqlock counter: writers make it odd,
+#write, and make it even again; readers copy the record and retry if the counter moved, so reads
+#take no lock. Writers (ingest) are serialized with flock. Each process maps flight_id -> slot in
+#a dict it rebuilds from the flight_id column whenever the header's generation (bumped when a slot
+#is claimed or freed) changes. Flights that found the table full (or whose flight_id is longer than
+#the column) are counted in the header; while there are any, freeing a slot reloads the missing
+#flights from storage (read outside the lock, and read again if a flight was removed meanwhile)
+#and recounts them.
+
+LAYOUT_VERSION = 2
+_MAGIC = 0x4c495645  # 'LIVE'
+_HEADER_BYTES = 64   # int64 fields:
+_H_MAGIC, _H_VERSION, _H_RECORD_SIZE, _H_CAPACITY, _H_GENERATION, _H_REJECTED, _H_REMOVALS = range(7)
+
+RECORD_DTYPE = np.dtype([
+    ('seq', 'u8'),                         # seqlock counter: odd while the record is being written
+    ('position_timestamp', 'datetime64[us]'),  # naive UTC, NaT before the first position
+    ('updated_at', 'datetime64[us]'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('altitude', 'f4'),
+    ('heading', 'f4'),
+    ('speed', 'f4'),
+    ('vertical_rate', 'f4'),
+    ('used', 'u1'),
+    ('flight_id', 'S32'),
+    ('flight_number', 'S16'),
+    ('airline', 'S48'),
+    ('origin', 'S8'),
+    ('destination', 'S8'),
+    ('status', 'S16'),
+])
+
+def _text(value) -> bytes:
+    return str(value).encode() if value else b''  # longer values are cut to the field size
+
+def _key(flight_id: str) -> bytes:
+    """flight_id as stored in the flight_id column, or None if it does not fit (a cut id could
+    name another flight)"""
+    key = str(flight_id).encode()
+    return key if 0 < len(key) <= RECORD_DTYPE['flight_id'].itemsize else None
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+def _flight_fields(flight: dict) -> dict:
+    return {
+        'flight_number': _text(flight.get('flight_number')),
+        'airline': _text(flight.get('airline')),
+        'origin': _text((flight.get('origin') or {}).get('code')),
+        'destination': _text((flight.get('destination') or {}).get('code')),
+        'status': _text(flight.get('status') or 'active')
+    }
+
+def _position_fields(position: dict, timestamp: datetime) -> dict:
+    fields = {field: _number(position.get(field)) for field in POSITION_FIELDS}
+    fields['position_timestamp'] = np.datetime64(timestamp, 'us')
+    return fields
+
+def _texts(column: np.ndarray) -> list:
+    """Text column as str/None, decoding each distinct value once (airlines, airports, statuses repeat)"""
+    values = column.tolist()
+    decoded = {value: value.decode('utf-8', 'ignore') or None for value in set(values)}
+    return [decoded[value] for value in values]
+
+def _documents(records: np.ndarray) -> list:
+    """Records as (compact) flight documents, converted a column at a time"""
+    # float32 columns are rounded back to what was stored, as in TrackBuffer; NaN = not reported
+    numbers = np.column_stack([records[field] if RECORD_DTYPE[field] == np.float64
+                               else records[field].astype('f8').round(4) for field in POSITION_FIELDS])
+    complete = (~np.isnan(numbers)).all(axis=1).tolist()
+    timestamps = records['position_timestamp'].tolist()  # NaT -> None: no position yet
+    positions = []
+    for values, timestamp, reported in zip(numbers.tolist(), timestamps, complete):
+        if timestamp is None:
+            positions.append(None)
+        elif reported:
+            positions.append(dict(zip(POSITION_FIELDS, values)))
+        else:
+            positions.append({field: value for field, value in zip(POSITION_FIELDS, values) if value == value})
+    origins = [{'code': code} if code else None for code in _texts(records['origin'])]
+    destinations = [{'code': code} if code else None for code in _texts(records['destination'])]
+    return [{
+        'flight_id': flight_id,
+        'flight_number': flight_number,
+        'airline': airline,
+        'status': status,
+        'origin': origin,
+        'destination': destination,
+        'current_position': position,
+        'position_timestamp': timestamp,
+        'updated_at': updated_at
+    } for flight_id, flight_number, airline, status, origin, destination, position, timestamp, updated_at in zip(
+        _texts(records['flight_id']), _texts(records['flight_number']), _texts(records['airline']),
+        _texts(records['status']), origins, destinations, positions, timestamps, records['updated_at'].tolist())]
+
+class LiveStateTable:
+    def __init__(self, path: str, capacity: int = None, storage: Storage = None):
+        self.path = path
+        self.storage = storage or get_storage()
+        self._lock = threading.Lock()  # flock does not exclude threads of one process
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._exclusive():
+            created = self._initialize(capacity or Config.LIVE_STATE_CAPACITY)
+        self._mmap = mmap.mmap(self._fd, 0)
+        self._header = np.ndarray((_HEADER_BYTES // 8,), dtype=np.int64, buffer=self._mmap)
+        self.capacity = int(self._header[_H_CAPACITY])
+        self._records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE, buffer=self._mmap, offset=_HEADER_BYTES)
+        self._slots = {}  # flight_id (bytes) -> slot
+        self._slots_generation = -1
+        if created:
+            self.rebuild()
+
+    def _initialize(self, capacity: int) -> bool:
+        """Lay out a new (or incompatible) file; an existing table keeps its capacity"""
+        header = np.frombuffer(os.pread(self._fd, _HEADER_BYTES, 0).ljust(_HEADER_BYTES, b'\0'), dtype=np.int64)
+        if (header[_H_MAGIC] == _MAGIC and header[_H_VERSION] == LAYOUT_VERSION
+                and header[_H_RECORD_SIZE] == RECORD_DTYPE.itemsize):
+            return False
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, _HEADER_BYTES + capacity * RECORD_DTYPE.itemsize)  # zero-filled
+        header = np.zeros(_HEADER_BYTES // 8, dtype=np.int64)
+        header[[_H_MAGIC, _H_VERSION, _H_RECORD_SIZE, _H_CAPACITY]] = (
+            _MAGIC, LAYOUT_VERSION, RECORD_DTYPE.itemsize, capacity)
+        os.pwrite(self._fd, header.tobytes(), 0)
+        return True
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ---- Slot map ----
+    def _slot(self, key: bytes):
+        """Slot last seen holding `key` (callers verify it through the seqlock)"""
+        slot = self._slots.get(key)
+        if slot is None and self._header[_H_GENERATION] != self._slots_generation:
+            self._refresh_slots()
+            slot = self._slots.get(key)
+        return slot
+
+    def _refresh_slots(self):
+        generation = int(self._header[_H_GENERATION])
+        used = np.flatnonzero(self._records['used'])
+        self._slots = dict(zip(self._records['flight_id'][used].tolist(), used.tolist()))
+        self._slots_generation = generation
+
+    # ---- Writes (ingest) ----
+    def _write(self, slot: int, fields: dict):
+        record = self._records[slot]
+        seq = int(record['seq'])
+        record['seq'] = seq + 1 + (seq & 1)  # odd (also when a writer died half-way)
+        for field, value in fields.items():
+            record[field] = value
+        record['seq'] += 1
+
+    def _claim(self, key: bytes, flight: dict):
+        free = np.flatnonzero(self._records['used'] == 0)
+        if not len(free):
+            return None
+        slot = int(free[0])
+        self._write(slot, {**_flight_fields(flight or {}), 'flight_id': key, 'used': 1,
+                           'position_timestamp': np.datetime64('NaT'), 'updated_at': np.datetime64('NaT')})
+        self._header[_H_GENERATION] += 1
+        self._slots[key] = slot
+        self._slots_generation = int(self._header[_H_GENERATION])  # the map was current before the claim
+        return slot
+
+    def put(self, flight_id: str, position: dict, timestamp: datetime, load_flight=None) -> bool:
+        """Set the flight's current position unless the stored one is newer (like
+        Storage.update_current_position); load_flight() supplies airline/route for a new flight"""
+        key = _key(flight_id)
+        with self._exclusive():
+            slot = self._slot(key) if key else None
+            if slot is None or self._records['flight_id'][slot] != key or not self._records['used'][slot]:
+                self._refresh_slots()
+                slot = self._slots.get(key)
+            if slot is None:
+                slot = self._claim(key, load_flight() if load_flight else None) if key else None
+                if slot is None:
+                    self._header[_H_REJECTED] += 1
+                    LIVE_STATE_REJECTED.inc()
+                    return False
+            stored = self._records['position_timestamp'][slot]
+            if not np.isnat(stored) and stored >= np.datetime64(timestamp, 'us'):
+                return False
+            self._write(slot, {**_position_fields(position, timestamp), 'status': b'active',
+                               'updated_at': np.datetime64(datetime.utcnow(), 'us')})
+            return True
+
+    def remove(self, flight_id: str):
+        """Free the flight's slot (completed flights)"""
+        key = _key(flight_id)
+        if not key:
+            return
+        with self._exclusive():
+            self._header[_H_REMOVALS] += 1  # also when the flight is not in the table
+            removals = int(self._header[_H_REMOVALS])
+            self._refresh_slots()
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return
+            self._write(slot, {'used': 0, 'flight_id': b''})
+            self._header[_H_GENERATION] += 1
+            self._slots_generation = int(self._header[_H_GENERATION])
+            if not self._header[_H_REJECTED]:
+                return
+        # Bring in flights that did not fit, and recount the ones that still do not
+        for _ in range(3):  # under constant churn, later removals try again
+            flights = self.storage.find_flights()
+            with self._exclusive():
+                if self._header[_H_REMOVALS] == removals:
+                    self._refresh_slots()
+                    self._header[_H_REJECTED] = self._load(
+                        f for f in flights if _key(f['flight_id']) not in self._slots)
+                    return
+                removals = int(self._header[_H_REMOVALS])  # `flights` may hold a flight removed meanwhile
+
+    def rebuild(self) -> int:
+        """Reload the table from the flights in storage; returns the number of flights"""
+        with self._exclusive():
+            seq = self._records['seq']
+            seq += (seq & 1) ^ 1  # every record odd while it is cleared
+            cleared = np.zeros(self.capacity, dtype=RECORD_DTYPE)
+            for field in RECORD_DTYPE.names[1:]:
+                self._records[field] = cleared[field]
+            seq += 1
+            self._header[_H_GENERATION] += 1
+            self._refresh_slots()
+            flights = self.storage.find_flights()
+            self._header[_H_REJECTED] = self._load(flights)
+            return len(flights) - int(self._header[_H_REJECTED])
+
+    def _load(self, flights) -> int:
+        """Claim slots for flights from storage (with their current positions); returns how many did not fit"""
+        missing = 0
+        for flight in flights:
+            key = _key(flight['flight_id'])
+            slot = self._claim(key, flight) if key else None
+            if slot is None:
+                missing += 1
+                continue
+            if flight.get('current_position') and flight.get('position_timestamp'):
+                self._write(slot, {**_position_fields(flight['current_position'], flight['position_timestamp']),
+                                   'updated_at': np.datetime64(flight.get('updated_at') or 'NaT', 'us')})
+        return missing
+
+    # ---- Reads (any process, no lock) ----
+    def _read(self, slot: int):
+        """Consistent copy of one record (as a 1-record array), or None if it kept changing"""
+        for _ in range(Config.LIVE_STATE_READ_RETRIES):
+            seq = self._records['seq'][slot]
+            if not seq & 1:
+                record = self._records[slot:slot + 1].copy()
+                if self._records['seq'][slot] == seq:
+                    return record
+            LIVE_STATE_RETRIES.inc()
+        return None
+
+    def get(self, flight_id: str) -> dict:
+        """The flight's live state as a compact flight document, or None"""
+        key = _key(flight_id)
+        if not key:
+            return None
+        for _ in range(2):  # a second pass after the slot was reused by another flight
+            slot = self._slot(key)
+            if slot is None:
+                return None
+            record = self._read(slot)
+            if record is not None and record['used'][0] and record['flight_id'][0] == key:
+                return _documents(record)[0]
+            self._refresh_slots()
+        return None
+
+    def flights(self, status: str = None, airline: str = None, origin: str = None,
+                destination: str = None) -> list:
+        """Every flight in the table (optionally filtered), from one snapshot of the record array"""
+        seq = self._records['seq'].copy()
+        snapshot = self._records.copy()
+        torn = np.flatnonzero((seq & 1).astype(bool) | (snapshot['seq'] != seq) | (self._records['seq'] != seq))
+        for slot in torn:
+            record = self._read(slot)
+            if record is None:
+                snapshot['used'][slot] = 0
+            else:
+                snapshot[slot] = record[0]
+        selected = snapshot['used'] == 1
+        for field, value in (('status', status), ('airline', airline), ('origin', origin),
+                             ('destination', destination)):
+            if value:
+                selected &= snapshot[field] == _text(value)
+        return _documents(snapshot[selected])
+
+    @property
+    def overflowed(self) -> bool:
+        """A flight did not fit (until a freed slot takes it in, or the next rebuild), so flights() misses some"""
+        return bool(self._header[_H_REJECTED])
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'capacity': self.capacity,
+            'flights': int(np.count_nonzero(self._records['used'])),
+            'bytes': len(self._mmap),
+            'generation': int(self._header[_H_GENERATION]),
+            'rejected': int(self._header[_H_REJECTED])
+        }
+
+    def close(self):
+        self._records = self._header = None
+        self._mmap.close()
+        os.close(self._fd)
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def live_state(storage: Storage = None) -> LiveStateTable:
+    """The table at LIVE_STATE_PATH, mapped once per process (None when LIVE_STATE_PATH is not set)"""
+    path = Config.LIVE_STATE_PATH
+    if not path:
+        return None
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = LiveStateTable(path, storage=storage)
+        return table
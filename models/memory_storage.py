@@ -0,0 +1,278 @@
+import sys
+import threading
+from copy import deepcopy
+from array import array
+from datetime import datetime
+from bson import ObjectId
+from models.storage import Storage, ROLLUP_KEYS, slice_flight_log
+from models.track_buffer import TrackBuffer
+#In-process storage engine. Each flight's positions are kept in timestamp order in a TrackBuffer
+#(a NumPy structured array), so latest / $lte lookups and range scans are binary searches instead
+#of index scans. Only the fields the API uses are kept per point: the position fields, timestamp
+#(naive UTC, as MongoDB hands it back) and receiver id / signal strength.
+
+class _Track:
+    """Positions of one flight, sorted by timestamp"""
+    __slots__ = ('flight_id', 'buffer', 'receivers', 'signals')
+
+    def __init__(self, flight_id: str):
+        self.flight_id = flight_id
+        self.buffer = TrackBuffer()
+        self.receivers = []        # interned receiver ids, parallel to the buffer
+        self.signals = array('f')  # signal strengths, parallel to the buffer
+
+    def insert(self, update: dict):
+        index = self.buffer.append(update['position'], update['timestamp'])
+        receiver = update.get('receiver') or {}
+        self.receivers.insert(index, sys.intern(str(receiver.get('id', ''))))
+        signal = receiver.get('signal_strength')
+        self.signals.insert(index, signal if isinstance(signal, (int, float)) else 1.0)  # null/missing: default
+
+    def update(self, index: int) -> dict:
+        """Rebuild the tracking update document stored at `index`"""
+        return {
+            'flight_id': self.flight_id,
+            'position': self.buffer.position(index).to_dict(),
+            'timestamp': self.buffer.timestamp(index),
+            'receiver': {'id': self.receivers[index], 'signal_strength': round(self.signals[index], 4)}
+        }
+
+    def updates(self, low: int, high: int) -> list:
+        return [self.update(index) for index in range(low, high)]
+
+class MemoryStorage(Storage):
+    """Storage kept entirely in this process (not shared between workers)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._flights = {}
+        self._tracks = {}
+        self._flight_logs = {}
+        self._rollups = {name: {} for name in ROLLUP_KEYS}
+        self._geofences = {}
+        self._geofence_events = []  # in insertion (roughly timestamp) order
+        self._archive_generation = 0
+        self._geofence_generation = 0
+        self._receivers = {}
+
+    @staticmethod
+    def _with_id(document: dict) -> dict:
+        document = dict(document)
+        document.setdefault('_id', ObjectId())
+        return document
+
+    # ---- Active flights ----
+    def get_flight(self, flight_id: str) -> dict:
+        flight = self._flights.get(flight_id)
+        return dict(flight) if flight else None
+
+    def find_flights(self, status: str = None, airline: str = None, origin: str = None,
+                     destination: str = None) -> list:
+        return [dict(flight) for flight in list(self._flights.values())
+                if (not status or flight.get('status') == status)
+                and (not airline or flight.get('airline') == airline)
+                and (not origin or (flight.get('origin') or {}).get('code') == origin)
+                and (not destination or (flight.get('destination') or {}).get('code') == destination)]
+
+    def find_flight_ids(self, status: str = None) -> list:
+        return [flight_id for flight_id, flight in list(self._flights.items())
+                if not status or flight.get('status') == status]
+
+    def upsert_flight(self, flight_id: str, fields: dict) -> None:
+        with self._lock:
+            flight = self._flights.get(flight_id)
+            if flight is None:
+                flight = self._flights[flight_id] = {'_id': ObjectId(), 'flight_id': flight_id}
+            flight.update(fields)
+
+    def update_current_position(self, flight_id: str, position: dict, timestamp: datetime,
+                                fields: dict = None) -> None:
+        with self._lock:
+            flight = self._flights.get(flight_id)
+            if flight is None:
+                flight = self._flights[flight_id] = {'_id': ObjectId(), 'flight_id': flight_id}
+            stored = flight.get('position_timestamp')
+            if stored is None or timestamp > stored:
+                flight['current_position'] = position
+                flight['position_timestamp'] = timestamp
+            flight.update(fields or {})
+
+    def delete_flight(self, flight_id: str) -> None:
+        with self._lock:
+            self._flights.pop(flight_id, None)
+            self._tracks.pop(flight_id, None)
+
+    # ---- Positions ----
+    def insert_position(self, update: dict) -> None:
+        with self._lock:
+            track = self._tracks.get(update['flight_id'])
+            if track is None:
+                track = self._tracks[update['flight_id']] = _Track(update['flight_id'])
+            track.insert(update)
+
+    def latest_position(self, flight_id: str, at: datetime = None) -> dict:
+        track = self._tracks.get(flight_id)
+        if not track:
+            return None
+        with self._lock:
+            index = len(track.buffer) - 1 if at is None else track.buffer.index_at(at)
+            return track.update(index) if index >= 0 else None
+
+    def recent_positions(self, flight_id: str, limit: int) -> list:
+        track = self._tracks.get(flight_id)
+        if not track or limit <= 0:
+            return []
+        with self._lock:
+            return track.updates(max(len(track.buffer) - limit, 0), len(track.buffer))
+
+    def position_range(self, flight_id: str, start: datetime = None, end: datetime = None) -> list:
+        track = self._tracks.get(flight_id)
+        if not track:
+            return []
+        with self._lock:
+            return track.updates(*track.buffer.index_range(start, end))
+
+    def track(self, flight_id: str, start: datetime = None, end: datetime = None,
+              last: int = None) -> TrackBuffer:
+        track = self._tracks.get(flight_id)
+        if not track:
+            return TrackBuffer(0)
+        with self._lock:
+            # Views of the flight's array: appends never touch them and late inserts reallocate
+            buffer = track.buffer.slice(start, end)
+            return buffer.tail(last) if last is not None else buffer
+
+    # ---- Archive ----
+    def archive_flight(self, flight_log: dict) -> None:
+        flight_log = self._with_id(flight_log)
+        with self._lock:
+            self._flight_logs.setdefault(flight_log['flight_id'], []).append(flight_log)
+            self.delete_flight(flight_log['flight_id'])
+
+    def get_flight_log(self, flight_id: str, start: datetime = None, end: datetime = None,
+                       offset: int = 0, limit: int = None, every: int = 1) -> dict:
+        logs = self._flight_logs.get(flight_id)
+        if not logs:
+            return None
+        return slice_flight_log(logs[0], start, end, offset, limit, every)
+
+    def find_recent_flight_logs(self, limit: int, since: datetime = None) -> list:
+        logs = [log for logs in list(self._flight_logs.values()) for log in logs
+                if not since or (log.get('completed_at') and log['completed_at'] >= since)]
+        logs.sort(key=lambda log: log.get('completed_at') or datetime.min, reverse=True)
+        return [{k: v for k, v in log.items() if k != 'tracking_path'} for log in logs[:limit]]
+
+    def iter_flight_logs(self):
+        with self._lock:
+            logs = [log for logs in self._flight_logs.values() for log in logs]
+        for log in logs:
+            log = dict(log)
+            log.pop('_id', None)
+            yield log
+
+    def archive_generation(self) -> int:
+        return self._archive_generation
+
+    def bump_archive_generation(self) -> int:
+        with self._lock:
+            self._archive_generation += 1
+            return self._archive_generation
+
+    # ---- Geofences ----
+    def upsert_geofence(self, fence: dict) -> None:
+        with self._lock:
+            self._geofences[fence['fence_id']] = dict(fence)
+
+    def delete_geofence(self, fence_id: str) -> bool:
+        with self._lock:
+            return self._geofences.pop(fence_id, None) is not None
+
+    def find_geofences(self) -> list:
+        return [dict(fence) for fence in list(self._geofences.values())]
+
+    def geofence_generation(self) -> int:
+        return self._geofence_generation
+
+    def bump_geofence_generation(self) -> int:
+        with self._lock:
+            self._geofence_generation += 1
+            return self._geofence_generation
+
+    def insert_geofence_event(self, event: dict) -> None:
+        with self._lock:
+            self._geofence_events.append(dict(event))
+
+    def find_geofence_events(self, flight_id: str = None, fence_id: str = None,
+                             start: datetime = None, end: datetime = None, limit: int = 1000) -> list:
+        events = [dict(event) for event in list(self._geofence_events)
+                  if (not flight_id or event['flight_id'] == flight_id)
+                  and (not fence_id or event['fence_id'] == fence_id)
+                  and (start is None or event['timestamp'] >= start)
+                  and (end is None or event['timestamp'] <= end)]
+        events.sort(key=lambda event: event['timestamp'], reverse=True)
+        return events[:limit]
+
+    # ---- Receivers ----
+    def flush_receiver_stats(self, deltas: list) -> None:
+        with self._lock:
+            for delta in deltas:
+                receiver = self._receivers.get(delta['receiver_id'])
+                if receiver is None:
+                    receiver = self._receivers[delta['receiver_id']] = {
+                        'receiver_id': delta['receiver_id'], 'first_seen': delta['first_seen'],
+                        'last_seen': delta['last_seen'], 'messages': 0,
+                        'signal': {'count': 0, 'sum': 0.0, 'sum_sq': 0.0, 'min': None, 'max': None, 'histogram': {}},
+                        'coverage': {}, 'hours': {}
+                    }
+                receiver['first_seen'] = min(receiver['first_seen'], delta['first_seen'])
+                receiver['last_seen'] = max(receiver['last_seen'], delta['last_seen'])
+                receiver['messages'] += delta['messages']
+                receiver['updated_at'] = datetime.utcnow()
+                signal, stored = delta['signal'], receiver['signal']
+                if signal['count']:
+                    for field in ('count', 'sum', 'sum_sq'):
+                        stored[field] += signal[field]
+                    stored['min'] = signal['min'] if stored['min'] is None else min(stored['min'], signal['min'])
+                    stored['max'] = signal['max'] if stored['max'] is None else max(stored['max'], signal['max'])
+                for bin_, count in signal['histogram'].items():
+                    stored['histogram'][bin_] = stored['histogram'].get(bin_, 0) + count
+                for cell, count in delta['coverage'].items():
+                    receiver['coverage'][cell] = receiver['coverage'].get(cell, 0) + count
+                for hour, bucket in delta['hours'].items():
+                    stored_hour = receiver['hours'].setdefault(hour, {'messages': 0, 'flights': []})
+                    stored_hour['messages'] += bucket['messages']
+                    stored_hour['flights'] = sorted(set(stored_hour['flights']).union(bucket['flights']))
+                for hour in delta['expire_hours']:
+                    receiver['hours'].pop(hour, None)
+
+    def find_receivers(self) -> list:
+        return [deepcopy(receiver) for receiver in list(self._receivers.values())]
+
+    def get_receiver(self, receiver_id: str) -> dict:
+        receiver = self._receivers.get(receiver_id)
+        return deepcopy(receiver) if receiver else None
+
+    # ---- Rollups ----
+    def _rollup_key(self, name: str, document: dict) -> tuple:
+        return tuple(document.get(field) for field in ROLLUP_KEYS[name])
+
+    def increment_rollup(self, name: str, key: dict, increments: dict, updated_at: datetime) -> None:
+        with self._lock:
+            rollup = self._rollups[name].setdefault(self._rollup_key(name, key), dict(key))
+            for field, value in increments.items():
+                rollup[field] = rollup.get(field, 0) + value
+            rollup['updated_at'] = updated_at
+
+    def find_rollups(self, name: str, match: dict = None) -> list:
+        match = match or {}
+        return [dict(rollup) for rollup in list(self._rollups[name].values())
+                if all(rollup.get(field) == value for field, value in match.items())]
+
+    def find_hourly_rollups(self, start: datetime, end: datetime) -> list:
+        rollups = [dict(rollup) for rollup in list(self._rollups['hourly'].values())
+                   if start <= rollup['hour'] <= end]
+        return sorted(rollups, key=lambda rollup: rollup['hour'])
+
+    def replace_rollups(self, name: str, documents: list) -> None:
+        with self._lock:
+            self._rollups[name] = {self._rollup_key(name, doc): dict(doc) for doc in documents}
@@ -0,0 +1,197 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from operator import itemgetter
+from config import Config
+from models.track_buffer import TrackBuffer
+#storage.py defines the operations the services need from the database, so they do not depend on
+#MongoDB directly. MongoStorage (models/database.py) is the production backend; MemoryStorage
+#(models/memory_storage.py) keeps everything in-process for tests, benchmarks and small deployments.
+
+# Rollup names -> key fields (see services/analytics_service.py)
+ROLLUP_KEYS = {
+    'airline': ('airline',),
+    'route': ('origin', 'destination'),
+    'hourly': ('hour',),
+}
+
+def slice_flight_log(log: dict, start: datetime = None, end: datetime = None,
+                     offset: int = 0, limit: int = None, every: int = 1) -> dict:
+    """Copy of a full flight log cut down as Storage.get_flight_log describes"""
+    log = dict(log)
+    # tracking_path is in timestamp order, so the window is two binary searches
+    path = log.get('tracking_path') or []
+    key = itemgetter('timestamp')
+    low = bisect_left(path, start, key=key) if start is not None else 0
+    high = bisect_right(path, end, key=key) if end is not None else len(path)
+    indices = range(low, max(low, high), every)
+    log['tracking_path_count'] = len(indices)
+    indices = indices[offset:offset + limit if limit is not None else None]
+    log['tracking_path'] = [path[i] for i in indices]
+    return log
+
+class Storage(ABC):
+    # ---- Active flights ----
+    @abstractmethod
+    def get_flight(self, flight_id: str) -> dict:
+        """Active flight document, or None"""
+
+    @abstractmethod
+    def find_flights(self, status: str = None, airline: str = None, origin: str = None,
+                     destination: str = None) -> list:
+        """Active flight documents, optionally only those with `status`, `airline` and
+        origin/destination airport codes"""
+
+    @abstractmethod
+    def find_flight_ids(self, status: str = None) -> list:
+        """flight_ids of the active flight documents, optionally only those with `status`"""
+
+    @abstractmethod
+    def upsert_flight(self, flight_id: str, fields: dict) -> None:
+        """Set `fields` on the flight, creating it if needed"""
+
+    @abstractmethod
+    def update_current_position(self, flight_id: str, position: dict, timestamp: datetime,
+                                fields: dict = None) -> None:
+        """Set current_position/position_timestamp unless the stored position is newer
+
+        `fields` are set either way, and the flight is created if needed. The comparison happens
+        in the same atomic write, so concurrent writers cannot replace a newer position.
+        """
+
+    @abstractmethod
+    def delete_flight(self, flight_id: str) -> None:
+        """Remove the flight and its positions without archiving it"""
+
+    # ---- Positions (tracking updates) ----
+    @abstractmethod
+    def insert_position(self, update: dict) -> None:
+        """Store one tracking update ({'flight_id', 'position', 'timestamp', ...})"""
+
+    @abstractmethod
+    def latest_position(self, flight_id: str, at: datetime = None) -> dict:
+        """Newest update with timestamp <= `at` (or the newest overall), or None"""
+
+    @abstractmethod
+    def recent_positions(self, flight_id: str, limit: int) -> list:
+        """The newest `limit` updates, oldest first"""
+
+    @abstractmethod
+    def position_range(self, flight_id: str, start: datetime = None, end: datetime = None) -> list:
+        """Updates with start <= timestamp <= end, oldest first"""
+
+    @abstractmethod
+    def track(self, flight_id: str, start: datetime = None, end: datetime = None,
+              last: int = None) -> TrackBuffer:
+        """Positions as a TrackBuffer: start <= timestamp <= end, or only the newest `last`"""
+
+    # ---- Archive (flight logs) ----
+    @abstractmethod
+    def archive_flight(self, flight_log: dict) -> None:
+        """Store the flight log and remove the active flight and its positions"""
+
+    @abstractmethod
+    def get_flight_log(self, flight_id: str, start: datetime = None, end: datetime = None,
+                       offset: int = 0, limit: int = None, every: int = 1) -> dict:
+        """Archived flight log, or None, with only part of tracking_path
+
+        Keeps the points with start <= timestamp <= end, then every `every`-th of those, then
+        `limit` of them from `offset`. tracking_path_count is the number of points before offset/limit.
+        """
+
+    @abstractmethod
+    def find_recent_flight_logs(self, limit: int, since: datetime = None) -> list:
+        """The `limit` most recently completed flight logs (completed at or after `since`), newest
+        first, without tracking_path"""
+
+    @abstractmethod
+    def iter_flight_logs(self):
+        """Every archived flight log (for backfills)"""
+
+    @abstractmethod
+    def archive_generation(self) -> int:
+        """Counter bumped whenever archived flight logs are rewritten in place (migrations)"""
+
+    @abstractmethod
+    def bump_archive_generation(self) -> int:
+        """Increment archive_generation, telling every process to drop cached flight logs"""
+
+    # ---- Geofences ----
+    @abstractmethod
+    def upsert_geofence(self, fence: dict) -> None:
+        """Create or replace the geofence with fence['fence_id']"""
+
+    @abstractmethod
+    def delete_geofence(self, fence_id: str) -> bool:
+        """Remove a geofence, returning whether it existed"""
+
+    @abstractmethod
+    def find_geofences(self) -> list:
+        """Every geofence document"""
+
+    @abstractmethod
+    def geofence_generation(self) -> int:
+        """Counter bumped whenever a geofence is created, replaced or deleted"""
+
+    @abstractmethod
+    def bump_geofence_generation(self) -> int:
+        """Increment geofence_generation, telling every process to reload its fences"""
+
+    @abstractmethod
+    def insert_geofence_event(self, event: dict) -> None:
+        """Store one entry/exit event ({'flight_id', 'fence_id', 'event', 'timestamp', ...})"""
+
+    @abstractmethod
+    def find_geofence_events(self, flight_id: str = None, fence_id: str = None,
+                             start: datetime = None, end: datetime = None, limit: int = 1000) -> list:
+        """Matching events with start <= timestamp <= end, newest first"""
+
+    # ---- Receivers ----
+    @abstractmethod
+    def flush_receiver_stats(self, deltas: list) -> None:
+        """Merge receiver rollup deltas (see services/receiver_service.py) in one bulk write"""
+
+    @abstractmethod
+    def find_receivers(self) -> list:
+        """Every receiver rollup document"""
+
+    @abstractmethod
+    def get_receiver(self, receiver_id: str) -> dict:
+        """Receiver rollup document, or None"""
+
+    # ---- Rollups ----
+    @abstractmethod
+    def increment_rollup(self, name: str, key: dict, increments: dict, updated_at: datetime) -> None:
+        """Add `increments` to the rollup document identified by `key`, creating it if needed"""
+
+    @abstractmethod
+    def find_rollups(self, name: str, match: dict = None) -> list:
+        """Rollup documents whose key fields equal `match`"""
+
+    @abstractmethod
+    def find_hourly_rollups(self, start: datetime, end: datetime) -> list:
+        """Hourly rollups with start <= hour <= end, oldest first"""
+
+    @abstractmethod
+    def replace_rollups(self, name: str, documents: list) -> None:
+        """Replace every rollup document of `name` (used by rebuilds)"""
+
+_storage = None
+
+def create_storage(backend: str = None) -> Storage:
+    """Storage for STORAGE_BACKEND ('mongo' or 'memory')"""
+    backend = backend or Config.STORAGE_BACKEND
+    if backend == 'memory':
+        from models.memory_storage import MemoryStorage
+        return MemoryStorage()
+    if backend == 'mongo':
+        from models.database import MongoStorage
+        return MongoStorage()
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+def get_storage() -> Storage:
+    """The shared storage instance, created on first use"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
@@ -0,0 +1,162 @@
+from datetime import datetime
+import numpy as np
+from models.flight_models import Position
+from utils.helpers import to_utc_naive
+#TrackBuffer holds one flight's points in a NumPy structured array (40 bytes per point instead of
+#a dict per point), kept in timestamp order so time slices are binary searches and views.
+
+TRACK_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[us]'),  # naive UTC
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('altitude', 'f4'),
+    ('heading', 'f4'),
+    ('speed', 'f4'),
+    ('vertical_rate', 'f4'),
+])
+POSITION_FIELDS = ('latitude', 'longitude', 'altitude', 'heading', 'speed', 'vertical_rate')
+_FLOAT32_FIELDS = ('altitude', 'heading', 'speed', 'vertical_rate')
+
+def _datetime64(value) -> np.datetime64:
+    return np.datetime64(to_utc_naive(value), 'us')
+
+def _scalar(field: str, value):
+    value = float(value)
+    if field in _FLOAT32_FIELDS:
+        value = round(value, 4)
+    return None if value != value else value
+
+def _column(values) -> list:
+    """Column as Python values; float32 columns are rounded back to what was stored, NaN -> None"""
+    if values.dtype == np.float32:
+        values = values.astype('f8').round(4)
+    return [None if v != v else v for v in values.tolist()]
+
+class TrackBuffer:
+    __slots__ = ('_data', '_size')
+
+    def __init__(self, capacity: int = 16):
+        self._data = np.empty(max(capacity, 1), dtype=TRACK_DTYPE)
+        self._size = 0
+
+    @classmethod
+    def from_array(cls, data: np.ndarray) -> 'TrackBuffer':
+        """Wrap an existing (timestamp-sorted) array without copying it"""
+        buffer = cls.__new__(cls)
+        buffer._data = data
+        buffer._size = len(data)
+        return buffer
+
+    @classmethod
+    def from_updates(cls, updates) -> 'TrackBuffer':
+        """Build from tracking update documents ({'position': {...}, 'timestamp': ...})"""
+        updates = list(updates)
+        buffer = cls(len(updates))
+        for update in updates:
+            buffer.append(update['position'], update['timestamp'])
+        return buffer
+
+    @classmethod
+    def from_records(cls, points) -> 'TrackBuffer':
+        """Build from flat points ({'latitude', ..., 'timestamp'}), e.g. a flight log's tracking_path"""
+        points = list(points)
+        buffer = cls(len(points))
+        for point in points:
+            buffer.append(point, point['timestamp'])
+        return buffer
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def data(self) -> np.ndarray:
+        """The points as a structured array (a view, do not modify)"""
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def append(self, position, timestamp) -> int:
+        """Add a point, keeping timestamp order, and return its index
+
+        `position` is a Position or a dict with the POSITION_FIELDS (missing ones become NaN).
+        """
+        if isinstance(position, Position):
+            position = position.to_dict()
+        row = (_datetime64(timestamp),) + tuple(
+            np.nan if position.get(field) is None else position[field] for field in POSITION_FIELDS
+        )
+
+        if self._size and row[0] < self._data[self._size - 1]['timestamp']:
+            # Late arrival: shift the newer points up (rare, so the copy is acceptable)
+            index = int(np.searchsorted(self.data['timestamp'], row[0], side='right'))
+            self._data = np.insert(self.data, index, np.array(row, dtype=TRACK_DTYPE))
+            self._size += 1
+            return index
+
+        if self._size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=TRACK_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = row
+        self._size += 1
+        return self._size - 1
+
+    def index_at(self, at) -> int:
+        """Index of the newest point with timestamp <= `at`, or -1"""
+        return int(np.searchsorted(self.data['timestamp'], _datetime64(at), side='right')) - 1
+
+    def index_range(self, start=None, end=None) -> tuple:
+        """(low, high) such that data[low:high] has start <= timestamp <= end"""
+        timestamps = self.data['timestamp']
+        low = int(np.searchsorted(timestamps, _datetime64(start), side='left')) if start is not None else 0
+        high = int(np.searchsorted(timestamps, _datetime64(end), side='right')) if end is not None else self._size
+        return low, max(low, high)
+
+    def slice(self, start=None, end=None) -> 'TrackBuffer':
+        """Points with start <= timestamp <= end, as a view"""
+        low, high = self.index_range(start, end)
+        return TrackBuffer.from_array(self.data[low:high])
+
+    def tail(self, count: int) -> 'TrackBuffer':
+        """The newest `count` points, as a view"""
+        return TrackBuffer.from_array(self.data[max(self._size - count, 0):] if count > 0 else self.data[:0])
+
+    def timestamp(self, index: int) -> datetime:
+        return self.data['timestamp'][index].item()
+
+    def position(self, index: int) -> Position:
+        row = self.data[index]
+        return Position(**{field: _scalar(field, row[field]) for field in POSITION_FIELDS})
+
+    def timestamps(self) -> list:
+        return self.data['timestamp'].tolist()
+
+    def to_records(self, fields: tuple = POSITION_FIELDS) -> list:
+        """Flat point dicts with `fields` and 'timestamp' (the flight_logs tracking_path shape)"""
+        columns = {field: _column(self.data[field]) for field in fields}
+        columns['timestamp'] = self.timestamps()
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    def coordinates(self, altitude: bool = True) -> np.ndarray:
+        """[[lon, lat(, alt)], ...] as a float array (GeoJSON axis order)"""
+        fields = ['longitude', 'latitude'] + (['altitude'] if altitude else [])
+        return np.column_stack([self.data[field].astype('f8') for field in fields])
+
+    def bounds(self) -> list:
+        """[[min lon, min lat], [max lon, max lat]]"""
+        lons, lats = self.data['longitude'], self.data['latitude']
+        return [[float(lons.min()), float(lats.min())], [float(lons.max()), float(lats.max())]]
+
+    def to_geojson(self, properties: dict = None, precision: int = None) -> dict:
+        """The track as a GeoJSON LineString feature (coordinates rounded to `precision` decimals)"""
+        coordinates = self.coordinates()
+        if precision is not None:
+            coordinates = coordinates.round(precision)
+        return {
+            'type': 'Feature',
+            'geometry': {'type': 'LineString', 'coordinates': coordinates.tolist()},
+            'properties': properties or {}
+        }
@@ -0,0 +1,21 @@
+from flask import Blueprint, request, jsonify
+from services.proximity_service import proximity_engine
+
+#Proximity alerts raised by services.proximity_service (also pushed on /api/live as 'alert' events).
+alert_bp = Blueprint('alerts', __name__)
+
+@alert_bp.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """Active proximity alerts, optionally only those involving ?flight_id="""
+    try:
+        alerts = proximity_engine.get_alerts(request.args.get('flight_id'))
+        return jsonify({
+            'alerts': alerts,
+            'count': len(alerts),
+            'thresholds': {
+                'horizontal_nm': proximity_engine.horizontal_nm,
+                'vertical_ft': proximity_engine.vertical_ft
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,44 @@
+from flask import Blueprint, request, jsonify
+from services.analytics_service import AnalyticsService
+from utils.helpers import parse_iso_timestamp
+
+#Analytics endpoints. They only read the materialized rollup collections, never flight_logs.
+analytics_bp = Blueprint('analytics', __name__)
+analytics_service = AnalyticsService()
+
+@analytics_bp.route('/api/analytics/airlines', methods=['GET'])
+def airline_analytics():
+    """Flight count, average block time, distance and delay per airline"""
+    try:
+        rollups = analytics_service.get_airline_rollups(request.args.get('airline'))
+        return jsonify({'airlines': rollups})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/api/analytics/routes', methods=['GET'])
+def route_analytics():
+    """Flight count, average block time, distance and delay per origin -> destination"""
+    try:
+        rollups = analytics_service.get_route_rollups(
+            request.args.get('origin'), request.args.get('destination')
+        )
+        return jsonify({'routes': rollups})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/api/analytics/hourly', methods=['GET'])
+def hourly_analytics():
+    """Per-hour figures, optionally between ?from= and ?to= (ISO timestamps)"""
+    try:
+        start = request.args.get('from')
+        end = request.args.get('to')
+        try:
+            start = parse_iso_timestamp(start) if start else None
+            end = parse_iso_timestamp(end) if end else None
+        except ValueError:
+            return jsonify({'error': 'from/to must be ISO timestamps'}), 400
+
+        rollups = analytics_service.get_hourly_rollups(start, end)
+        return jsonify({'hours': rollups})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
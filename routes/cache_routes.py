@@ -0,0 +1,25 @@
+from flask import Blueprint, request, jsonify
+from services.flight_log_cache import flight_log_cache
+from utils.profiling import ADMIN_SIGNATURE_HEADER, signed_path, verify_signature
+
+#Admin endpoints for the flight log cache of this process. Callers sign "METHOD /path?query" in the
+#'admin' scope (`flask sign-request --admin`) and send it in X-Admin-Signature; profile signatures
+#are not accepted here, and these requests are never profiled.
+cache_bp = Blueprint('cache', __name__)
+
+@cache_bp.before_request
+def require_signature():
+    if not verify_signature(request.method, signed_path(request), request.headers.get(ADMIN_SIGNATURE_HEADER),
+                            scope='admin'):
+        return jsonify({'error': 'Invalid or missing admin signature'}), 403
+
+@cache_bp.route('/admin/cache/flight-logs', methods=['GET'])
+def get_flight_log_cache():
+    """Hit/miss counts and byte usage"""
+    return jsonify(flight_log_cache().stats())
+
+@cache_bp.route('/admin/cache/flight-logs', methods=['DELETE'])
+def invalidate_flight_log_cache():
+    """Drop one flight's cached log (?flight_id=) or all of them, in this process only"""
+    flight_log_cache().invalidate(request.args.get('flight_id'))
+    return jsonify(flight_log_cache().stats())
@@ -0,0 +1,50 @@
+import gzip
+import hashlib
+import json
+from flask import Blueprint, Response, request, jsonify
+from config import Config
+from services.flight_service import FlightService
+from services.visualization_service import VisualizationService
+
+#GeoJSON feeds behind the map pages. Bodies are compact, gzip-compressed when the client accepts it
+#and carry an ETag, so a poll that finds nothing new is answered with an empty 304.
+feed_bp = Blueprint('feeds', __name__)
+flight_service = FlightService()
+visualization_service = VisualizationService()
+
+def _geojson_response(document: dict, cache_control: str) -> Response:
+    body = json.dumps(document, separators=(',', ':'), default=str).encode()
+    compress = 'gzip' in request.accept_encodings
+    # Each encoding is its own representation, so it gets its own ETag
+    etag = hashlib.sha1(body).hexdigest() + ('-gz' if compress else '')
+    headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if etag in request.if_none_match:
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+    if compress:
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    response = Response(body, mimetype='application/geo+json', headers=headers)
+    response.set_etag(etag)
+    return response
+
+@feed_bp.route('/api/feeds/flights.geojson', methods=['GET'])
+def flights_feed():
+    """Current positions of the active flights (revalidated on every poll)"""
+    try:
+        feed = visualization_service.flights_feed(flight_service.get_flights('active', compact=True))
+        return _geojson_response(feed, 'no-cache')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@feed_bp.route('/api/feeds/flights/<flight_id>/path.geojson', methods=['GET'])
+def flight_path_feed(flight_id):
+    """Archived path of a completed flight"""
+    try:
+        feed = visualization_service.flight_path_feed(flight_id)
+        return _geojson_response(feed, f'public, max-age={Config.MAP_PATH_FEED_MAX_AGE}')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
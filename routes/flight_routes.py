@@ -1,9 +1,10 @@
-from flask import Blueprint, request, jsonify, render_template
-from models.database import db
+from flask import Blueprint, request, jsonify, render_template, current_app, make_response, url_for
 from services.flight_service import FlightService
 from services.visualization_service import VisualizationService
 from config import Config  # Add this import
 from bson.json_util import dumps
+from utils.helpers import to_utc_naive
+from utils.profiling import phase
 
 #Defining different API endpoints (routes) that handle all 
 # the flight-related requests — like getting all flights,
@@ -17,11 +18,40 @@ visualization_service = VisualizationService()
 #Defines a GET API endpoint /api/flights to get flight data.
 @flight_bp.route('/api/flights', methods=['GET'])
 def get_all_flights():
-    """Get all active flights"""
+    """Get all active flights (?status=, ?airline=, ?origin=, ?destination= airport codes;
+    ?compact=true reads the live-state table)"""
     try:
         status_filter = request.args.get('status') #reads from the query
-        flights = flight_service.get_flights(status_filter) #gets the flight through the query
-        return dumps({"flights": flights}), 200, {'Content-Type': 'application/json'} # converts to json 
+        compact = request.args.get('compact', 'false').lower() == 'true'
+        flights = flight_service.get_flights(status_filter, request.args.get('airline'),
+                                             request.args.get('origin'), request.args.get('destination'),
+                                             compact)
+        with phase('serialization'):
+            return dumps({"flights": flights}), 200, {'Content-Type': 'application/json'} # converts to json 
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@flight_bp.route('/api/search', methods=['GET'])
+def search_flights():
+    """Typeahead: ?q= prefix of a flight id/number, airline, registration or airport code
+    (?status=, ?airline=, ?origin=, ?destination=, ?limit=)"""
+    try:
+        with phase('validation'):
+            query = request.args.get('q', '').strip()
+            if not query:
+                return jsonify({'error': 'q is required'}), 400
+            try:
+                limit = int(request.args.get('limit', Config.SEARCH_DEFAULT_LIMIT))
+            except ValueError:
+                return jsonify({'error': 'limit must be an integer'}), 400
+            if not 1 <= limit <= Config.SEARCH_MAX_LIMIT:
+                return jsonify({'error': f'limit must be between 1 and {Config.SEARCH_MAX_LIMIT}'}), 400
+        
+        found = flight_service.search_flights(
+            query, limit, status=request.args.get('status'), airline=request.args.get('airline'),
+            origin=request.args.get('origin'), destination=request.args.get('destination'))
+        return jsonify({'query': query, 'results': found['results'], 'count': len(found['results']),
+                        'truncated': found['truncated']})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -37,13 +67,53 @@ def complete_flight(flight_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _history_window(args) -> dict:
+    """from/to/offset/limit/every query parameters (raises ValueError with a message for a 400)"""
+    def integer(name: str, default, minimum: int):
+        if name not in args:
+            return default
+        try:
+            value = int(args[name])
+        except ValueError:
+            raise ValueError(f'{name} must be an integer')
+        if value < minimum:
+            raise ValueError(f'{name} must be at least {minimum}')
+        return value
+    
+    try:
+        start = to_utc_naive(args.get('from'))
+        end = to_utc_naive(args.get('to'))
+    except ValueError:
+        raise ValueError('from/to must be ISO timestamps')
+    if start and end and start > end:
+        raise ValueError('from must not be after to')
+    return {
+        'start': start,
+        'end': end,
+        'offset': integer('offset', 0, 0),
+        'limit': integer('limit', None, 1),
+        'every': integer('every', 1, 1)
+    }
+
 # get flight history
 @flight_bp.route('/api/flights/<flight_id>/history', methods=['GET'])
 def get_flight_history(flight_id):
-    """Get complete flight path from logs"""
+    """Get the flight path from logs (?from=&to= time window, ?every=N points, ?offset=&limit=)"""
     try:
-        history = flight_service.get_flight_history(flight_id)
-        return jsonify(history)
+        with phase('validation'):
+            try:
+                window = _history_window(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        if not request.args:
+            # The full history of a completed flight never changes: serve the cached body
+            body = flight_service.get_flight_history_body(flight_id, lambda log: current_app.json.dumps(log).encode())
+            return body, 200, {'Content-Type': 'application/json'}
+        
+        history = flight_service.get_flight_history(flight_id, **window)
+        with phase('serialization'):
+            return jsonify(history)
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
@@ -56,10 +126,11 @@ def visualize_flight(flight_id):
     try:
         map_type = request.args.get('map_type', 'mapbox')
         
-        if map_type == 'mapbox':
-            result = visualization_service.create_mapbox_map(flight_id, 'static/maps')
-        else:
-            result = visualization_service.plot_flight_path(flight_id, 'static/maps')
+        with phase('rendering'):
+            if map_type == 'mapbox':
+                result = visualization_service.create_mapbox_map(flight_id, 'static/maps')
+            else:
+                result = visualization_service.plot_flight_path(flight_id, 'static/maps')
         
         return jsonify(result)
     except ValueError as e:
@@ -67,17 +138,37 @@ def visualize_flight(flight_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _map_page(template: str, feed_url: str, **context):
+    """A map page: static apart from its settings, so browsers and proxies may keep it"""
+    map_config = {
+        'mapbox_enabled': visualization_service.mapbox_enabled,
+        'mapbox_token': Config.MAPBOX_ACCESS_TOKEN,
+        'mapbox_style': Config.MAPBOX_STYLE,
+        'feed_url': feed_url,
+        'projection_url': url_for('tracking.get_extrapolated_positions'),
+        'refresh_seconds': Config.MAP_REFRESH_SECONDS
+    }
+    response = make_response(render_template(template, map_config=map_config,
+                                             mapbox_enabled=visualization_service.mapbox_enabled, **context))
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.MAP_SHELL_MAX_AGE
+    return response
+
 @flight_bp.route('/flight/map', methods=['GET'])
 def flight_map():
-    """Serve real-time flight tracking map"""
-    return render_template('flight_map.html', 
-                         mapbox_token=Config.MAPBOX_ACCESS_TOKEN,  # Now Config is defined
-                         mapbox_enabled=visualization_service.mapbox_enabled)
+    """Serve real-time flight tracking map (positions come from /api/feeds/flights.geojson)"""
+    return _map_page('flight_map.html', url_for('feeds.flights_feed'))
+
+@flight_bp.route('/flight/<flight_id>/path-map', methods=['GET'])
+def flight_path_map(flight_id):
+    """Serve the archived path map of a completed flight"""
+    return _map_page('flight_path_map.html', url_for('feeds.flight_path_feed', flight_id=flight_id),
+                     flight_id=flight_id)
 
 @flight_bp.route('/flight/<flight_id>/map', methods=['GET'])
 def individual_flight_map(flight_id):
     """Serve individual flight tracking page"""
-    flight = db.flights.find_one({'flight_id': flight_id})
+    flight = flight_service.storage.get_flight(flight_id)
     if not flight:
         return jsonify({'error': 'Flight not found'}), 404
     
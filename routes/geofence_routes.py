@@ -0,0 +1,55 @@
+from flask import Blueprint, request, jsonify
+from services.geofence_service import GeofenceService
+from utils.helpers import to_utc_naive
+from utils.validators import validate_geofence_data
+
+#Geofence management and the entry/exit/arrival events recorded by the ingest path.
+geofence_bp = Blueprint('geofences', __name__)
+geofence_service = GeofenceService()
+
+@geofence_bp.route('/api/geofences', methods=['GET'])
+def get_geofences():
+    """All geofences, including the airport fences added automatically"""
+    try:
+        return jsonify({'geofences': geofence_service.get_fences()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geofence_bp.route('/api/geofences', methods=['POST'])
+def create_geofence():
+    """Create or replace a circle or polygon fence"""
+    try:
+        data = request.get_json(silent=True)
+        validation_error = validate_geofence_data(data)
+        if validation_error:
+            return jsonify({'error': validation_error}), 400
+        return jsonify(geofence_service.create_fence(data)), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geofence_bp.route('/api/geofences/<fence_id>', methods=['DELETE'])
+def delete_geofence(fence_id):
+    try:
+        geofence_service.delete_fence(fence_id)
+        return jsonify({'status': 'success', 'message': f'Geofence {fence_id} deleted'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geofence_bp.route('/api/geofences/events', methods=['GET'])
+def get_geofence_events():
+    """Entry/exit/arrival events, newest first (?flight_id=, ?fence_id=, ?from=, ?to=, ?limit=)"""
+    try:
+        try:
+            start = to_utc_naive(request.args.get('from'))
+            end = to_utc_naive(request.args.get('to'))
+            limit = int(request.args['limit']) if 'limit' in request.args else None
+        except ValueError:
+            return jsonify({'error': 'from/to must be ISO timestamps and limit an integer'}), 400
+
+        events = geofence_service.get_events(request.args.get('flight_id'), request.args.get('fence_id'),
+                                             start, end, limit)
+        return jsonify({'events': events})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
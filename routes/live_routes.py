@@ -0,0 +1,30 @@
+from flask import Blueprint, Response, request, stream_with_context
+from config import Config
+from services.live_feed import live_feed, format_sse
+from utils.metrics import LIVE_SUBSCRIBERS
+
+#Live push channel: Server-Sent Events for positions and proximity alerts, e.g.
+#  new EventSource('/api/live?events=alert,alert_cleared')
+live_bp = Blueprint('live', __name__)
+
+@live_bp.route('/api/live', methods=['GET'])
+def live_events():
+    """Stream 'position', 'alert', 'alert_cleared' and 'geofence' events (all unless ?events= narrows them)"""
+    events = [e for e in request.args.get('events', '').split(',') if e]
+    # Subscribe before returning, so nothing published after this request is missed
+    subscription = live_feed.subscribe(events)
+    LIVE_SUBSCRIBERS.inc()
+
+    def stream():
+        try:
+            yield ': connected\n\n'
+            while True:
+                message = subscription.get(timeout=Config.LIVE_HEARTBEAT_SECONDS)
+                # A comment line keeps proxies from closing an idle connection
+                yield format_sse(*message) if message else ': heartbeat\n\n'
+        finally:
+            live_feed.unsubscribe(subscription)
+            LIVE_SUBSCRIBERS.dec()
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -0,0 +1,9 @@
+from flask import Blueprint
+from utils.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, MongoDB, ingest and render metrics in Prometheus text format"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,35 @@
+import os
+from flask import Blueprint, request, jsonify, send_from_directory
+from config import Config
+from utils.profiling import SIGNATURE_HEADER, signed_path, verify_signature, list_profiles
+
+#Admin endpoints for profiles captured by utils.profiling. Callers sign "METHOD /path?query" with
+#SECRET_KEY and the current time (see `flask sign-request`) and send it in X-Profile-Signature.
+profiling_bp = Blueprint('profiling', __name__)
+
+@profiling_bp.before_request
+def require_signature():
+    if not verify_signature(request.method, signed_path(request), request.headers.get(SIGNATURE_HEADER)):
+        return jsonify({'error': 'Invalid or missing profile signature'}), 403
+
+@profiling_bp.route('/admin/profiles', methods=['GET'])
+def get_profiles():
+    """List retained profiles, newest first"""
+    return jsonify({'profiles': list_profiles()})
+
+@profiling_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Summary (per-phase breakdown) of one profile"""
+    for summary in list_profiles():
+        if summary['id'] == profile_id:
+            return jsonify(summary)
+    return jsonify({'error': 'Profile not found'}), 404
+
+@profiling_bp.route('/admin/profiles/<profile_id>/download', methods=['GET'])
+def download_profile(profile_id):
+    """The raw .pstats or .folded file"""
+    for extension in ('pstats', 'folded'):
+        filename = f'{profile_id}.{extension}'
+        if os.path.exists(os.path.join(Config.PROFILING_DIR, filename)):
+            return send_from_directory(os.path.abspath(Config.PROFILING_DIR), filename, as_attachment=True)
+    return jsonify({'error': 'Profile not found'}), 404
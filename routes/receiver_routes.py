@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify
+from services.receiver_service import ReceiverService
+
+#Receiver health and coverage, from the rollups the ingest path maintains (never tracking_updates).
+receiver_bp = Blueprint('receivers', __name__)
+receiver_service = ReceiverService()
+
+@receiver_bp.route('/api/receivers', methods=['GET'])
+def get_receivers():
+    """Every receiver: last seen, message rate, flights heard, mean signal"""
+    try:
+        receivers = receiver_service.get_receivers()
+        return jsonify({'receivers': receivers, 'count': len(receivers)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@receiver_bp.route('/api/receivers/<receiver_id>', methods=['GET'])
+def get_receiver(receiver_id):
+    """One receiver with its signal distribution, coverage grid and hourly activity"""
+    try:
+        return jsonify(receiver_service.get_receiver(receiver_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
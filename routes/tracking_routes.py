@@ -1,10 +1,17 @@
+import queue
 from flask import Blueprint, request, jsonify
-from models.database import db
+from config import Config
+from services.ingest_workers import IngestPool
 from services.tracking_service import TrackingService
+from utils.helpers import to_utc_naive
 from utils.validators import validate_tracking_data
+from utils.profiling import phase
 
 tracking_bp = Blueprint('tracking', __name__)
 tracking_service = TrackingService()
+# With INGEST_WORKERS the web process only validates and queues; workers start on the first update
+ingest_pool = (IngestPool(Config.INGEST_WORKERS, publish=tracking_service.publish_tracking_update)
+               if Config.INGEST_WORKERS else None)
 
 @tracking_bp.route('/api/tracking/update', methods=['POST'])
 def tracking_update():
@@ -13,37 +20,82 @@ def tracking_update():
         data = request.get_json()
         
         # Validate input data
-        validation_error = validate_tracking_data(data)
+        with phase('validation'):
+            validation_error = validate_tracking_data(data)
         if validation_error:
             return jsonify({'error': validation_error}), 400
         
+        if ingest_pool:
+            try:
+                ingest_pool.submit(data)
+            except queue.Full:
+                return jsonify({'error': 'Ingestion is backed up, retry later'}), 503
+            return jsonify({
+                'status': 'success',
+                'message': 'Tracking data queued',
+                'flight_id': data['flight_id'],
+                'timestamp': data['timestamp']
+            }), 202
+        
         # Process tracking data
         result = tracking_service.process_tracking_update(data)
         
-        return jsonify({
-            'status': 'success',
-            'message': 'Tracking data received',
-            'flight_id': data['flight_id'],
-            'timestamp': data['timestamp']
-        })
+        with phase('serialization'):
+            return jsonify({
+                'status': 'success',
+                'message': 'Tracking data received',
+                'flight_id': data['flight_id'],
+                'timestamp': data['timestamp']
+            })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @tracking_bp.route('/api/flights/<flight_id>/position', methods=['GET'])
 def get_flight_position(flight_id):
-    """Get flight position at specific time or latest"""
+    """Get flight position at specific time or latest (dead-reckoned to ?at=, default now;
+    ?compact=true reads the live-state table)"""
     try:
-        timestamp_str = request.args.get('timestamp')
-        include_path = request.args.get('include_path', 'false').lower() == 'true'
+        with phase('validation'):
+            timestamp_str = request.args.get('timestamp')
+            include_path = request.args.get('include_path', 'false').lower() == 'true'
+            compact = request.args.get('compact', 'false').lower() == 'true'
+            try:
+                at = to_utc_naive(request.args.get('at'))
+            except ValueError:
+                return jsonify({'error': 'at must be an ISO timestamp'}), 400
         
         position_data = tracking_service.get_flight_position(
-            flight_id, timestamp_str, include_path
+            flight_id, timestamp_str, include_path, at, compact
         )
         
-        return jsonify(position_data)
+        with phase('serialization'):
+            return jsonify(position_data)
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@tracking_bp.route('/api/positions/extrapolated', methods=['GET'])
+def get_extrapolated_positions():
+    """Dead-reckoned positions of every active flight at ?at= (default now), with confidence bounds"""
+    try:
+        try:
+            at = to_utc_naive(request.args.get('at'))
+        except ValueError:
+            return jsonify({'error': 'at must be an ISO timestamp'}), 400
+        
+        positions = tracking_service.get_extrapolated_positions(at)
+        with phase('serialization'):
+            return jsonify(positions)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tracking_bp.route('/api/positions/extrapolated/drift', methods=['GET'])
+def get_extrapolation_drift():
+    """Measured error of dead-reckoned positions against the reports that followed"""
+    try:
+        return jsonify(tracking_service.get_extrapolation_drift())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
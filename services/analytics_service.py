@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from models.storage import Storage, ROLLUP_KEYS, get_storage
+from config import Config
+from utils.helpers import to_utc_naive, path_distance
+#analytics_service.py keeps per-airline, per-route and per-hour rollups of completed flights.
+#Each archived flight is folded into the rollups once (by complete_flight), so reading them
+#never touches flight_logs and costs the same no matter how much history there is.
+
+# Running totals kept in every rollup document; averages are total / count at read time
+ROLLUP_FIELDS = ('block_time', 'distance', 'delay')
+
+class AnalyticsService:
+    def __init__(self, storage: Storage = None):
+        self.storage = storage or get_storage()
+
+    def record_completed_flight(self, flight_log: dict) -> None:
+        """Fold one archived flight into the airline, route and hourly rollups"""
+        increments = self.flight_increments(flight_log)
+        now = datetime.utcnow()
+
+        for name, key in self._rollup_keys(flight_log):
+            self.storage.increment_rollup(name, key, increments, now)
+
+    def rebuild_rollups(self) -> dict:
+        """Recompute every rollup from flight_logs (for backfills or after a schema change)"""
+        totals = {}  # (rollup name, frozen key) -> increments
+
+        for flight_log in self.storage.iter_flight_logs():
+            increments = self.flight_increments(flight_log)
+            for name, key in self._rollup_keys(flight_log):
+                bucket = totals.setdefault((name, tuple(sorted(key.items()))), {})
+                for field, value in increments.items():
+                    bucket[field] = bucket.get(field, 0) + value
+
+        now = datetime.utcnow()
+        counts = {}
+        for rollup_name in ROLLUP_KEYS:
+            documents = [
+                {**dict(key), **increments, 'updated_at': now}
+                for (name, key), increments in totals.items()
+                if name == rollup_name
+            ]
+            self.storage.replace_rollups(rollup_name, documents)
+            counts[f'{rollup_name}_rollups'] = len(documents)
+
+        return counts
+
+    def get_airline_rollups(self, airline: str = None) -> list:
+        """Get per-airline figures"""
+        match = {'airline': airline} if airline else {}
+        return [self._summarise(doc) for doc in self.storage.find_rollups('airline', match)]
+
+    def get_route_rollups(self, origin: str = None, destination: str = None) -> list:
+        """Get per-route (origin -> destination) figures"""
+        match = {}
+        if origin:
+            match['origin'] = origin
+        if destination:
+            match['destination'] = destination
+        return [self._summarise(doc) for doc in self.storage.find_rollups('route', match)]
+
+    def get_hourly_rollups(self, start: datetime = None, end: datetime = None) -> list:
+        """Get per-hour figures between start and end (defaults to the last 24 hours)"""
+        end = to_utc_naive(end) or datetime.utcnow()
+        start = to_utc_naive(start) or end - timedelta(hours=Config.ANALYTICS_HOURLY_WINDOW_HOURS)
+
+        docs = self.storage.find_hourly_rollups(self._hour_bucket(start), end)
+        return [self._summarise(doc) for doc in docs]
+
+    @staticmethod
+    def flight_increments(flight_log: dict) -> dict:
+        """Turn a flight log into the $inc document applied to each of its rollups"""
+        increments = {'flights': 1}
+
+        departure = to_utc_naive(flight_log.get('actual_departure'))
+        arrival = to_utc_naive(flight_log.get('actual_arrival'))
+        path = flight_log.get('tracking_path') or []
+        if not departure and path:
+            departure = to_utc_naive(path[0]['timestamp'])
+
+        if departure and arrival:
+            increments['block_time_total'] = (arrival - departure).total_seconds() / 60
+            increments['block_time_count'] = 1
+
+        if len(path) > 1:
+            increments['distance_total'] = path_distance(path)
+            increments['distance_count'] = 1
+
+        scheduled_arrival = to_utc_naive(flight_log.get('scheduled_arrival'))
+        if scheduled_arrival and arrival:
+            increments['delay_total'] = (arrival - scheduled_arrival).total_seconds() / 60
+            increments['delay_count'] = 1
+
+        return increments
+
+    def _rollup_keys(self, flight_log: dict) -> list:
+        """Pairs of (rollup name, key document) this flight contributes to"""
+        origin = (flight_log.get('origin') or {}).get('code')
+        destination = (flight_log.get('destination') or {}).get('code')
+        arrival = to_utc_naive(flight_log.get('actual_arrival') or flight_log.get('completed_at'))
+
+        keys = [('airline', {'airline': flight_log.get('airline')})]
+        if origin and destination:
+            keys.append(('route', {'origin': origin, 'destination': destination}))
+        if arrival:
+            keys.append(('hourly', {'hour': self._hour_bucket(arrival)}))
+        return keys
+
+    @staticmethod
+    def _hour_bucket(value: datetime) -> datetime:
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _summarise(doc: dict) -> dict:
+        """Replace running totals with averages (block time and delay in minutes, distance in km)"""
+        summary = {k: v for k, v in doc.items() if not k.endswith(('_total', '_count'))}
+        for field in ROLLUP_FIELDS:
+            count = doc.get(f'{field}_count', 0)
+            summary[f'avg_{field}'] = doc.get(f'{field}_total', 0) / count if count else None
+        return summary
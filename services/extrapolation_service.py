@@ -0,0 +1,172 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+import numpy as np
+from config import Config
+from models.storage import Storage, get_storage
+from utils.metrics import EXTRAPOLATION_DRIFT
+#Dead reckoning: project a flight's last report along its great circle (heading, speed) and climb
+#(vertical_rate) to another time, with a confidence radius. The radius grows with the distance flown
+#since the report, at the p95 drift rate actually measured against later reports (DriftTracker).
+
+EARTH_RADIUS_NM = 3440.065
+# Horizons (seconds since the report) the drift statistics are grouped by
+DRIFT_BUCKETS = ((0, 10), (10, 30), (30, 60), (60, 120), (120, None))
+
+def project(latitude, longitude, altitude, heading, speed, vertical_rate, seconds) -> tuple:
+    """(latitude, longitude, altitude) after `seconds` (NumPy arrays or scalars, degrees/ft/kts/ft-min)"""
+    phi1, lam1, theta = np.radians(latitude), np.radians(longitude), np.radians(heading)
+    delta = np.asarray(speed, dtype=float) * seconds / 3600 / EARTH_RADIUS_NM  # angular distance
+    phi2 = np.arcsin(np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta))
+    lam2 = lam1 + np.arctan2(np.sin(theta) * np.sin(delta) * np.cos(phi1),
+                             np.cos(delta) - np.sin(phi1) * np.sin(phi2))
+    lon2 = (np.degrees(lam2) + 540) % 360 - 180
+    alt2 = np.maximum(np.asarray(altitude, dtype=float) + np.asarray(vertical_rate, dtype=float) * seconds / 60, 0)
+    return np.degrees(phi2), lon2, alt2
+
+def distance_nm(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def _bucket(seconds: float) -> str:
+    for low, high in DRIFT_BUCKETS:
+        if high is None or seconds < high:
+            return f'{low}-{high}s' if high else f'{low}s+'
+
+class DriftTracker:
+    """Compares each flight's extrapolated position with its next actual report"""
+
+    def __init__(self, samples: int = 2000):
+        self._lock = threading.Lock()
+        self._reports = {}  # flight_id -> (timestamp, position) of the last report
+        self._samples = {_bucket(low): deque(maxlen=samples) for low, _ in DRIFT_BUCKETS}
+
+    def observe(self, flight_id: str, position: dict, timestamp: datetime):
+        """Record a new report, scoring the extrapolation from the previous one"""
+        with self._lock:
+            previous = self._reports.get(flight_id)
+            self._reports[flight_id] = (timestamp, position)
+        if previous is None or not _extrapolable(previous[1]):
+            return
+        seconds = (timestamp - previous[0]).total_seconds()
+        if seconds <= 0:
+            return
+        p = previous[1]
+        lat, lon, alt = project(p['latitude'], p['longitude'], p.get('altitude') or 0, p['heading'],
+                                p['speed'], p.get('vertical_rate') or 0, seconds)
+        horizontal = float(distance_nm(lat, lon, position['latitude'], position['longitude']))
+        vertical = abs(float(alt) - (position.get('altitude') or 0))
+        flown = p['speed'] * seconds / 3600
+        bucket = _bucket(seconds)
+        with self._lock:
+            self._samples[bucket].append((horizontal, vertical, horizontal / flown if flown else 0.0))
+        EXTRAPOLATION_DRIFT.labels(bucket).observe(horizontal)
+
+    def forget(self, flight_id: str):
+        with self._lock:
+            self._reports.pop(flight_id, None)
+
+    def drift_rate(self) -> float:
+        """p95 of (horizontal error / distance flown), or the configured default until there is data"""
+        with self._lock:
+            ratios = [s[2] for samples in self._samples.values() for s in samples]
+        if len(ratios) < Config.DEAD_RECKONING_MIN_SAMPLES:
+            return Config.DEAD_RECKONING_DRIFT_RATE
+        return float(np.percentile(ratios, 95))
+
+    def summary(self) -> dict:
+        with self._lock:
+            buckets = {name: list(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, samples in buckets.items():
+            if not samples:
+                result[name] = {'samples': 0}
+                continue
+            horizontal = np.array([s[0] for s in samples])
+            vertical = np.array([s[1] for s in samples])
+            result[name] = {
+                'samples': len(samples),
+                'mean_nm': round(float(horizontal.mean()), 4),
+                'p50_nm': round(float(np.percentile(horizontal, 50)), 4),
+                'p95_nm': round(float(np.percentile(horizontal, 95)), 4),
+                'max_nm': round(float(horizontal.max()), 4),
+                'p95_ft': round(float(np.percentile(vertical, 95)), 1)
+            }
+        return result
+
+def _extrapolable(position: dict) -> bool:
+    return bool(position) and all(
+        isinstance(position.get(field), (int, float)) for field in ('latitude', 'longitude', 'heading', 'speed'))
+
+class ExtrapolationService:
+    def __init__(self, storage: Storage = None, drift: DriftTracker = None):
+        self.storage = storage or get_storage()
+        self.drift = drift or drift_tracker
+
+    def extrapolate(self, flights: list, at: datetime = None) -> list:
+        """Extrapolated positions for flight documents with a current_position, in one vectorized pass"""
+        at = at or datetime.utcnow()
+        flights = [f for f in flights if f.get('position_timestamp') and _extrapolable(f.get('current_position'))]
+        if not flights:
+            return []
+
+        def column(field, default=0.0):
+            return np.array([f['current_position'].get(field) or default for f in flights], dtype=float)
+
+        ages = np.array([(at - f['position_timestamp']).total_seconds() for f in flights])
+        seconds = np.clip(ages, 0, Config.DEAD_RECKONING_MAX_SECONDS)
+        speed, vertical_rate = column('speed'), column('vertical_rate')
+        lat, lon, alt = project(column('latitude'), column('longitude'), column('altitude'),
+                                column('heading'), speed, vertical_rate, seconds)
+        flown = speed * seconds / 3600
+        radius = Config.DEAD_RECKONING_BASE_NM + self.drift.drift_rate() * flown
+        vertical = Config.DEAD_RECKONING_BASE_FT + 0.5 * np.abs(vertical_rate) * seconds / 60
+
+        return [{
+            'flight_id': flight['flight_id'],
+            'at': at,
+            'reported_at': flight['position_timestamp'],
+            'age_s': round(float(ages[i]), 1),
+            # Beyond DEAD_RECKONING_MAX_SECONDS the projection is held at the horizon
+            'stale': bool(ages[i] > Config.DEAD_RECKONING_MAX_SECONDS),
+            'position': {
+                'latitude': round(float(lat[i]), 6),
+                'longitude': round(float(lon[i]), 6),
+                'altitude': round(float(alt[i])),
+                'heading': flight['current_position'].get('heading'),
+                'speed': flight['current_position'].get('speed'),
+                'vertical_rate': flight['current_position'].get('vertical_rate')
+            },
+            'confidence': {
+                'radius_nm': round(float(radius[i]), 3),
+                'altitude_ft': [round(float(alt[i] - vertical[i])), round(float(alt[i] + vertical[i]))]
+            }
+        } for i, flight in enumerate(flights)]
+
+    def extrapolate_flight(self, flight: dict, at: datetime = None) -> dict:
+        extrapolated = self.extrapolate([flight], at)
+        return extrapolated[0] if extrapolated else None
+
+    def extrapolate_all(self, at: datetime = None) -> list:
+        return self.extrapolate(self.storage.find_flights('active'), at)
+
+    def projected_path(self, position: dict, timestamp: datetime) -> list:
+        """Positions DEAD_RECKONING_HORIZONS seconds after a report (sent with live position events)"""
+        if not _extrapolable(position):
+            return []
+        horizons = np.array(Config.DEAD_RECKONING_HORIZONS, dtype=float)
+        lat, lon, alt = project(position['latitude'], position['longitude'], position.get('altitude') or 0,
+                                position['heading'], position['speed'], position.get('vertical_rate') or 0,
+                                horizons)
+        radius = Config.DEAD_RECKONING_BASE_NM + self.drift.drift_rate() * position['speed'] * horizons / 3600
+        return [{
+            'at': timestamp + timedelta(seconds=float(horizons[i])),
+            'latitude': round(float(lat[i]), 6),
+            'longitude': round(float(lon[i]), 6),
+            'altitude': round(float(alt[i])),
+            'radius_nm': round(float(radius[i]), 3)
+        } for i in range(len(horizons))]
+
+# Shared drift statistics (per process), fed by TrackingService
+drift_tracker = DriftTracker()
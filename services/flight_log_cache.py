@@ -0,0 +1,206 @@
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from config import Config
+from models.storage import Storage, get_storage, slice_flight_log
+from utils.metrics import FLIGHT_LOG_CACHE_BYTES, FLIGHT_LOG_CACHE_EVICTIONS, FLIGHT_LOG_CACHE_REQUESTS
+#Read-through cache of completed flight logs. Archived logs never change, so a full log (full history,
+#maps) is read once and later history windows are cut from memory; a window asked for before the log
+#is cached is sliced by storage instead. The cache is an LRU bounded by an estimate of
+#its size in bytes; concurrent misses for one flight share a single storage read, and the JSON body
+#of the full history can be kept with the log. Archive migrations bump the storage's archive
+#generation (`flask invalidate-flight-log-cache`), which every process notices within
+#FLIGHT_LOG_CACHE_GENERATION_CHECK seconds.
+
+def _sizeof(value) -> int:
+    """Rough deep size of a decoded document (dicts, lists and their leaves)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+class _Entry:
+    __slots__ = ('log', 'body', 'size')
+
+    def __init__(self, log: dict):
+        self.log = log    # full flight log (shared, never mutated)
+        self.body = None  # serialized full history, once asked for
+        self.size = _sizeof(log)
+
+class _Load:
+    """A storage read in progress that concurrent misses wait for"""
+    __slots__ = ('done', 'entry', 'error', 'stale')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+        self.stale = False  # invalidated while loading: served to its waiters but not kept
+
+class FlightLogCache:
+    def __init__(self, storage: Storage = None, max_bytes: int = None):
+        self.storage = storage or get_storage()
+        self.max_bytes = Config.FLIGHT_LOG_CACHE_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # flight_id -> _Entry, least recently used first
+        self._loading = {}             # flight_id -> _Load
+        self._bytes = 0
+        self._generation = None
+        self._next_check = 0.0
+        self.hits = self.misses = self.coalesced = self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, flight_id: str) -> dict:
+        """Full flight log, or None; callers must not modify it"""
+        entry = self._entry(flight_id)
+        return entry.log if entry else None
+
+    def peek(self, flight_id: str) -> dict:
+        """Full flight log if it is cached, or None without reading storage"""
+        if not self.enabled:
+            return None
+        self._check_generation()
+        with self._lock:
+            entry = self._entries.get(flight_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(flight_id)
+            self.hits += 1
+            FLIGHT_LOG_CACHE_REQUESTS.labels('hit').inc()
+            return entry.log
+
+    def get_body(self, flight_id: str, serialize) -> bytes:
+        """serialize(full history), kept with the cached log when FLIGHT_LOG_CACHE_SERIALIZED"""
+        entry = self._entry(flight_id)
+        if entry is None:
+            return None
+        if entry.body is not None:
+            return entry.body
+        body = serialize(slice_flight_log(entry.log))
+        if Config.FLIGHT_LOG_CACHE_SERIALIZED:
+            with self._lock:
+                if self._entries.get(flight_id) is entry and entry.body is None:
+                    entry.body = body
+                    entry.size += len(body)
+                    self._bytes += len(body)
+                    self._evict()
+        return body
+
+    def _entry(self, flight_id: str) -> _Entry:
+        if not self.enabled:
+            log = self.storage.get_flight_log(flight_id)
+            return _Entry(log) if log else None
+        self._check_generation()
+
+        with self._lock:
+            entry = self._entries.get(flight_id)
+            if entry is not None:
+                self._entries.move_to_end(flight_id)
+                self.hits += 1
+                FLIGHT_LOG_CACHE_REQUESTS.labels('hit').inc()
+                return entry
+            load = self._loading.get(flight_id)
+            leader = load is None
+            if leader:
+                load = self._loading[flight_id] = _Load()
+
+        if not leader:
+            load.done.wait()
+            with self._lock:
+                self.coalesced += 1
+            FLIGHT_LOG_CACHE_REQUESTS.labels('coalesced').inc()
+            if load.error is not None:
+                raise load.error
+            return load.entry
+
+        with self._lock:
+            self.misses += 1
+        FLIGHT_LOG_CACHE_REQUESTS.labels('miss').inc()
+        try:
+            log = self.storage.get_flight_log(flight_id)
+            load.entry = _Entry(log) if log else None
+            with self._lock:
+                # Too-large logs are served but not kept; not-found is not cached (it may be archived later)
+                if load.entry is not None and load.entry.size <= self.max_bytes and not load.stale:
+                    self._entries[flight_id] = load.entry
+                    self._bytes += load.entry.size
+                    self._evict()
+        except Exception as e:
+            load.error = e
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(flight_id, None)
+            load.done.set()
+        return load.entry
+
+    def _evict(self):
+        """Drop least recently used logs until within max_bytes (holding the lock)"""
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            FLIGHT_LOG_CACHE_EVICTIONS.inc()
+        FLIGHT_LOG_CACHE_BYTES.set(self._bytes)
+
+    def invalidate(self, flight_id: str = None):
+        """Forget one flight's log, or every log"""
+        with self._lock:
+            # A read in progress may predate the change: let it finish but do not keep its result
+            for loading_id, load in self._loading.items():
+                if flight_id is None or loading_id == flight_id:
+                    load.stale = True
+            if flight_id is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(flight_id, None)
+                if entry is not None:
+                    self._bytes -= entry.size
+            FLIGHT_LOG_CACHE_BYTES.set(self._bytes)
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + Config.FLIGHT_LOG_CACHE_GENERATION_CHECK
+        generation = self.storage.archive_generation()
+        if self._generation is not None and generation != self._generation:
+            self.invalidate()
+        self._generation = generation
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'serialized_bodies': sum(1 for e in self._entries.values() if e.body is not None),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+                'generation': self._generation
+            }
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+def flight_log_cache(storage: Storage = None) -> FlightLogCache:
+    """The cache shared by every service of this process that reads `storage`"""
+    storage = storage or get_storage()
+    with _caches_lock:
+        cache = _caches.get(storage)
+        if cache is None:
+            cache = _caches[storage] = FlightLogCache(storage)
+        return cache
@@ -1,20 +1,37 @@
 from datetime import datetime
-from models.database import db
-from pymongo import ASCENDING, DESCENDING
+from models.live_state import live_state
+from models.storage import Storage, get_storage, slice_flight_log
+from services.analytics_service import AnalyticsService
+from services.extrapolation_service import DriftTracker, drift_tracker
+from services.flight_log_cache import flight_log_cache
+from services.search_service import search_index
+from services.proximity_service import ProximityEngine, proximity_engine
+from services.geofence_service import GeofenceEngine, geofence_engine
+
+# Point fields archived in flight_logs.tracking_path (plus 'timestamp')
+TRACKING_PATH_FIELDS = ('latitude', 'longitude', 'altitude', 'heading', 'speed')
 #flight_service.py acts as the middle layer between the routes (controllers) and the database.
-#It performs the actual operations like fetching flights, marking them complete, or retrieving their history — all by interacting with MongoDB.
+#It performs the actual operations like fetching flights, marking them complete, or retrieving their history — all through the storage backend (MongoDB by default).
 class FlightService:
-    def complete_flight(self, flight_id: str) -> dict:
-        """Move completed flight to logs collection"""
-        flight = db.flights.find_one({'flight_id': flight_id})
+    def __init__(self, storage: Storage = None, proximity: ProximityEngine = None,
+                 geofences: GeofenceEngine = None, drift: DriftTracker = None):
+        self.storage = storage or get_storage()
+        self.analytics_service = AnalyticsService(self.storage)
+        self.proximity = proximity or proximity_engine
+        self.geofences = geofences or geofence_engine
+        self.drift = drift or drift_tracker
+        self.log_cache = flight_log_cache(self.storage)
+        self.search = search_index(self.storage)
+        self.live_state = live_state(self.storage)
+
+    def complete_flight(self, flight_id: str, actual_arrival: datetime = None) -> dict:
+        """Move completed flight to logs collection; `actual_arrival` defaults to now (manual completion)"""
+        flight = self.storage.get_flight(flight_id)
         if not flight:
             raise ValueError('Flight not found')
         
         # Get complete tracking path
-        tracking_path = list(db.tracking_updates.find( #Fetches all tracking updates (positions, timestamps) related to that flight.
-            {'flight_id': flight_id},
-            {'position': 1, 'timestamp': 1}
-        ).sort('timestamp', ASCENDING))
+        track = self.storage.track(flight_id) #Fetches all positions and timestamps of that flight as one compact array.
         
         # Create flight log
         flight_log = {  #Creates a new dictionary that contains all important details of this flight.
@@ -27,47 +44,64 @@ class FlightService:
             'scheduled_departure': flight.get('scheduled_departure'),
             'scheduled_arrival': flight.get('scheduled_arrival'),
             'actual_departure': flight.get('actual_departure'),
-            'actual_arrival': datetime.utcnow(),
-            'tracking_path': [
-                {  #Basically, this is the entire flight path from takeoff to landing.
-                    'latitude': point['position']['latitude'],
-                    'longitude': point['position']['longitude'],
-                    'altitude': point['position']['altitude'],
-                    'heading': point['position'].get('heading'),
-                    'speed': point['position'].get('speed'),
-                    'timestamp': point['timestamp']
-                }
-                for point in tracking_path
-            ],
+            'actual_arrival': actual_arrival or datetime.utcnow(),
+            #Basically, this is the entire flight path from takeoff to landing.
+            'tracking_path': track.to_records(TRACKING_PATH_FIELDS),
             'created_at': flight.get('created_at'),
             'completed_at': datetime.utcnow()
         }
         
-        # Save to logs (active_flights -> flight_logs)
-        db.flight_logs.insert_one(flight_log)
+        # Save to logs (active_flights -> flight_logs) and remove from active collections
+        self.storage.archive_flight(flight_log)
+        self.log_cache.invalidate(flight_id)
+        self.search.complete(flight_id, flight_log)
+        if self.live_state:
+            self.live_state.remove(flight_id)
+        self.proximity.remove(flight_id)
+        self.geofences.forget(flight_id)
+        self.drift.forget(flight_id)
         
-        # Remove from active collections (delete from flight_logs)
-        db.flights.delete_one({'flight_id': flight_id})
-        db.tracking_updates.delete_many({'flight_id': flight_id}) 
+        # Fold the archived flight into the airline/route/hourly rollups
+        self.analytics_service.record_completed_flight(flight_log)
         #This means the flight has now been moved to “history” — it’s done flying.
         return {
             'status': 'success',
             'message': f'Flight {flight_id} completed and moved to logs'
         }
     
-    def get_flights(self, status_filter: str = None) -> list:
-        """Get all flights with optional status filter"""
-        query = {}
-        if status_filter:
-            query['status'] = status_filter #If a filter like "active" or "delayed" is provided, it only fetches flights with that status.
-        
-        flights = list(db.flights.find(query)) #Retrieves all flights matching the query and converts them to a list.
+    def get_flights(self, status_filter: str = None, airline: str = None, origin: str = None,
+                    destination: str = None, compact: bool = False) -> list:
+        """Get all flights with optional status / airline / origin / destination filters; `compact`
+        documents come from the shared live-state table when it is enabled and holds every flight"""
+        if compact and self.live_state and not self.live_state.overflowed:
+            return self.live_state.flights(status_filter, airline, origin, destination)
+        #If a filter like "active" or "delayed" is provided, it only fetches flights with that status.
+        flights = self.storage.find_flights(status_filter, airline, origin, destination)
         return flights
     
-    def get_flight_history(self, flight_id: str) -> dict:
-        """Get complete flight history from logs"""
-        flight_log = db.flight_logs.find_one({'flight_id': flight_id})
+    def search_flights(self, query: str, limit: int = None, **filters) -> dict:
+        """Typeahead over active and recently completed flights ({'results', 'truncated'})"""
+        return self.search.search(query, limit, **filters)
+    
+    def get_flight_history(self, flight_id: str, start: datetime = None, end: datetime = None,
+                           offset: int = 0, limit: int = None, every: int = 1) -> dict:
+        """Get flight history from logs, with tracking_path cut down to the requested points"""
+        full = start is None and end is None and not offset and limit is None and every == 1
+        # Full histories are read through the cache; windows are cut from it only when it has the log
+        flight_log = self.log_cache.get(flight_id) if full else self.log_cache.peek(flight_id)
+        if flight_log:
+            flight_log = slice_flight_log(flight_log, start, end, offset, limit, every)
+        elif not full:
+            # The storage slices, so a cold window reads only the requested points
+            flight_log = self.storage.get_flight_log(flight_id, start, end, offset, limit, every)
         if not flight_log:
             raise ValueError('Flight history not found')
         
-        return flight_log
\ No newline at end of file
+        return flight_log
+    
+    def get_flight_history_body(self, flight_id: str, serialize) -> bytes:
+        """The full history already serialized by `serialize` (cached with the log)"""
+        body = self.log_cache.get_body(flight_id, serialize)
+        if body is None:
+            raise ValueError('Flight history not found')
+        return body
\ No newline at end of file
@@ -0,0 +1,263 @@
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from config import Config
+from models.geofence import Geofence
+from models.flight_models import Airport
+from models.storage import Storage, get_storage
+from services.live_feed import live_feed
+from utils.metrics import GEOFENCE_EVENTS
+#Incremental geofencing. Fences are indexed in a uniform lat/lon grid (each fence is listed in the
+#cells its bounding box overlaps), so an update only tests the few fences in its own cell, however
+#many fences exist. Each flight remembers which fences it is inside, and a change is an entry or exit.
+#Every fence change bumps geofence_generation in storage; each process checks it at most every
+#GEOFENCE_GENERATION_CHECK seconds and reloads its fences when another process changed them.
+
+class GeofenceIndex:
+    def __init__(self, cell_deg: float):
+        self.cell_deg = cell_deg
+        self._fences = {}  # fence_id -> Geofence
+        self._cells = {}   # (row, column) -> set of fence_ids
+
+    def _cell(self, latitude: float, longitude: float) -> tuple:
+        return math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg)
+
+    def _cells_of(self, fence: Geofence):
+        min_lon, min_lat, max_lon, max_lat = fence.bbox
+        # A fence across the antimeridian (min lon > max lon) covers both ends of the grid
+        spans = ((min_lon, max_lon),) if min_lon <= max_lon else ((min_lon, 180.0), (-180.0, max_lon))
+        for west, east in spans:
+            low_row, low_column = self._cell(min_lat, west)
+            high_row, high_column = self._cell(max_lat, east)
+            for row in range(low_row, high_row + 1):
+                for column in range(low_column, high_column + 1):
+                    yield row, column
+
+    def get(self, fence_id: str) -> Geofence:
+        return self._fences.get(fence_id)
+
+    def fences(self) -> list:
+        return list(self._fences.values())
+
+    def add(self, fence: Geofence):
+        self.remove(fence.fence_id)
+        self._fences[fence.fence_id] = fence
+        for cell in self._cells_of(fence):
+            self._cells.setdefault(cell, set()).add(fence.fence_id)
+
+    def remove(self, fence_id: str) -> bool:
+        fence = self._fences.pop(fence_id, None)
+        if fence is None:
+            return False
+        for cell in self._cells_of(fence):
+            members = self._cells.get(cell)
+            if members:
+                members.discard(fence_id)
+                if not members:
+                    del self._cells[cell]
+        return True
+
+    def candidates(self, latitude: float, longitude: float) -> list:
+        """Fences whose bounding box may contain the point"""
+        return [self._fences[f] for f in self._cells.get(self._cell(latitude, longitude), ())]
+
+class _FlightState:
+    __slots__ = ('inside', 'destination', 'refresh_at')
+
+    def __init__(self, destination: str):
+        self.inside = set()             # fence_ids the flight is currently inside
+        self.destination = destination  # destination airport code, if known
+        self.refresh_at = time.monotonic() + Config.GEOFENCE_FLIGHT_REFRESH  # when to re-read the route
+
+class GeofenceEngine:
+    """Fence index plus per-flight inside sets (per process, shared by the services)"""
+
+    def __init__(self, cell_deg: float = None):
+        self.index = GeofenceIndex(cell_deg or Config.GEOFENCE_CELL_DEG)
+        self.loaded = False
+        self.generation = None  # storage geofence_generation the index reflects
+        self.next_check = 0.0
+        self._lock = threading.RLock()
+        self._flights = {}              # flight_id -> _FlightState
+        self._arrived = OrderedDict()   # flight_id -> timestamp of the position that completed it
+
+    def add(self, fence: Geofence):
+        with self._lock:
+            self.index.add(fence)
+
+    def remove(self, fence_id: str) -> bool:
+        with self._lock:
+            for state in self._flights.values():
+                state.inside.discard(fence_id)
+            return self.index.remove(fence_id)
+
+    def reload(self, fences: list):
+        """Replace every fence (flights keep the ones they are inside that still exist)"""
+        index = GeofenceIndex(self.index.cell_deg)
+        for fence in fences:
+            index.add(fence)
+        with self._lock:
+            self.index = index
+            for state in self._flights.values():
+                state.inside = {f for f in state.inside if index.get(f)}
+
+    def state(self, flight_id: str) -> _FlightState:
+        return self._flights.get(flight_id)
+
+    def track(self, flight_id: str, destination: str = None) -> _FlightState:
+        """Start tracking the flight, or refresh the destination of a tracked one"""
+        with self._lock:
+            state = self._flights.get(flight_id)
+            if state is None:
+                state = self._flights[flight_id] = _FlightState(destination)
+            else:
+                state.destination = destination
+                state.refresh_at = time.monotonic() + Config.GEOFENCE_FLIGHT_REFRESH
+            return state
+
+    def update(self, flight_id: str, latitude: float, longitude: float) -> tuple:
+        """(entered, exited) fences after moving `flight_id` to the point"""
+        with self._lock:
+            state = self._flights.get(flight_id) or self.track(flight_id)
+            inside = {fence.fence_id for fence in self.index.candidates(latitude, longitude)
+                      if fence.contains(latitude, longitude)}
+            entered, exited = inside - state.inside, state.inside - inside
+            state.inside = inside
+            return ([self.index.get(f) for f in entered],
+                    [self.index.get(f) or f for f in exited])
+
+    def forget(self, flight_id: str):
+        with self._lock:
+            self._flights.pop(flight_id, None)
+
+    def mark_arrived(self, flight_id: str, timestamp: datetime):
+        with self._lock:
+            self._arrived[flight_id] = timestamp
+            self._arrived.move_to_end(flight_id)
+            while len(self._arrived) > Config.GEOFENCE_ARRIVED_RETAINED:
+                self._arrived.popitem(last=False)
+
+    def recently_arrived(self, flight_id: str, timestamp: datetime) -> bool:
+        """Whether the update belongs to a flight auto-completed less than the grace period earlier"""
+        arrived = self._arrived.get(flight_id)
+        return arrived is not None and (timestamp - arrived).total_seconds() <= Config.GEOFENCE_ARRIVAL_GRACE_SECONDS
+
+class GeofenceService:
+    def __init__(self, storage: Storage = None, engine: GeofenceEngine = None):
+        self.storage = storage or get_storage()
+        self.engine = engine or geofence_engine
+
+    def _ensure_loaded(self):
+        """Load the fences, and reload them when another process changed them"""
+        engine = self.engine
+        now = time.monotonic()
+        if engine.loaded and now < engine.next_check:
+            return
+        engine.next_check = now + Config.GEOFENCE_GENERATION_CHECK
+        generation = self.storage.geofence_generation()  # before the read: a later change reloads again
+        if engine.loaded and generation == engine.generation:
+            return
+        engine.reload([Geofence.from_dict(document) for document in self.storage.find_geofences()])
+        engine.generation = generation
+        engine.loaded = True
+
+    def _changed(self):
+        """A fence was written: tell the other processes (this one is already current)"""
+        generation = self.storage.bump_geofence_generation()
+        if self.engine.generation == generation - 1:
+            self.engine.generation = generation  # no other change in between
+
+    # ---- Fences ----
+    def get_fences(self) -> list:
+        self._ensure_loaded()
+        return [fence.to_dict() for fence in self.engine.index.fences()]
+
+    def create_fence(self, data: dict) -> dict:
+        """Create (or replace) a fence from validated API data"""
+        self._ensure_loaded()
+        fence = Geofence.from_dict({
+            **data,
+            'fence_id': data.get('fence_id') or f'fence:{uuid.uuid4().hex[:8]}',
+            'name': data.get('name') or data.get('fence_id')
+        })
+        self.storage.upsert_geofence(fence.to_dict())
+        self.engine.add(fence)
+        self._changed()
+        return fence.to_dict()
+
+    def delete_fence(self, fence_id: str):
+        self._ensure_loaded()
+        removed = self.storage.delete_geofence(fence_id)
+        if not self.engine.remove(fence_id) and not removed:
+            raise ValueError('Geofence not found')
+        self._changed()
+
+    def ensure_airport_fences(self, flight: dict):
+        """Add radius fences for the flight's origin and destination airports (when located)"""
+        for key in ('origin', 'destination'):
+            airport = Airport.from_dict(flight.get(key) or {})
+            if airport.code and airport.has_location and not self.engine.index.get(f'airport:{airport.code}'):
+                fence = Geofence.airport(airport.code, airport.latitude, airport.longitude,
+                                         Config.GEOFENCE_AIRPORT_RADIUS_KM)
+                self.storage.upsert_geofence(fence.to_dict())
+                self.engine.add(fence)
+                self._changed()
+
+    # ---- Updates ----
+    def process_position(self, flight_id: str, position: dict, timestamp: datetime) -> bool:
+        """Record fence entries/exits for a new position; True if the flight has arrived"""
+        self._ensure_loaded()
+        state = self.engine.state(flight_id)
+        if state is None or time.monotonic() >= state.refresh_at:
+            # First position seen for this flight (or its route may have changed): register its airports
+            flight = self.storage.get_flight(flight_id) or {}
+            self.ensure_airport_fences(flight)
+            state = self.engine.track(flight_id, (flight.get('destination') or {}).get('code'))
+
+        entered, exited = self.engine.update(flight_id, position['latitude'], position['longitude'])
+        for kind, fences in (('enter', entered), ('exit', exited)):
+            for fence in fences:
+                self._record(kind, flight_id, fence, position, timestamp)
+
+        return self._has_arrived(state, position)
+
+    def _has_arrived(self, state: _FlightState, position: dict) -> bool:
+        """Inside the destination airport fence, low and slow (landed)"""
+        if not state.destination or f'airport:{state.destination}' not in state.inside:
+            return False
+        altitude, speed = position.get('altitude'), position.get('speed')
+        return (altitude is not None and altitude <= Config.GEOFENCE_ARRIVAL_MAX_ALTITUDE_FT
+                and speed is not None and speed <= Config.GEOFENCE_ARRIVAL_MAX_SPEED_KTS)
+
+    def record_arrival(self, flight_id: str, position: dict, timestamp: datetime):
+        """Record the 'arrival' event that auto-completes a flight and ignore its stragglers"""
+        state = self.engine.state(flight_id)
+        self._record('arrival', flight_id, self.engine.index.get(f'airport:{state.destination}'),
+                     position, timestamp)
+        self.engine.mark_arrived(flight_id, timestamp)
+
+    def _record(self, kind: str, flight_id: str, fence, position: dict, timestamp: datetime):
+        fence_id = fence.fence_id if isinstance(fence, Geofence) else fence  # exits of deleted fences
+        event = {
+            'flight_id': flight_id,
+            'fence_id': fence_id,
+            'fence_name': fence.name if isinstance(fence, Geofence) else None,
+            'event': kind,
+            'timestamp': timestamp,
+            'position': {field: position.get(field) for field in ('latitude', 'longitude', 'altitude', 'speed')},
+            'recorded_at': datetime.utcnow()
+        }
+        self.storage.insert_geofence_event(event)
+        live_feed.publish('geofence', event)
+        GEOFENCE_EVENTS.labels(kind).inc()
+
+    def get_events(self, flight_id: str = None, fence_id: str = None, start: datetime = None,
+                   end: datetime = None, limit: int = None) -> list:
+        return self.storage.find_geofence_events(flight_id, fence_id, start, end,
+                                                 limit or Config.GEOFENCE_EVENTS_LIMIT)
+
+# Shared engine (per process), fed by TrackingService
+geofence_engine = GeofenceEngine()
@@ -0,0 +1,247 @@
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from config import Config
+from utils.metrics import INGEST_BACKLOG, INGEST_REJECTED, INGEST_WORKER_ERRORS, INGEST_WORKER_RESTARTS
+try:
+    import fcntl
+except ImportError:  # Windows: a second pool on the host is not detected
+    fcntl = None
+#Flight-affinity ingestion (INGEST_WORKERS > 0). Updates are hash-partitioned by flight_id onto
+#worker processes, each with its own FIFO queue, so all updates of a flight are applied by one
+#process in arrival order and writes for a flight never race. Workers do the storage and geofence
+#work (and write the shared live-state table); their results come back to the web process (one
+#queue and collector thread per worker), which feeds proximity alerts and the live feed.
+#Ordering only holds within one pool, so there is one per host: the pool holds a flock on
+#INGEST_LOCK_PATH, and a pool started in a second process (another web worker) raises instead.
+#A worker that dies is replaced by its collector; the batches it had been given are lost (its queues
+#may be left locked, so the new worker gets new ones) and counted as errors.
+
+def shard_for(flight_id: str, shards: int) -> int:
+    """Worker index for a flight (crc32 is stable across processes, unlike hash())"""
+    return zlib.crc32(flight_id.encode()) % shards
+
+def _worker_main(index: int, inbox, outbox, storage_backend: str, live_state_path: str):
+    """Worker process: apply each batch of updates in order and report the results"""
+    Config.STORAGE_BACKEND = storage_backend
+    Config.LIVE_STATE_PATH = live_state_path
+    from services.tracking_service import TrackingService
+    service = TrackingService()
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        results = []
+        for sequence, data in batch:
+            try:
+                result = service.store_tracking_update(data)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            results.append((sequence, data['flight_id'], data['position'], result))
+        outbox.put(results)
+    service.receivers.flush()  # atexit does not run in multiprocessing children
+
+class IngestPool:
+    def __init__(self, workers: int, publish=None, storage_backend: str = None,
+                 queue_size: int = None, allow_private_storage: bool = False):
+        storage_backend = storage_backend or Config.STORAGE_BACKEND
+        if storage_backend == 'memory' and not allow_private_storage:
+            # Each worker would write to its own in-process store, invisible to the web process
+            raise ValueError('INGEST_WORKERS needs a shared storage backend (STORAGE_BACKEND=mongo)')
+        self.workers = workers
+        self.publish = publish  # callable(data, result), run in this process
+        self._storage_backend = storage_backend
+        self._queue_size = queue_size or Config.INGEST_QUEUE_SIZE
+        self._context = multiprocessing.get_context('spawn')  # no fork of a threaded process / MongoClient
+        self._inboxes, self._outboxes, self._processes, self._collectors = ([None] * workers for _ in range(4))
+        for index in range(workers):
+            self._spawn(index)
+        self._lock = threading.Condition()
+        self._shard_locks = [threading.Lock() for _ in range(workers)]  # sequence order == queue order
+        self._sequence = itertools.count(1)
+        self._pending = [OrderedDict() for _ in range(workers)]  # per worker: first sequence -> batch size
+        self._last_sequence = OrderedDict()  # flight_id -> sequence of its last applied update
+        self._host_lock = None
+        self.started = False
+        self.submitted = self.processed = self.errors = self.out_of_order = self.restarts = 0
+
+    def _spawn(self, index: int):
+        """New queues, process and collector thread (not started) for worker `index`"""
+        inbox = self._inboxes[index] = self._context.Queue(maxsize=self._queue_size)
+        outbox = self._outboxes[index] = self._context.Queue()
+        process = self._processes[index] = self._context.Process(
+            target=_worker_main, name=f'ingest-worker-{index}', daemon=True,
+            args=(index, inbox, outbox, self._storage_backend, Config.LIVE_STATE_PATH))
+        self._collectors[index] = threading.Thread(target=self._collect, args=(index, process, outbox),
+                                                   name=f'ingest-collector-{index}', daemon=True)
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self._host_lock = _lock_host()
+            for process, collector in zip(self._processes, self._collectors):
+                process.start()
+                collector.start()
+            self.started = True
+        atexit.register(self.close)
+
+    def submit(self, data: dict):
+        """Queue one validated update (raises queue.Full if its worker is backed up)"""
+        self.submit_many([data])
+
+    def submit_many(self, updates: list):
+        """Queue updates, one batch per worker; all or nothing: if a worker stays backed up for
+        INGEST_SUBMIT_TIMEOUT, queue.Full is raised and none of the updates are queued"""
+        if not self.started:
+            self.start()
+        shards = {}
+        for data in updates:
+            shards.setdefault(shard_for(data['flight_id'], self.workers), []).append(data)
+        indexes = sorted(shards)  # locks are always taken in shard order
+        locks = [self._shard_locks[index] for index in indexes]
+        for lock in locks:
+            lock.acquire()
+        try:
+            # Only submitters put and they hold the shard locks, so room found here stays free
+            if not self._wait_for_room(indexes, time.monotonic() + Config.INGEST_SUBMIT_TIMEOUT):
+                INGEST_REJECTED.inc(len(updates))
+                raise queue.Full
+            with self._lock:
+                for index in indexes:
+                    batch = [(next(self._sequence), data) for data in shards[index]]
+                    self._inboxes[index].put_nowait(batch)
+                    self._pending[index][batch[0][0]] = len(batch)
+                self.submitted += len(updates)
+                INGEST_BACKLOG.set(self.submitted - self.processed)
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _wait_for_room(self, indexes: list, deadline: float) -> bool:
+        for index in indexes:
+            while self._inboxes[index].full():
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.005)
+        return True
+
+    def _collect(self, index: int, process, outbox):
+        """Collector thread of one worker process: apply its results, replace it if it dies"""
+        while True:
+            try:
+                results = outbox.get(timeout=Config.INGEST_WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                if not process.is_alive() and self._replace(index, process):
+                    return
+                continue
+            if results is None:  # close(): the worker has exited
+                return
+            self._apply(index, results)
+
+    def _apply(self, index: int, results: list):
+        """Bookkeeping and publishing for one batch of results"""
+        applied = []
+        with self._lock:
+            # A batch written off when its worker died is published but not counted again
+            counted = self._pending[index].pop(results[0][0], None)
+            for sequence, flight_id, position, result in results:
+                # Updates of one flight must come back in the order they were submitted
+                if sequence < self._last_sequence.get(flight_id, 0):
+                    self.out_of_order += 1
+                if result.get('completed'):
+                    self._last_sequence.pop(flight_id, None)
+                else:
+                    self._last_sequence[flight_id] = sequence
+                    self._last_sequence.move_to_end(flight_id)
+                    while len(self._last_sequence) > Config.TRACKING_LATEST_RETAINED:
+                        self._last_sequence.popitem(last=False)
+                if result.get('success'):
+                    applied.append(({'flight_id': flight_id, 'position': position}, result))
+                elif counted:
+                    self.errors += 1
+                    INGEST_WORKER_ERRORS.inc()
+        if self.publish:
+            for data, result in applied:
+                self.publish(data, result)
+        if counted:
+            with self._lock:
+                self.processed += len(results)
+                INGEST_BACKLOG.set(self.submitted - self.processed)
+                self._lock.notify_all()
+
+    def _replace(self, index: int, process) -> bool:
+        """Start a new worker in place of a dead one (unless the pool is closing)"""
+        with self._shard_locks[index], self._lock:  # no submitter is using the old queue
+            if not self.started:
+                return False  # close() ends this collector
+            lost = sum(self._pending[index].values())
+            self._pending[index].clear()
+            self.processed += lost
+            self.errors += lost
+            INGEST_WORKER_ERRORS.inc(lost)
+            INGEST_BACKLOG.set(self.submitted - self.processed)
+            self._lock.notify_all()
+            self._inboxes[index].cancel_join_thread()  # the dead worker may have held its locks
+            self._spawn(index)
+            self._processes[index].start()
+            self._collectors[index].start()
+            self.restarts += 1
+            INGEST_WORKER_RESTARTS.inc()
+            return True
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until every submitted update has been applied"""
+        with self._lock:
+            return self._lock.wait_for(lambda: self.processed >= self.submitted, timeout)
+
+    def close(self):
+        """Finish the queued updates and stop the workers"""
+        with self._lock:
+            if not self.started:
+                return
+            self.started = False
+        for index, inbox in enumerate(self._inboxes):
+            with self._shard_locks[index]:
+                inbox.put(None)
+        for process in self._processes:
+            process.join()
+        for outbox in self._outboxes:
+            outbox.put(None)  # after the worker's last results
+        for collector in self._collectors:
+            collector.join()
+        _unlock_host(self._host_lock)
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'errors': self.errors,
+            'out_of_order': self.out_of_order,
+            'restarts': self.restarts
+        }
+
+def _lock_host():
+    """flock INGEST_LOCK_PATH for the pool (None without fcntl); raises if another process has it"""
+    if not fcntl:
+        return None
+    fd = os.open(Config.INGEST_LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        raise RuntimeError(f'INGEST_WORKERS: another process on this host runs the ingest pool '
+                           f'({Config.INGEST_LOCK_PATH}); per-flight ordering needs one pool, so run '
+                           f'the web app as a single process (threads are fine)')
+    return fd
+
+def _unlock_host(fd):
+    if fd is not None:
+        os.close(fd)  # releases the flock
@@ -0,0 +1,67 @@
+import json
+import queue
+import threading
+from datetime import datetime
+from bson import ObjectId
+from utils.metrics import LIVE_EVENTS_DROPPED
+#In-process publish/subscribe channel behind GET /api/live (Server-Sent Events). Publishers never
+#block: each subscriber has a bounded queue, and events for a subscriber that is not keeping up are
+#dropped (and counted) instead of backing up the ingest path.
+
+def _json_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f'{type(o).__name__} is not JSON serializable')
+
+class Subscription:
+    def __init__(self, events: set, max_queue: int):
+        self.events = events  # event names to receive, or None for all
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def get(self, timeout: float):
+        """Next (event, data) pair, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class LiveFeed:
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, events=None) -> Subscription:
+        subscription = Subscription(set(events) if events else None, self.max_queue)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+
+    def publish(self, event: str, data: dict):
+        """Send an event to every subscriber that wants it"""
+        for subscription in self._subscribers:  # copy-on-write list, safe without the lock
+            if subscription.events is not None and event not in subscription.events:
+                continue
+            try:
+                subscription.queue.put_nowait((event, data))
+            except queue.Full:
+                subscription.dropped += 1
+                LIVE_EVENTS_DROPPED.inc()
+
+def format_sse(event: str, data: dict) -> str:
+    """One Server-Sent Events message"""
+    return f'event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n'
+
+# Shared feed (per process)
+live_feed = LiveFeed()
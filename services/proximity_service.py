@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from config import Config
+from services.live_feed import live_feed
+from utils.metrics import PROXIMITY_EVALUATION, PROXIMITY_ACTIVE_ALERTS
+#Incremental proximity (loss of separation) alerts. Live positions are bucketed into a uniform
+#lat/lon grid whose cells are at least the horizontal threshold wide, so a pair that is too close
+#is always in the same or neighbouring cells. Updates only mark cells dirty; a tick re-evaluates the
+#dirty cells against their neighbours with a vectorized haversine, leaving the rest of the sky alone.
+
+EARTH_RADIUS_NM = 3440.065
+
+def haversine_nm(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in nautical miles (NumPy broadcasting, degrees in)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+class _Aircraft:
+    __slots__ = ('flight_id', 'latitude', 'longitude', 'altitude', 'timestamp', 'cell', 'seen')
+
+    def __init__(self, flight_id: str):
+        self.flight_id = flight_id
+        self.timestamp = None
+        self.cell = None
+
+class ProximityEngine:
+    def __init__(self, horizontal_nm: float = None, vertical_ft: float = None,
+                 min_altitude_ft: float = None, feed=None):
+        self.horizontal_nm = horizontal_nm or Config.PROXIMITY_HORIZONTAL_NM
+        self.vertical_ft = vertical_ft or Config.PROXIMITY_VERTICAL_FT
+        self.min_altitude_ft = Config.PROXIMITY_MIN_ALTITUDE_FT if min_altitude_ft is None else min_altitude_ft
+        self.feed = feed if feed is not None else live_feed
+
+        # Rows are cell_deg of latitude; columns split 360 degrees into whole cells >= cell_deg wide
+        self.cell_deg = self.horizontal_nm / 60
+        self.columns = max(int(360 // self.cell_deg), 1)
+        self.column_deg = 360 / self.columns
+
+        self._lock = threading.RLock()
+        self._aircraft = {}   # flight_id -> _Aircraft
+        self._cells = {}      # (row, column) -> set of flight_ids
+        self._dirty = set()   # cells touched since the last tick
+        self._moved = set()   # flight_ids updated since the last tick
+        self._alerts = {}     # (flight_id, flight_id) sorted -> alert
+        self._last_tick = 0.0
+        self._last_sweep = time.monotonic()
+
+    # ---- Grid ----
+    def _cell(self, latitude: float, longitude: float) -> tuple:
+        row = math.floor(latitude / self.cell_deg)
+        column = math.floor((longitude + 180) / self.column_deg) % self.columns
+        return row, column
+
+    def _neighbour_cells(self, cell: tuple):
+        """Cells that can hold aircraft within horizontal_nm of any point in `cell`"""
+        row, column = cell
+        # Columns narrow towards the poles, so more of them are needed to cover the threshold
+        edge_latitude = min(max(abs(row), abs(row + 1)) + 1, 90 / self.cell_deg) * self.cell_deg
+        cos_lat = math.cos(math.radians(min(edge_latitude, 89.9)))
+        span = min(math.ceil(self.cell_deg / (self.column_deg * cos_lat)), self.columns // 2)
+        for r in (row - 1, row, row + 1):
+            for c in range(column - span, column + span + 1):
+                yield r, c % self.columns
+
+    def _move(self, aircraft: _Aircraft, cell):
+        self._moved.add(aircraft.flight_id)
+        if aircraft.cell == cell:
+            self._dirty.add(cell)
+            return
+        if aircraft.cell is not None:
+            members = self._cells[aircraft.cell]
+            members.discard(aircraft.flight_id)
+            if not members:
+                del self._cells[aircraft.cell]
+            self._dirty.add(aircraft.cell)
+        aircraft.cell = cell
+        if cell is not None:
+            self._cells.setdefault(cell, set()).add(aircraft.flight_id)
+            self._dirty.add(cell)
+
+    # ---- Updates ----
+    def update(self, flight_id: str, position: dict, timestamp: datetime = None):
+        """Record a flight's position; its cell is re-evaluated on the next tick"""
+        with self._lock:
+            aircraft = self._aircraft.get(flight_id)
+            if aircraft is None:
+                aircraft = self._aircraft[flight_id] = _Aircraft(flight_id)
+            elif timestamp and aircraft.timestamp and timestamp < aircraft.timestamp:
+                return  # late arrival, the newer position stands
+            aircraft.latitude = position['latitude']
+            aircraft.longitude = position['longitude']
+            aircraft.altitude = position.get('altitude') or 0
+            aircraft.timestamp = timestamp
+            aircraft.seen = time.monotonic()
+            # Aircraft on or near the ground are not separated, keep them out of the grid
+            cell = (self._cell(aircraft.latitude, aircraft.longitude)
+                    if aircraft.altitude >= self.min_altitude_ft else None)
+            self._move(aircraft, cell)
+
+    def remove(self, flight_id: str):
+        """Forget a flight (completed or stale) and clear its alerts"""
+        with self._lock:
+            aircraft = self._aircraft.pop(flight_id, None)
+            if aircraft is not None:
+                self._move(aircraft, None)
+                for pair in [pair for pair in self._alerts if flight_id in pair]:
+                    self._clear(pair)
+
+    # ---- Evaluation ----
+    def maybe_tick(self):
+        """Tick if PROXIMITY_TICK_INTERVAL has passed since the last one (called from ingest)"""
+        if self._dirty and time.monotonic() - self._last_tick >= Config.PROXIMITY_TICK_INTERVAL:
+            self.tick()
+
+    def tick(self) -> dict:
+        """Re-evaluate the dirty cells and return what changed"""
+        with PROXIMITY_EVALUATION.time(), self._lock:
+            self._last_tick = time.monotonic()
+            if self._last_tick - self._last_sweep >= Config.PROXIMITY_STALE_SECONDS:
+                self._sweep_stale()
+            dirty, self._dirty = self._dirty, set()
+            moved, self._moved = self._moved, set()
+
+            found = {}
+            for cell in dirty:
+                if cell in self._cells:
+                    found.update(self._evaluate_cell(cell))
+
+            # Alerts involving an aircraft that moved and were not found again have cleared
+            cleared = [pair for pair in self._alerts
+                       if (pair[0] in moved or pair[1] in moved) and pair not in found]
+            for pair in cleared:
+                self._clear(pair)
+
+            raised = []
+            now = datetime.utcnow()
+            for pair, (horizontal, vertical) in found.items():
+                alert = self._alerts.get(pair)
+                if alert is None:
+                    alert = self._alerts[pair] = {'flight_ids': list(pair), 'detected_at': now}
+                    raised.append(alert)
+                alert['horizontal_nm'] = round(horizontal, 2)
+                alert['vertical_ft'] = round(vertical)
+                alert['updated_at'] = now
+            for alert in raised:
+                self.feed.publish('alert', dict(alert))
+
+            PROXIMITY_ACTIVE_ALERTS.set(len(self._alerts))
+            return {'cells': len(dirty), 'raised': len(raised), 'cleared': len(cleared)}
+
+    def _evaluate_cell(self, cell: tuple) -> dict:
+        """Pairs with one aircraft in `cell` and the other in it or a neighbour that are too close"""
+        members = [self._aircraft[f] for f in self._cells[cell]]
+        candidates = [self._aircraft[f] for c in set(self._neighbour_cells(cell))
+                      for f in self._cells.get(c, ())]
+        if len(candidates) < 2:
+            return {}
+
+        lat_a = np.array([a.latitude for a in members])[:, None]
+        lon_a = np.array([a.longitude for a in members])[:, None]
+        alt_a = np.array([a.altitude for a in members], dtype=float)[:, None]
+        lat_b = np.array([a.latitude for a in candidates])
+        lon_b = np.array([a.longitude for a in candidates])
+        alt_b = np.array([a.altitude for a in candidates], dtype=float)
+
+        horizontal = haversine_nm(lat_a, lon_a, lat_b, lon_b)
+        vertical = np.abs(alt_a - alt_b)
+        close = (horizontal <= self.horizontal_nm) & (vertical < self.vertical_ft)
+
+        pairs = {}
+        for i, j in zip(*np.nonzero(close)):
+            a, b = members[i].flight_id, candidates[j].flight_id
+            if a != b:
+                pairs[(a, b) if a < b else (b, a)] = (float(horizontal[i, j]), float(vertical[i, j]))
+        return pairs
+
+    def _clear(self, pair: tuple):
+        alert = self._alerts.pop(pair)
+        self.feed.publish('alert_cleared', {'flight_ids': alert['flight_ids'],
+                                            'cleared_at': datetime.utcnow()})
+
+    def _sweep_stale(self):
+        """Drop aircraft that have not reported for PROXIMITY_STALE_SECONDS"""
+        self._last_sweep = self._last_tick
+        cutoff = self._last_tick - Config.PROXIMITY_STALE_SECONDS
+        for flight_id in [f for f, a in self._aircraft.items() if a.seen < cutoff]:
+            self.remove(flight_id)
+
+    # ---- Reads ----
+    def get_alerts(self, flight_id: str = None) -> list:
+        """Active alerts (after evaluating any pending updates), closest first"""
+        if self._dirty:
+            self.tick()
+        with self._lock:
+            alerts = [dict(alert) for alert in self._alerts.values()
+                      if not flight_id or flight_id in alert['flight_ids']]
+        return sorted(alerts, key=lambda alert: alert['horizontal_nm'])
+
+# Shared engine (per process), fed by TrackingService
+proximity_engine = ProximityEngine()
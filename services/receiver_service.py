@@ -0,0 +1,269 @@
+import atexit
+import math
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from config import Config
+from models.storage import Storage, get_storage
+from utils.metrics import RECEIVER_FLUSH, RECEIVER_FLUSH_ERRORS
+#Receiver health and coverage, rolled up in-stream. Every tracking update is added to a pending
+#delta for its receiver (message count, signal strength histogram, coverage cell, hourly messages
+#and flights heard); the deltas are bulk-written to the receivers collection at most every
+#RECEIVER_FLUSH_INTERVAL seconds (by ingest, or by a background timer once ingest goes quiet), so the
+#API reads one small document per receiver and nothing ever scans tracking_updates. Reads never
+#flush: they can lag this process's ingest by up to RECEIVER_FLUSH_INTERVAL.
+
+SIGNAL_BINS = 10  # signal strength histogram over [0, 1]
+
+def hour_key(timestamp: datetime) -> str:
+    return timestamp.strftime('%Y%m%d%H')
+
+def _hour(key: str) -> datetime:
+    return datetime.strptime(key, '%Y%m%d%H')
+
+class _Pending:
+    """Changes to one receiver's rollup since the last flush"""
+    __slots__ = ('first_seen', 'last_seen', 'messages', 'signal', 'histogram', 'coverage', 'hours')
+
+    def __init__(self, timestamp: datetime):
+        self.first_seen = self.last_seen = timestamp
+        self.messages = 0
+        self.signal = [0, 0.0, 0.0, math.inf, -math.inf]  # count, sum, sum of squares, min, max
+        self.histogram = [0] * SIGNAL_BINS
+        self.coverage = {}  # 'row:column' -> messages
+        self.hours = {}     # hour key -> [messages, set of flight_ids]
+
+    def add(self, flight_id: str, position: dict, signal, timestamp: datetime):
+        self.first_seen = min(self.first_seen, timestamp)
+        self.last_seen = max(self.last_seen, timestamp)
+        self.messages += 1
+        if isinstance(signal, (int, float)):
+            stats = self.signal
+            stats[0] += 1
+            stats[1] += signal
+            stats[2] += signal * signal
+            stats[3] = min(stats[3], signal)
+            stats[4] = max(stats[4], signal)
+            self.histogram[min(max(int(signal * SIGNAL_BINS), 0), SIGNAL_BINS - 1)] += 1
+        cell_deg = Config.RECEIVER_COVERAGE_CELL_DEG
+        cell = f"{math.floor(position['latitude'] / cell_deg)}:{math.floor(position['longitude'] / cell_deg)}"
+        self.coverage[cell] = self.coverage.get(cell, 0) + 1
+        hour = self.hours.setdefault(hour_key(timestamp), [0, set()])
+        hour[0] += 1
+        hour[1].add(flight_id)
+
+    def merge(self, other: '_Pending'):
+        """Fold in the changes of another delta of the same receiver"""
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.messages += other.messages
+        stats, theirs = self.signal, other.signal
+        self.signal = [stats[0] + theirs[0], stats[1] + theirs[1], stats[2] + theirs[2],
+                       min(stats[3], theirs[3]), max(stats[4], theirs[4])]
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        for cell, messages in other.coverage.items():
+            self.coverage[cell] = self.coverage.get(cell, 0) + messages
+        for key, (messages, flights) in other.hours.items():
+            hour = self.hours.setdefault(key, [0, set()])
+            hour[0] += messages
+            hour[1] |= flights
+
+    def delta(self, receiver_id: str, expire_hours: list) -> dict:
+        count, total, squares, low, high = self.signal
+        return {
+            'receiver_id': receiver_id,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'messages': self.messages,
+            'signal': {
+                'count': count, 'sum': total, 'sum_sq': squares,
+                'min': low if count else None, 'max': high if count else None,
+                'histogram': {str(i): n for i, n in enumerate(self.histogram) if n}
+            },
+            'coverage': self.coverage,
+            'hours': {key: {'messages': n, 'flights': sorted(flights)} for key, (n, flights) in self.hours.items()},
+            'expire_hours': [key for key in expire_hours if key not in self.hours]
+        }
+
+class ReceiverRollups:
+    """Pending receiver deltas of this process, flushed to storage in bulk"""
+
+    def __init__(self, storage: Storage = None):
+        self.storage = storage or get_storage()
+        self._lock = threading.Lock()
+        self._pending = {}       # receiver_id -> _Pending
+        self._latest_hour = {}   # receiver_id -> newest hour key already expired behind
+        self._next_flush = time.monotonic() + Config.RECEIVER_FLUSH_INTERVAL
+        self._timer = None
+        self.flush_errors = 0
+
+    def record(self, receiver_id: str, flight_id: str, position: dict, signal, timestamp: datetime):
+        receiver_id = str(receiver_id)
+        with self._lock:
+            pending = self._pending.get(receiver_id)
+            if pending is None:
+                pending = self._pending[receiver_id] = _Pending(timestamp)
+            pending.add(flight_id, position, signal, timestamp)
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._flush_periodically, name='receiver-flush', daemon=True)
+                self._timer.start()
+
+    def _flush_periodically(self):
+        """Flush deltas left behind when ingest goes quiet (ingest itself only flushes on updates)"""
+        while True:
+            time.sleep(Config.RECEIVER_FLUSH_INTERVAL)
+            self.maybe_flush()
+            with self._lock:
+                if not self._pending:
+                    self._timer = None  # the next record starts a new one
+                    return
+
+    def maybe_flush(self) -> int:
+        """Flush if RECEIVER_FLUSH_INTERVAL has passed since the last flush"""
+        if time.monotonic() < self._next_flush:
+            return 0
+        return self.flush()
+
+    def flush(self) -> int:
+        """Write every pending delta in one bulk operation; returns the number of receivers written.
+        If the write fails the deltas are put back for the next flush and 0 is returned."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._next_flush = time.monotonic() + Config.RECEIVER_FLUSH_INTERVAL
+            latest_hour = {receiver_id: self._latest_hour.get(receiver_id) for receiver_id in pending}
+            deltas = [p.delta(receiver_id, self._expired_hours(receiver_id, p))
+                      for receiver_id, p in pending.items()]
+        if not deltas:
+            return 0
+        try:
+            with RECEIVER_FLUSH.time():
+                self.storage.flush_receiver_stats(deltas)
+        except Exception:
+            self._restore(pending, latest_hour)
+            return 0
+        return len(deltas)
+
+    def _restore(self, pending: dict, latest_hour: dict):
+        """Merge the deltas of a failed flush back into the pending ones"""
+        self.flush_errors += 1
+        RECEIVER_FLUSH_ERRORS.inc()
+        with self._lock:
+            for receiver_id, p in pending.items():
+                newer = self._pending.get(receiver_id)
+                if newer is not None:
+                    p.merge(newer)
+                self._pending[receiver_id] = p
+                if latest_hour[receiver_id] is None:
+                    self._latest_hour.pop(receiver_id, None)
+                else:
+                    self._latest_hour[receiver_id] = latest_hour[receiver_id]
+
+    def _expired_hours(self, receiver_id: str, pending: _Pending) -> list:
+        """Hour buckets that fell out of the retained window since this process last expired them
+        (at most one day of them, so a receiver that was silent longer leaves a few behind; reads
+        ignore those)"""
+        newest = max(pending.hours)
+        if self._latest_hour.get(receiver_id, '') >= newest:
+            return []
+        self._latest_hour[receiver_id] = newest
+        oldest_kept = _hour(newest) - timedelta(hours=Config.RECEIVER_RETAINED_HOURS - 1)
+        return [hour_key(oldest_kept - timedelta(hours=i)) for i in range(1, 25)]
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+_rollups = weakref.WeakKeyDictionary()
+_rollups_lock = threading.Lock()
+
+def receiver_rollups(storage: Storage = None) -> ReceiverRollups:
+    """The rollups shared by every service of this process that writes to `storage`"""
+    storage = storage or get_storage()
+    with _rollups_lock:
+        rollups = _rollups.get(storage)
+        if rollups is None:
+            rollups = _rollups[storage] = ReceiverRollups(storage)
+            atexit.register(rollups.flush)
+        return rollups
+
+class ReceiverService:
+    def __init__(self, storage: Storage = None):
+        self.storage = storage or get_storage()
+        self.rollups = receiver_rollups(self.storage)
+
+    def get_receivers(self) -> list:
+        """Summary of every receiver, most recently heard first"""
+        receivers = [self._summary(document) for document in self.storage.find_receivers()]
+        return sorted(receivers, key=lambda r: r['last_seen'], reverse=True)
+
+    def get_receiver(self, receiver_id: str) -> dict:
+        """Summary plus signal distribution, coverage grid and hourly activity"""
+        document = self.storage.get_receiver(receiver_id)
+        if not document:
+            raise ValueError('Receiver not found')
+
+        signal = document.get('signal') or {}
+        count = signal.get('count') or 0
+        histogram = signal.get('histogram') or {}
+        mean = signal['sum'] / count if count else None
+        variance = max(signal['sum_sq'] / count - mean * mean, 0) if count else None
+        cell_deg = Config.RECEIVER_COVERAGE_CELL_DEG
+        coverage = []
+        for cell, messages in (document.get('coverage') or {}).items():
+            row, column = map(int, cell.split(':'))
+            coverage.append({'latitude': row * cell_deg, 'longitude': column * cell_deg,
+                             'cell_deg': cell_deg, 'messages': messages})
+
+        return {
+            **self._summary(document),
+            'signal': {
+                'mean': round(mean, 4) if count else None,
+                'stddev': round(math.sqrt(variance), 4) if count else None,
+                'min': signal.get('min'),
+                'max': signal.get('max'),
+                'p50': self._percentile(histogram, count, 0.5),
+                'p95': self._percentile(histogram, count, 0.95),
+                'histogram': [{'low': i / SIGNAL_BINS, 'high': (i + 1) / SIGNAL_BINS,
+                               'count': histogram.get(str(i), 0)} for i in range(SIGNAL_BINS)]
+            },
+            'coverage': sorted(coverage, key=lambda c: c['messages'], reverse=True),
+            'hourly': [{'hour': _hour(key), 'messages': bucket['messages'], 'flights': len(bucket['flights'])}
+                       for key, bucket in self._retained_hours(document)]
+        }
+
+    @staticmethod
+    def _retained_hours(document: dict) -> list:
+        hours = document.get('hours') or {}
+        cutoff = hour_key(document['last_seen'] - timedelta(hours=Config.RECEIVER_RETAINED_HOURS - 1))
+        return sorted((key, bucket) for key, bucket in hours.items() if key >= cutoff)
+
+    def _summary(self, document: dict) -> dict:
+        hours = self._retained_hours(document)
+        # Rate over the current and the previous hour bucket (up to last_seen)
+        last_seen = document['last_seen']
+        since = last_seen.replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        recent = sum(bucket['messages'] for key, bucket in hours if key >= hour_key(since))
+        minutes = max((last_seen - since).total_seconds() / 60, 1)
+        signal = document.get('signal') or {}
+        return {
+            'receiver_id': document['receiver_id'],
+            'first_seen': document['first_seen'],
+            'last_seen': last_seen,
+            'messages': document.get('messages', 0),
+            'messages_per_minute': round(recent / minutes, 2),
+            'flights_heard': len({f for _, bucket in hours for f in bucket['flights']}),
+            'signal_mean': round(signal['sum'] / signal['count'], 4) if signal.get('count') else None
+        }
+
+    @staticmethod
+    def _percentile(histogram: dict, count: int, q: float):
+        """Upper edge of the histogram bin holding the q-th quantile"""
+        if not count:
+            return None
+        seen = 0
+        for i in range(SIGNAL_BINS):
+            seen += histogram.get(str(i), 0)
+            if seen >= q * count:
+                return (i + 1) / SIGNAL_BINS
+        return 1.0
@@ -0,0 +1,225 @@
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from config import Config
+from models.storage import Storage, get_storage
+#Flight search / typeahead. Every searchable value of a flight (id, flight number, airline,
+#registration, origin and destination codes) is a term in one sorted list of (term, flight_id)
+#pairs, so a prefix lookup is a binary search plus a short forward scan, whatever the fleet size.
+#The index holds active flights and the SEARCH_RECENT_LOGS most recent completed ones; it is loaded
+#on the first search and kept current by the ingest path and complete_flight. Flights activated or
+#completed by other processes are picked up by a sync at most every SEARCH_SYNC_INTERVAL seconds
+#(active flight ids plus the logs completed since the last sync).
+
+_NOT_ALNUM = re.compile(r'[^0-9A-Z]+')
+
+def _terms(flight: dict) -> set:
+    values = [flight.get('flight_id'), flight.get('flight_number'), flight.get('airline'),
+              (flight.get('aircraft') or {}).get('registration'),
+              (flight.get('origin') or {}).get('code'), (flight.get('destination') or {}).get('code')]
+    terms = set()
+    for value in values:
+        if not value:
+            continue
+        value = str(value).upper()
+        terms.add(value)
+        terms.add(_NOT_ALNUM.sub('', value))  # "PK-303" is found as "PK303" too
+        terms.update(value.split())           # and "Pakistan International" as "International"
+    terms.discard('')
+    return terms
+
+def _summary(flight: dict, status: str) -> dict:
+    return {
+        'flight_id': flight['flight_id'],
+        'flight_number': flight.get('flight_number'),
+        'airline': flight.get('airline'),
+        'registration': (flight.get('aircraft') or {}).get('registration'),
+        'origin': (flight.get('origin') or {}).get('code'),
+        'destination': (flight.get('destination') or {}).get('code'),
+        'status': status,
+        'completed_at': flight.get('completed_at')
+    }
+
+class PrefixIndex:
+    """Sorted (term, key) pairs with prefix lookup"""
+
+    def __init__(self):
+        self._entries = []  # sorted (term, key)
+        self._terms = {}    # key -> terms
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, terms: set):
+        self.remove(key)
+        self._terms[key] = terms
+        for term in terms:
+            insort(self._entries, (term, key))
+
+    def extend(self, items):
+        """Add many (key, terms) at once: one sort instead of an insort per term"""
+        for key, terms in items:
+            self.remove(key)
+            self._terms[key] = terms
+            self._entries.extend((term, key) for term in terms)
+        self._entries.sort()
+
+    def remove(self, key: str):
+        for term in self._terms.pop(key, ()):
+            index = bisect_left(self._entries, (term, key))
+            if index < len(self._entries) and self._entries[index] == (term, key):
+                del self._entries[index]
+
+    def terms(self, key: str) -> set:
+        return self._terms.get(key, set())
+
+    def scan(self, prefix: str, max_entries: int):
+        """(term, key) pairs whose term starts with `prefix`, in term order"""
+        index = bisect_left(self._entries, (prefix,))
+        for term, key in self._entries[index:index + max_entries]:
+            if not term.startswith(prefix):
+                return
+            yield term, key
+
+class SearchIndex:
+    def __init__(self, storage: Storage = None):
+        self.storage = storage or get_storage()
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._index = PrefixIndex()
+        self._flights = {}               # flight_id -> summary
+        self._completed = OrderedDict()  # completed flight_ids, oldest first
+        self._synced_to = None           # completed_at of the newest log indexed
+        self._next_sync = 0.0
+
+    def _ensure_loaded(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            flights = {}
+            for log in reversed(self.storage.find_recent_flight_logs(Config.SEARCH_RECENT_LOGS)):
+                flights[log['flight_id']] = (log, 'completed')
+                self._completed[log['flight_id']] = True
+                self._synced_to = log.get('completed_at') or self._synced_to
+            for flight in self.storage.find_flights():
+                flights[flight['flight_id']] = (flight, flight.get('status') or 'active')
+                self._completed.pop(flight['flight_id'], None)
+            for flight_id, (flight, status) in flights.items():
+                self._flights[flight_id] = _summary(flight, status)
+            self._index.extend((flight_id, _terms(flight)) for flight_id, (flight, _) in flights.items())
+            self._next_sync = time.monotonic() + Config.SEARCH_SYNC_INTERVAL
+            self.loaded = True
+
+    def _sync(self):
+        """Index completions and activations that happened in other processes"""
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self._next_sync = now + Config.SEARCH_SYNC_INTERVAL
+        logs = self.storage.find_recent_flight_logs(Config.SEARCH_RECENT_LOGS, since=self._synced_to)
+        active = self.storage.find_flight_ids('active')
+        with self._lock:
+            for log in reversed(logs):
+                self._add(log, 'completed')
+                self._synced_to = log.get('completed_at') or self._synced_to
+            stale = [flight_id for flight_id in active
+                     if (self._flights.get(flight_id) or {}).get('status') != 'active']
+        for flight_id in stale:
+            self._refresh(flight_id)
+
+    def _add(self, flight: dict, status: str):
+        flight_id = flight['flight_id']
+        self._flights[flight_id] = _summary(flight, status)
+        self._index.add(flight_id, _terms(flight))
+        if status == 'completed':
+            self._mark_completed(flight_id)
+        else:
+            self._completed.pop(flight_id, None)
+
+    def _mark_completed(self, flight_id: str):
+        """Keep only the SEARCH_RECENT_LOGS most recently completed flights"""
+        self._flights[flight_id]['status'] = 'completed'
+        self._completed[flight_id] = True
+        self._completed.move_to_end(flight_id)
+        while len(self._completed) > Config.SEARCH_RECENT_LOGS:
+            oldest, _ = self._completed.popitem(last=False)
+            self._flights.pop(oldest, None)
+            self._index.remove(oldest)
+
+    # ---- Updates (no-ops until the index is first used) ----
+    def observe(self, flight_id: str):
+        """A tracking update for the flight (which makes it active): index it if it is new or its
+        status changed (one storage read per change)"""
+        summary = self._flights.get(flight_id)
+        if not self.loaded or (summary and summary['status'] == 'active'):
+            return
+        self._refresh(flight_id)
+
+    def _refresh(self, flight_id: str):
+        flight = self.storage.get_flight(flight_id)
+        if flight:
+            with self._lock:
+                self._add(flight, flight.get('status') or 'active')
+
+    def complete(self, flight_id: str, flight_log: dict = None):
+        """The flight was archived; without its log (ingest workers) the indexed fields are kept"""
+        if not self.loaded:
+            return
+        with self._lock:
+            if flight_log:
+                self._add(flight_log, 'completed')
+            elif flight_id in self._flights:
+                self._mark_completed(flight_id)
+
+    # ---- Lookups ----
+    def search(self, query: str, limit: int = None, status: str = None, airline: str = None,
+               origin: str = None, destination: str = None) -> dict:
+        """Flights with a term starting with each word of `query`; exact terms and active flights first.
+        At most SEARCH_SCAN_LIMIT index entries are examined, filters included, and every match among
+        them is ranked before the cut to `limit`; `truncated` says the prefix had more entries."""
+        self._ensure_loaded()
+        self._sync()
+        words = [_NOT_ALNUM.sub('', w) or w for w in query.upper().split()]
+        if not words:
+            return {'results': [], 'truncated': False}
+        limit = limit or Config.SEARCH_DEFAULT_LIMIT
+        first, rest = words[0], words[1:]
+        results = {}
+        truncated = False
+        with self._lock:
+            for examined, (term, flight_id) in enumerate(self._index.scan(first, Config.SEARCH_SCAN_LIMIT + 1)):
+                if examined == Config.SEARCH_SCAN_LIMIT:
+                    truncated = True  # one entry past the cap still matches the prefix
+                    break
+                flight = self._flights[flight_id]
+                if ((status and flight['status'] != status) or (airline and flight['airline'] != airline)
+                        or (origin and flight['origin'] != origin)
+                        or (destination and flight['destination'] != destination)):
+                    continue
+                terms = self._index.terms(flight_id)
+                if all(any(t.startswith(w) for t in terms) for w in rest):
+                    rank = (term != first, flight['status'] != 'active', flight_id)
+                    if flight_id not in results or rank < results[flight_id][0]:
+                        results[flight_id] = (rank, flight)
+        ranked = sorted(results.values(), key=lambda r: r[0])
+        return {'results': [flight for _, flight in ranked[:limit]], 'truncated': truncated}
+
+    def stats(self) -> dict:
+        return {'flights': len(self._flights), 'completed': len(self._completed), 'terms': len(self._index)}
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+def search_index(storage: Storage = None) -> SearchIndex:
+    """The search index shared by every service of this process that reads `storage`"""
+    storage = storage or get_storage()
+    with _indexes_lock:
+        index = _indexes.get(storage)
+        if index is None:
+            index = _indexes[storage] = SearchIndex(storage)
+        return index
@@ -1,11 +1,49 @@
+from collections import OrderedDict
 from datetime import datetime
-from models.database import db
-from utils.helpers import parse_iso_timestamp
+from config import Config
+from models.live_state import live_state
+from models.storage import Storage, get_storage
+from services.extrapolation_service import ExtrapolationService
+from services.flight_service import FlightService
+from services.geofence_service import GeofenceService
+from services.live_feed import live_feed
+from services.proximity_service import ProximityEngine, proximity_engine
+from services.receiver_service import receiver_rollups
+from services.search_service import search_index
+from utils.helpers import parse_iso_timestamp, to_utc_naive
+from utils.metrics import TRACKING_UPDATES
 #It’s the "live tracking brain" of your system — constantly recording and updating where each flight is.
 class TrackingService:
+    def __init__(self, storage: Storage = None, proximity: ProximityEngine = None):
+        self.storage = storage or get_storage()
+        self.proximity = proximity or proximity_engine
+        self.flight_service = FlightService(self.storage, self.proximity)
+        self.geofence_service = GeofenceService(self.storage)
+        self.extrapolation = ExtrapolationService(self.storage)
+        self.receivers = receiver_rollups(self.storage)
+        self.search = search_index(self.storage)
+        self.live_state = live_state(self.storage)
+        self._latest = OrderedDict()  # flight_id -> timestamp of the newest update seen by this process
+
     def process_tracking_update(self, data: dict) -> dict:
         """Process and store tracking update"""
+        result = self.store_tracking_update(data)
+        self.publish_tracking_update(data, result)
+        return result
+    
+    def store_tracking_update(self, data: dict) -> dict:
+        """Write the update (history, current position, geofences); ingest workers run only this part"""
         timestamp = parse_iso_timestamp(data['timestamp'])
+        timestamp_utc = to_utc_naive(timestamp)
+        
+        # Every message counts towards its receiver's health, duplicates and stragglers included
+        self.receivers.record(data['receiver_id'], data['flight_id'], data['position'],
+                              data.get('signal_strength', 1.0), timestamp_utc)
+        self.receivers.maybe_flush()
+        
+        # Duplicates and stragglers of a flight that just landed must not bring it back to life
+        if self.geofence_service.engine.recently_arrived(data['flight_id'], timestamp_utc):
+            return {'success': True, 'ignored': 'Flight already completed'}
         
         # Store tracking update
         tracking_data = {
@@ -19,54 +57,93 @@ class TrackingService:
             'created_at': datetime.utcnow()
         }
         
-        db.tracking_updates.insert_one(tracking_data)
+        self.storage.insert_position(tracking_data)
         
-        # Update current flight position
-        flight_update = { #Update flight’s current position
-            'current_position': data['position'],
+        #Update (or create) the flight; current_position only moves forward in time, so a late or
+        #duplicate update from another receiver (or process) cannot overwrite a newer position
+        self.storage.update_current_position(data['flight_id'], data['position'], timestamp_utc, {
             'updated_at': datetime.utcnow(),
             'status': 'active'
-        }
+        })
+        if self.live_state:
+            self.live_state.put(data['flight_id'], data['position'], timestamp_utc,
+                                lambda: self.storage.get_flight(data['flight_id']))
         
-        db.flights.update_one( #Update (or create as upsert=true  will create a flight if it doesnt exist) flight record
-            {'flight_id': data['flight_id']},
-            {'$set': flight_update},
-            upsert=True
-        )
+        latest = self._latest.get(data['flight_id'])
+        if latest is not None and timestamp_utc <= latest:
+            return {'success': True, 'timestamp': timestamp_utc, 'current': False}
+        self._remember_latest(data['flight_id'], timestamp_utc)
         
-        return {'success': True}
+        # Fence entries/exits; landing inside the destination airport fence completes the flight
+        arrived = self.geofence_service.process_position(data['flight_id'], data['position'], timestamp_utc)
+        if arrived and Config.GEOFENCE_AUTO_COMPLETE:
+            self.geofence_service.record_arrival(data['flight_id'], data['position'], timestamp_utc)
+            self.flight_service.complete_flight(data['flight_id'], actual_arrival=timestamp_utc)
+            self._latest.pop(data['flight_id'], None)
+            return {'success': True, 'timestamp': timestamp_utc, 'current': True, 'completed': True}
+        return {'success': True, 'timestamp': timestamp_utc, 'current': True}
     
-    def get_flight_position(self, flight_id: str, timestamp_str: str = None, 
-                           include_path: bool = False) -> dict:
-        """Get flight position (current or historical)"""
-        from pymongo import DESCENDING
-        
-        # Find flight details
-        flight = db.flights.find_one({'flight_id': flight_id})
-        if not flight:
-            raise ValueError('Flight not found')
-        
-        position_data = None
+    def _remember_latest(self, flight_id: str, timestamp: datetime):
+        # Least recently updated flights are dropped first (flights completed elsewhere age out)
+        self._latest[flight_id] = timestamp
+        self._latest.move_to_end(flight_id)
+        while len(self._latest) > Config.TRACKING_LATEST_RETAINED:
+            self._latest.popitem(last=False)
+    
+    def publish_tracking_update(self, data: dict, result: dict):
+        """Feed proximity alerts and live clients (in the web process, also with ingest workers)"""
+        if not result.get('success') or result.get('ignored'):
+            return
+        TRACKING_UPDATES.inc()
+        if result.get('completed'):
+            self.proximity.remove(data['flight_id'])
+            self.extrapolation.drift.forget(data['flight_id'])
+            self.search.complete(data['flight_id'])
+            return
+        if not result.get('current'):
+            return
         
-        if timestamp_str:
-            # Get historical position
-            target_time = parse_iso_timestamp(timestamp_str) #converts to a string understandable by python
-            position_data = db.tracking_updates.find_one(
-                {
-                    'flight_id': flight_id,
-                    'timestamp': {'$lte': target_time}
-                },
-                sort=[('timestamp', DESCENDING)]
-            )
+        # Proximity is evaluated at most every PROXIMITY_TICK_INTERVAL
+        self.proximity.update(data['flight_id'], data['position'], result['timestamp'])
+        self.proximity.maybe_tick()
+        self.search.observe(data['flight_id'])
+        # Score the dead-reckoned position from the previous report against this one
+        self.extrapolation.drift.observe(data['flight_id'], data['position'], result['timestamp'])
+        if live_feed.subscriber_count:
+            live_feed.publish('position', {
+                'flight_id': data['flight_id'],
+                'position': data['position'],
+                'timestamp': result['timestamp'],
+                'projected': self.extrapolation.projected_path(data['position'], result['timestamp'])
+            })
+    
+    def get_flight_position(self, flight_id: str, timestamp_str: str = None, 
+                           include_path: bool = False, extrapolate_at: datetime = None,
+                           compact: bool = False) -> dict:
+        """Get flight position (current or historical); current positions are also dead-reckoned to
+        `extrapolate_at` (default now). A `compact` current position is served from the live-state
+        table when it is enabled, with origin/destination carrying only the airport code."""
+        use_table = compact and self.live_state and not timestamp_str
+        flight = self.live_state.get(flight_id) if use_table else None
+        if flight and flight.get('current_position'):
+            # Current position straight from the shared live-state table
+            position_data = {'position': flight['current_position']}
         else:
-            # Get latest position
-            position_data = db.tracking_updates.find_one(
-                {'flight_id': flight_id},
-                sort=[('timestamp', DESCENDING)]
-            )
-        
-        if not position_data and not timestamp_str:
-            position_data = {'position': flight.get('current_position')}
+            # Find flight details
+            flight = self.storage.get_flight(flight_id)
+            if not flight:
+                raise ValueError('Flight not found')
+            
+            if timestamp_str:
+                # Get historical position
+                target_time = parse_iso_timestamp(timestamp_str) #converts to a string understandable by python
+                position_data = self.storage.latest_position(flight_id, target_time)
+            else:
+                # Get latest position
+                position_data = self.storage.latest_position(flight_id)
+            
+            if not position_data and not timestamp_str:
+                position_data = {'position': flight.get('current_position')}
         
         response = {
             'flight_id': flight_id,
@@ -78,20 +155,22 @@ class TrackingService:
             'destination': flight.get('destination')
         }
         
+        if not timestamp_str and flight.get('status') == 'active':
+            response['extrapolated'] = self.extrapolation.extrapolate_flight(flight, extrapolate_at)
+        
         if include_path and position_data: #“Show me the last 10 times we received position data for this flight.”
-            recent_path = list(db.tracking_updates.find(
-                {'flight_id': flight_id},
-                {'position': 1, 'timestamp': 1}
-            ).sort('timestamp', DESCENDING).limit(10))
+            recent_path = self.storage.track(flight_id, last=Config.RECENT_PATH_LIMIT)
             
-            response['recent_path'] = [
-                {
-                    'latitude': pos['position']['latitude'],
-                    'longitude': pos['position']['longitude'],
-                    'altitude': pos['position']['altitude'],
-                    'timestamp': pos['timestamp']
-                }
-                for pos in reversed(recent_path)
-            ]
+            response['recent_path'] = recent_path.to_records(('latitude', 'longitude', 'altitude'))
         
-        return response
\ No newline at end of file
+        return response
+    
+    def get_extrapolated_positions(self, at: datetime = None) -> dict:
+        """Dead-reckoned positions of all active flights (one vectorized pass)"""
+        at = at or datetime.utcnow()
+        flights = self.extrapolation.extrapolate_all(at)
+        return {'at': at, 'flights': flights, 'count': len(flights)}
+    
+    def get_extrapolation_drift(self) -> dict:
+        """How far dead-reckoned positions were from the reports that followed, by horizon"""
+        return {'drift_rate': self.extrapolation.drift.drift_rate(), 'horizons': self.extrapolation.drift.summary()}
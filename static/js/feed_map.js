@@ -0,0 +1,169 @@
+// Map pages fed by the GeoJSON feeds (/api/feeds/...): Mapbox GL when configured, Leaflet otherwise.
+// The pages themselves are static; everything that changes is fetched from the feed. Between polls
+// the live map glides each aircraft towards its dead-reckoned position (/api/positions/extrapolated).
+const FeedMap = {
+    config() {
+        return JSON.parse(document.getElementById('map-config').textContent);
+    },
+
+    create(config, center = [30, 0], zoom = 2) {
+        if (config.mapbox_enabled) {
+            mapboxgl.accessToken = config.mapbox_token;
+            const style = config.mapbox_style.includes('://')
+                ? config.mapbox_style : `mapbox://styles/${config.mapbox_style}`;
+            const map = new mapboxgl.Map({
+                container: 'map', style, center: [center[1], center[0]], zoom
+            });
+            return { kind: 'mapbox', map, ready: new Promise(resolve => map.on('load', resolve)) };
+        }
+        // Canvas renderer: one <canvas> for all aircraft instead of a DOM element per marker
+        const map = L.map('map', { preferCanvas: true }).setView(center, zoom);
+        L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+            attribution: '&copy; OpenStreetMap contributors'
+        }).addTo(map);
+        return { kind: 'leaflet', map, ready: Promise.resolve() };
+    },
+
+    async fetchFeed(url) {
+        // The feeds send an ETag with no-cache, so unchanged polls come back as a 304
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`${url}: ${response.status}`);
+        return response.json();
+    },
+
+    popup(properties) {
+        // Built with textContent: flight ids and airlines come straight from tracking updates
+        const content = document.createElement('div');
+        const line = (tag, text) => {
+            const element = document.createElement(tag);
+            element.textContent = text;
+            content.appendChild(element);
+        };
+        line('h4', `Flight ${properties.flight_id}`);
+        line('p', `Airline: ${properties.airline || 'Unknown'}`);
+        line('p', `Altitude: ${properties.altitude} ft`);
+        line('p', `Speed: ${properties.speed} kts`);
+        line('p', `Heading: ${properties.heading}°`);
+        return content;
+    },
+
+    async projections(config) {
+        // Where the server dead-reckons each active flight at the next refresh
+        const at = new Date(Date.now() + config.refresh_seconds * 1000).toISOString();
+        const data = await this.fetchFeed(`${config.projection_url}?at=${encodeURIComponent(at)}`);
+        return new Map(data.flights.filter(f => !f.stale).map(f => [f.flight_id, f.position]));
+    },
+
+    glide(data, targets, seconds, move) {
+        // Step each aircraft from its report towards its projection once a second until the next refresh
+        const wrap = longitude => ((longitude + 540) % 360) - 180;
+        const moves = data.features.filter(f => targets.has(f.id)).map(feature => {
+            const [longitude, latitude] = feature.geometry.coordinates;
+            const target = targets.get(feature.id);
+            return {
+                feature, longitude, latitude,
+                dLon: wrap(target.longitude - longitude), dLat: target.latitude - latitude
+            };
+        });
+        let step = 0;
+        const timer = setInterval(() => {
+            const t = Math.min(++step / seconds, 1);
+            moves.forEach(m => {
+                m.feature.geometry.coordinates = [wrap(m.longitude + m.dLon * t), m.latitude + m.dLat * t];
+            });
+            move(moves.map(m => m.feature));
+            if (t >= 1) clearInterval(timer);
+        }, 1000);
+        return timer;
+    },
+
+    async live(config) {
+        const view = this.create(config);
+        await view.ready;
+        let layer = null;
+        const markers = new Map();  // Leaflet: flight_id -> marker, moved in place while gliding
+
+        if (view.kind === 'mapbox') {
+            view.map.addSource('flights', {
+                type: 'geojson', data: { type: 'FeatureCollection', features: [] }
+            });
+            view.map.addLayer({
+                id: 'flights', type: 'circle', source: 'flights',
+                paint: {
+                    'circle-radius': 5, 'circle-color': '#e74c3c',
+                    'circle-stroke-width': 1, 'circle-stroke-color': '#ffffff'
+                }
+            });
+            view.map.addLayer({
+                id: 'flight-labels', type: 'symbol', source: 'flights', minzoom: 5,
+                layout: { 'text-field': ['get', 'flight_id'], 'text-size': 11, 'text-offset': [0, 1.2] },
+                paint: { 'text-halo-color': '#ffffff', 'text-halo-width': 2 }
+            });
+            view.map.on('click', 'flights', e => {
+                new mapboxgl.Popup().setLngLat(e.lngLat)
+                    .setDOMContent(this.popup(e.features[0].properties)).addTo(view.map);
+            });
+        } else {
+            layer = L.geoJSON(null, {
+                pointToLayer: (feature, latlng) => L.circleMarker(latlng, {
+                    radius: 5, color: '#ffffff', weight: 1, fillColor: '#e74c3c', fillOpacity: 0.9
+                }),
+                onEachFeature: (feature, marker) => {
+                    markers.set(feature.id, marker);
+                    marker.bindPopup(() => this.popup(feature.properties));
+                }
+            }).addTo(view.map);
+        }
+
+        let gliding = null;
+        const refresh = async () => {
+            try {
+                const data = await this.fetchFeed(config.feed_url);
+                clearInterval(gliding);
+                if (view.kind === 'mapbox') {
+                    view.map.getSource('flights').setData(data);
+                } else {
+                    markers.clear();
+                    layer.clearLayers();
+                    layer.addData(data);
+                }
+                document.getElementById('flight-count').textContent = `${data.features.length} flights`;
+                const targets = await this.projections(config);
+                gliding = this.glide(data, targets, config.refresh_seconds, features => {
+                    if (view.kind === 'mapbox') {
+                        view.map.getSource('flights').setData(data);
+                    } else {
+                        features.forEach(f => markers.get(f.id)?.setLatLng(
+                            [f.geometry.coordinates[1], f.geometry.coordinates[0]]));
+                    }
+                });
+            } catch (error) {
+                console.error('Failed to load flights:', error);
+            }
+        };
+        await refresh();
+        setInterval(refresh, config.refresh_seconds * 1000);
+    },
+
+    async path(config) {
+        const view = this.create(config);
+        const [data] = await Promise.all([this.fetchFeed(config.feed_url), view.ready]);
+        const [minLon, minLat, maxLon, maxLat] = data.bbox;
+        const properties = data.features[0].properties;
+
+        if (view.kind === 'mapbox') {
+            view.map.addSource('flight-path', { type: 'geojson', data });
+            view.map.addLayer({
+                id: 'flight-path', type: 'line', source: 'flight-path',
+                layout: { 'line-join': 'round', 'line-cap': 'round' },
+                paint: { 'line-color': '#3388ff', 'line-width': 4, 'line-opacity': 0.8 }
+            });
+            view.map.fitBounds([[minLon, minLat], [maxLon, maxLat]], { padding: 50 });
+        } else {
+            L.geoJSON(data, { style: { color: '#3388ff', weight: 4, opacity: 0.8 } }).addTo(view.map);
+            view.map.fitBounds([[minLat, minLon], [maxLat, maxLon]], { padding: [50, 50] });
+        }
+        document.getElementById('flight-info').textContent =
+            `${properties.origin || '?'} → ${properties.destination || '?'} · ${properties.points} points`;
+    }
+};
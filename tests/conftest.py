@@ -0,0 +1,4 @@
+import os
+
+# Run the suite on the in-process storage engine unless a MongoDB run is asked for explicitly
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
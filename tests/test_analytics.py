@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime
+from app import create_app
+from models.storage import get_storage
+from services.analytics_service import AnalyticsService
+
+class TestRollupIncrements:
+    def setup_method(self):
+        self.flight_log = {
+            'flight_id': 'TEST123',
+            'airline': 'PIA',
+            'origin': {'code': 'KHI'},
+            'destination': {'code': 'LHE'},
+            'actual_departure': datetime(2024, 1, 15, 10, 0),
+            'actual_arrival': datetime(2024, 1, 15, 11, 45),
+            'scheduled_arrival': '2024-01-15T11:30:00Z',
+            'tracking_path': [
+                {'latitude': 24.86, 'longitude': 67.01, 'altitude': 0, 'timestamp': datetime(2024, 1, 15, 10, 0)},
+                {'latitude': 31.52, 'longitude': 74.36, 'altitude': 0, 'timestamp': datetime(2024, 1, 15, 11, 45)}
+            ]
+        }
+
+    def test_flight_increments(self):
+        increments = AnalyticsService.flight_increments(self.flight_log)
+        assert increments['flights'] == 1
+        assert increments['block_time_total'] == 105
+        assert increments['delay_total'] == 15
+        assert increments['distance_total'] == pytest.approx(1030, rel=0.02)
+
+    def test_missing_schedule_skips_delay(self):
+        del self.flight_log['scheduled_arrival']
+        increments = AnalyticsService.flight_increments(self.flight_log)
+        assert 'delay_total' not in increments
+        assert increments['block_time_count'] == 1
+
+    def test_summarise_averages(self):
+        summary = AnalyticsService._summarise({
+            'airline': 'PIA', 'flights': 2,
+            'block_time_total': 200, 'block_time_count': 2,
+            'distance_total': 3000, 'distance_count': 2
+        })
+        assert summary == {
+            'airline': 'PIA', 'flights': 2,
+            'avg_block_time': 100, 'avg_distance': 1500, 'avg_delay': None
+        }
+
+class TestAnalyticsAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_completed_flight_shows_up_in_the_rollups(self):
+        get_storage().upsert_flight('AN101', {'airline': 'Analytics Air', 'flight_number': 'AN-101',
+                                              'origin': {'code': 'ANK'}, 'destination': {'code': 'ANL'}})
+        for minute, (latitude, longitude) in enumerate(((24.86, 67.01), (31.52, 74.36))):
+            self.client.post('/api/tracking/update', json={
+                'flight_id': 'AN101', 'receiver_id': 'REC-001', 'timestamp': f'2024-01-15T1{minute}:00:00Z',
+                'position': {'latitude': latitude, 'longitude': longitude, 'altitude': 0, 'heading': 45, 'speed': 0}
+            })
+        assert self.client.post('/api/flights/AN101/complete').status_code == 200
+
+        airlines = self.client.get('/api/analytics/airlines?airline=Analytics Air').json['airlines']
+        assert len(airlines) == 1 and airlines[0]['flights'] == 1
+        assert airlines[0]['avg_distance'] == pytest.approx(1030, rel=0.02)
+        routes = self.client.get('/api/analytics/routes?origin=ANK&destination=ANL').json['routes']
+        assert [(r['origin'], r['destination'], r['flights']) for r in routes] == [('ANK', 'ANL', 1)]
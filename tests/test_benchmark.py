@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime, timedelta
+from benchmarks.traffic import AIRPORTS, SimulatedAircraft, build_fleet, generate_updates, great_circle_point
+from benchmarks.run_benchmark import percentile, summarise
+from utils.validators import validate_tracking_data
+
+class TestTrafficGenerator:
+    def test_great_circle_endpoints(self):
+        lat1, lon1 = AIRPORTS['KHI']
+        lat2, lon2 = AIRPORTS['LHR']
+        assert great_circle_point(lat1, lon1, lat2, lon2, 0)[:2] == pytest.approx((lat1, lon1))
+        assert great_circle_point(lat1, lon1, lat2, lon2, 1)[:2] == pytest.approx((lat2, lon2))
+
+    def test_initial_heading(self):
+        # London -> New York sets off roughly west-north-west
+        lat, lon, heading = great_circle_point(*AIRPORTS['LHR'], *AIRPORTS['JFK'], 0)
+        assert 280 < heading < 300
+
+    def test_aircraft_stays_on_route(self):
+        start = datetime(2024, 1, 15, 10, 0)
+        plane = SimulatedAircraft('TEST123', 'PIA', 'KHI', 'LHE', start)
+        assert plane.position_at(start)['altitude'] == 0
+        assert plane.position_at(start + plane.duration / 2)['altitude'] == 35000
+        assert plane.position_at(start + plane.duration * 2)['latitude'] == pytest.approx(AIRPORTS['LHE'][0])
+
+    def test_updates_are_valid_and_overlap(self):
+        start = datetime(2024, 1, 15, 10, 0)
+        fleet = build_fleet(3, start)
+        updates = list(generate_updates(fleet, start, 10, 5, receivers=4, overlap=2))
+        # 3 ticks x 3 aircraft x 2 receivers
+        assert len(updates) == 18
+        assert all(validate_tracking_data(update) is None for update in updates)
+        assert updates[0]['receiver_id'] != updates[1]['receiver_id']
+
+class TestBenchmarkReport:
+    def test_percentile(self):
+        samples = list(range(101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 99) == 99
+        assert percentile([], 50) is None
+
+    def test_summarise(self):
+        stats = summarise([0.001, 0.002, 0.003, 0.004], elapsed=2.0, errors=1)
+        assert stats['requests'] == 4
+        assert stats['throughput_rps'] == 2.0
+        assert stats['p50_ms'] == 2.5
+        assert stats['errors'] == 1
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from app import create_app
+from services.extrapolation_service import DriftTracker, ExtrapolationService, distance_nm, drift_tracker, project
+from models.memory_storage import MemoryStorage
+
+def position(latitude: float, longitude: float, heading: float = 0, speed: float = 360,
+             altitude: float = 30000, vertical_rate: float = 0) -> dict:
+    return {'latitude': latitude, 'longitude': longitude, 'altitude': altitude,
+            'heading': heading, 'speed': speed, 'vertical_rate': vertical_rate}
+
+class TestProjection:
+    def test_great_circle_projection(self):
+        # 60 kts for an hour is 60 nm: one degree of latitude north, one of longitude east at the equator
+        lat, lon, alt = project(np.array([0.0, 0.0]), np.array([10.0, 179.5]), np.array([1000.0, 1000.0]),
+                                np.array([0.0, 90.0]), np.array([60.0, 60.0]), np.array([500.0, -500.0]), 3600)
+        assert lat == pytest.approx([1.0, 0.0], abs=0.01)
+        assert lon == pytest.approx([10.0, -179.5], abs=0.01)  # wraps at the antimeridian
+        assert alt.tolist() == [31000.0, 0.0]                  # never below the ground
+
+    def test_drift_is_measured_against_the_next_report(self):
+        drift = DriftTracker()
+        start = datetime(2024, 1, 15, 10, 0)
+        lat, lon, _ = project(40.0, -74.0, 30000, 45, 360, 0, 30)
+        drift.observe('A', position(40.0, -74.0, heading=45), start)
+        drift.observe('A', position(float(lat), float(lon), heading=45), start + timedelta(seconds=30))
+        drift.observe('A', position(float(lat) + 0.1, float(lon), heading=45), start + timedelta(seconds=95))
+        summary = drift.summary()
+        assert summary['30-60s']['samples'] == 1 and summary['30-60s']['max_nm'] < 0.001
+        assert summary['60-120s']['p95_nm'] > 1
+        assert summary['0-10s'] == {'samples': 0}
+
+class TestExtrapolationService:
+    def test_extrapolates_all_active_flights(self):
+        storage = MemoryStorage()
+        reported = datetime(2024, 1, 15, 10, 0)
+        for flight_id, heading in (('N', 0), ('E', 90)):
+            storage.update_current_position(flight_id, position(10.0, 20.0, heading), reported, {'status': 'active'})
+        service = ExtrapolationService(storage, DriftTracker())
+
+        flights = {f['flight_id']: f for f in service.extrapolate_all(reported + timedelta(seconds=60))}
+        assert flights['N']['position']['latitude'] > 10.0 and flights['E']['position']['longitude'] > 20.0
+        travelled = distance_nm(10.0, 20.0, flights['N']['position']['latitude'], flights['N']['position']['longitude'])
+        assert travelled == pytest.approx(6.0, abs=0.01)  # 360 kts for a minute
+        assert flights['N']['confidence']['radius_nm'] == pytest.approx(0.05 + 0.05 * 6, abs=0.001)
+        assert not flights['N']['stale']
+
+        stale = service.extrapolate_all(reported + timedelta(hours=1))
+        assert all(f['stale'] for f in stale)
+
+class TestExtrapolationAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_position_and_all_flights_endpoints(self):
+        for seconds in (0, 20):
+            self.client.post('/api/tracking/update', json={
+                'flight_id': 'DR1', 'receiver_id': 'REC-001',
+                'position': position(-20.0, 130.0 + seconds * 0.0017, heading=90),
+                'timestamp': f'2024-01-15T10:30:{seconds:02d}Z'
+            })
+
+        response = self.client.get('/api/flights/DR1/position?at=2024-01-15T10:30:50Z')
+        assert response.status_code == 200
+        extrapolated = response.json['extrapolated']
+        assert extrapolated['age_s'] == 30.0
+        assert extrapolated['position']['longitude'] > 130.034
+
+        response = self.client.get('/api/positions/extrapolated?at=2024-01-15T10:30:50Z')
+        assert 'DR1' in [f['flight_id'] for f in response.json['flights']]
+        assert self.client.get('/api/positions/extrapolated?at=soon').status_code == 400
+
+        drift = self.client.get('/api/positions/extrapolated/drift').json
+        assert drift['horizons']['10-30s']['samples'] >= 1
+
+    def test_completing_a_flight_forgets_its_last_report(self):
+        self.client.post('/api/tracking/update', json={
+            'flight_id': 'DR2', 'receiver_id': 'REC-001', 'position': position(-20.0, 130.0, heading=90),
+            'timestamp': '2024-01-15T10:30:00Z'
+        })
+        assert 'DR2' in drift_tracker._reports
+        assert self.client.post('/api/flights/DR2/complete').status_code == 200
+        assert 'DR2' not in drift_tracker._reports
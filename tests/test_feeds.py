@@ -0,0 +1,77 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from app import create_app
+from models.storage import get_storage
+from services.visualization_service import VisualizationService
+from utils.metrics import RENDER_DURATION
+
+START = datetime(2024, 1, 15, 10, 0)
+
+class TestMapFeeds:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_flights_feed_is_compact_gzipped_and_revalidated(self):
+        self.client.post('/api/tracking/update', json={
+            'flight_id': 'FEED01', 'receiver_id': 'REC-001', 'timestamp': '2024-01-15T10:30:00Z',
+            'position': {'latitude': 12.3456789, 'longitude': 45.6789012, 'altitude': 35000,
+                         'heading': 90, 'speed': 450}
+        })
+        response = self.client.get('/api/feeds/flights.geojson', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        feed = json.loads(gzip.decompress(response.data))
+        feature = next(f for f in feed['features'] if f['id'] == 'FEED01')
+        assert feature['geometry']['coordinates'] == [45.6789, 12.34568]
+
+        etag = response.headers['ETag']
+        again = self.client.get('/api/feeds/flights.geojson',
+                                headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert again.status_code == 304 and again.data == b''
+        plain = self.client.get('/api/feeds/flights.geojson', headers={'If-None-Match': etag})
+        assert plain.status_code == 200 and 'Content-Encoding' not in plain.headers
+
+    def test_path_feed(self):
+        path = [{'latitude': 30.0 + m / 100, 'longitude': 70.0, 'altitude': 35000,
+                 'timestamp': START + timedelta(minutes=m)} for m in range(20)]
+        get_storage().archive_flight({'flight_id': 'FEED02', 'tracking_path': path, 'completed_at': START,
+                                      'origin': {'code': 'KHI'}, 'destination': {'code': 'LHE'}})
+        response = self.client.get('/api/feeds/flights/FEED02/path.geojson')
+        assert response.status_code == 200 and 'max-age' in response.headers['Cache-Control']
+        assert response.json['bbox'] == [70.0, 30.0, 70.0, 30.19]
+        assert response.json['features'][0]['properties']['points'] == 20
+        assert self.client.get('/api/feeds/flights/NOPE/path.geojson').status_code == 404
+
+    def test_map_pages_are_static_shells(self):
+        response = self.client.get('/flight/map')
+        assert response.status_code == 200
+        assert response.cache_control.public and response.cache_control.max_age == 86400
+        assert b'/api/feeds/flights.geojson' in response.data and b'FEED01' not in response.data
+        assert b'/api/positions/extrapolated' in response.data  # markers glide between polls
+        assert self.client.get('/flight/FEED02/path-map').status_code == 200
+        assert self.client.get('/flight_map').status_code == 302
+
+    def test_flight_page_embeds_untrusted_fields_as_json(self):
+        get_storage().upsert_flight('FEED03', {
+            'airline': '<img src=x onerror=alert(1)></script>', 'aircraft': {'type': 'A320'},
+            'origin': {'code': 'KHI'}, 'destination': {'code': 'LHE'},
+            'current_position': {'latitude': 30.0, 'longitude': 70.0, 'altitude': 35000, 'speed': 450, 'heading': 90}
+        })
+        page = self.client.get('/flight/FEED03/map').data.decode()
+        data = page[page.index('id="flight-data"'):]
+        data = data[data.index('>') + 1:data.index('</script>')]
+        assert json.loads(data)['flight']['airline'] == '<img src=x onerror=alert(1)></script>'
+
+    def test_fallback_map_is_timed_once(self, tmp_path):
+        path = [{'latitude': 30.0 + m / 100, 'longitude': 70.0, 'altitude': 35000,
+                 'timestamp': START + timedelta(minutes=m)} for m in range(5)]
+        get_storage().archive_flight({'flight_id': 'FEED04', 'tracking_path': path, 'completed_at': START,
+                                      'origin': {'code': 'KHI'}, 'destination': {'code': 'LHE'}})
+        service = VisualizationService()
+        service.mapbox_enabled = False
+        renders = lambda kind: sum(RENDER_DURATION.labels(kind).counts)
+        mapbox, osm = renders('flight_mapbox'), renders('flight_path')
+        assert service.create_mapbox_map('FEED04', str(tmp_path))['map_type'] == 'openstreetmap'
+        assert (renders('flight_mapbox'), renders('flight_path')) == (mapbox + 1, osm)
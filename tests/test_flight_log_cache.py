@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from app import create_app
+from config import Config
+from models.memory_storage import MemoryStorage
+from models.storage import get_storage
+from services.flight_log_cache import FlightLogCache
+from utils.profiling import ADMIN_SIGNATURE_HEADER, SIGNATURE_HEADER, sign_request
+
+START = datetime(2024, 1, 15, 10, 0)
+
+def archive(storage, flight_id: str, points: int = 100):
+    path = [{'latitude': 30.0 + m / 100, 'longitude': 70.0, 'altitude': 35000,
+             'timestamp': START + timedelta(minutes=m)} for m in range(points)]
+    storage.archive_flight({'flight_id': flight_id, 'tracking_path': path, 'completed_at': START})
+
+class SlowStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_flight_log(self, *args, **kwargs):
+        self.reads += 1
+        time.sleep(0.05)
+        return super().get_flight_log(*args, **kwargs)
+
+class TestFlightLogCache:
+    def test_hits_misses_and_not_found(self):
+        storage = SlowStorage()
+        archive(storage, 'A')
+        cache = FlightLogCache(storage, max_bytes=10 * 1024 * 1024)
+        assert len(cache.get('A')['tracking_path']) == 100
+        assert cache.get('A') is cache.get('A')
+        assert cache.get('NOPE') is None and cache.get('NOPE') is None
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['entries']) == (2, 3, 1)
+        assert storage.reads == 3
+
+    def test_evicts_least_recently_used_within_max_bytes(self):
+        storage = MemoryStorage()
+        for flight_id in 'ABC':
+            archive(storage, flight_id)
+        probe = FlightLogCache(storage, max_bytes=10 * 1024 * 1024)
+        probe.get('A')
+        one_log = probe.stats()['bytes']
+
+        cache = FlightLogCache(storage, max_bytes=int(one_log * 2.5))
+        cache.get('A')
+        cache.get('B')
+        cache.get('A')  # B is now least recently used
+        cache.get('C')
+        stats = cache.stats()
+        assert stats['entries'] == 2 and stats['evictions'] == 1 and stats['bytes'] <= cache.max_bytes
+        cache.get('A')
+        assert cache.stats()['hits'] == 2
+
+    def test_concurrent_misses_share_one_read(self):
+        storage = SlowStorage()
+        archive(storage, 'A')
+        cache = FlightLogCache(storage, max_bytes=10 * 1024 * 1024)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('A'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert storage.reads == 1
+        assert len({id(log) for log in results}) == 1
+        assert cache.stats()['coalesced'] + cache.stats()['hits'] == 7
+
+    def test_invalidation_only_discards_loads_of_that_flight(self):
+        storage = SlowStorage()
+        archive(storage, 'A')
+        archive(storage, 'B')
+        cache = FlightLogCache(storage, max_bytes=10 * 1024 * 1024)
+        for flight_id, invalidated, kept in (('A', 'C', 1), ('B', 'B', 1)):
+            loader = threading.Thread(target=cache.get, args=(flight_id,))
+            loader.start()
+            time.sleep(0.01)  # the read is in progress
+            cache.invalidate(invalidated)
+            loader.join()
+            assert cache.stats()['entries'] == kept  # B was changed mid-read: served, not kept
+
+    def test_archive_generation_invalidates(self, monkeypatch):
+        monkeypatch.setattr(Config, 'FLIGHT_LOG_CACHE_GENERATION_CHECK', 0)
+        storage = MemoryStorage()
+        archive(storage, 'A')
+        cache = FlightLogCache(storage, max_bytes=10 * 1024 * 1024)
+        cache.get('A')
+        cache.get_body('A', lambda log: b'{}')
+        assert cache.stats()['serialized_bodies'] == 1
+        storage.bump_archive_generation()
+        cache.get('A')
+        assert cache.stats()['misses'] == 2
+
+class TestFlightLogCacheAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        archive(get_storage(), 'CACHE01', 50)
+
+    @pytest.fixture(autouse=True)
+    def profile_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Config, 'PROFILING_DIR', str(tmp_path))
+        return tmp_path
+
+    def test_history_is_served_from_the_cache(self, profile_dir):
+        path = '/admin/cache/flight-logs'
+        admin = {ADMIN_SIGNATURE_HEADER: sign_request('GET', path, scope='admin')}
+        entries = self.client.get(path, headers=admin).json['entries']
+        cold = self.client.get('/api/flights/CACHE01/history?every=25')
+        assert len(cold.json['tracking_path']) == 2
+        assert self.client.get(path, headers=admin).json['entries'] == entries  # sliced by storage
+
+        first = self.client.get('/api/flights/CACHE01/history')
+        second = self.client.get('/api/flights/CACHE01/history')
+        assert first.status_code == 200 and first.data == second.data
+        assert len(first.json['tracking_path']) == 50 and first.json['tracking_path_count'] == 50
+        window = self.client.get('/api/flights/CACHE01/history?every=10')
+        assert len(window.json['tracking_path']) == 5
+
+        assert self.client.get(path).status_code == 403
+        assert self.client.get(path, headers={SIGNATURE_HEADER: sign_request('GET', path)}).status_code == 403
+        assert self.client.get(path, headers={ADMIN_SIGNATURE_HEADER: sign_request('GET', path)}).status_code == 403
+        stats = self.client.get(path, headers=admin).json
+        assert stats['hits'] >= 2 and stats['serialized_bodies'] >= 1
+        stats = self.client.delete(path, headers={ADMIN_SIGNATURE_HEADER: sign_request('DELETE', path, scope='admin')}).json
+        assert stats['entries'] == 0
+        assert os.listdir(profile_dir) == []  # admin calls are never profiled
@@ -0,0 +1,35 @@
+import pytest
+from datetime import datetime, timedelta
+from app import create_app
+from models.storage import get_storage
+
+START = datetime(2024, 1, 15, 10, 0)
+
+class TestFlightHistoryAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        path = [{'latitude': 30.0 + m / 100, 'longitude': 70.0, 'altitude': 35000,
+                 'timestamp': START + timedelta(minutes=m)} for m in range(120)]
+        get_storage().archive_flight({'flight_id': 'HIST01', 'tracking_path': path, 'completed_at': START})
+
+    def test_full_history(self):
+        response = self.client.get('/api/flights/HIST01/history')
+        assert response.status_code == 200
+        assert len(response.json['tracking_path']) == 120
+
+    def test_window_sampling_and_paging(self):
+        response = self.client.get('/api/flights/HIST01/history'
+                                   '?from=2024-01-15T11:00:00Z&to=2024-01-15T11:29:59Z&every=10&limit=2')
+        assert response.status_code == 200
+        assert [p['timestamp'] for p in response.json['tracking_path']] == [
+            '2024-01-15T11:00:00', '2024-01-15T11:10:00']
+        assert response.json['tracking_path_count'] == 3
+
+    @pytest.mark.parametrize('query', ['from=noon', 'every=0', 'limit=-1', 'offset=x',
+                                       'from=2024-01-15T12:00:00Z&to=2024-01-15T11:00:00Z'])
+    def test_invalid_parameters(self, query):
+        assert self.client.get(f'/api/flights/HIST01/history?{query}').status_code == 400
+
+    def test_unknown_flight(self):
+        assert self.client.get('/api/flights/NOPE/history?limit=5').status_code == 404
@@ -0,0 +1,124 @@
+import pytest
+from datetime import datetime, timedelta
+from app import create_app
+from config import Config
+from models.geofence import Geofence
+from models.memory_storage import MemoryStorage
+from services.flight_service import FlightService
+from services.geofence_service import GeofenceEngine, GeofenceService
+from services.tracking_service import TrackingService
+from utils.validators import validate_geofence_data
+
+START = datetime(2024, 1, 15, 10, 0)
+LHE = (31.5216, 74.4036)
+
+class TestGeofence:
+    def test_circle_and_polygon_contains(self):
+        circle = Geofence.airport('LHE', *LHE, 8)
+        assert circle.contains(LHE[0] + 0.05, LHE[1])
+        assert not circle.contains(LHE[0] + 0.1, LHE[1])
+
+        square = Geofence('sq', 'Square', 'polygon', polygon=[(0, 0), (1, 0), (1, 1), (0, 1)])
+        assert square.contains(0.5, 0.5)
+        assert not square.contains(1.5, 0.5)
+
+    def test_fences_across_the_antimeridian(self):
+        fiji = Geofence('fj', 'Fiji', 'polygon', polygon=[(177, -19), (-179, -19), (-179, -16), (177, -16)])
+        assert fiji.bbox == (177, -19, -179, -16)
+        assert fiji.contains(-17.5, 179.5) and fiji.contains(-17.5, -179.5)
+        assert not fiji.contains(-17.5, 0) and not fiji.contains(-17.5, -178)
+        circle = Geofence('c', 'Circle', 'circle', (179.9, 0.0), 50)
+        assert circle.contains(0.0, -179.9) and not circle.contains(0.0, 179.0)
+
+        engine = GeofenceEngine(cell_deg=1.0)
+        engine.add(fiji)
+        assert [f.fence_id for f in engine.index.candidates(-17.5, -179.5)] == ['fj']
+        assert [f.fence_id for f in engine.index.candidates(-17.5, 178.5)] == ['fj']
+        assert engine.index.remove('fj') and engine.index._cells == {}
+
+    def test_validation(self):
+        assert validate_geofence_data({'type': 'circle', 'center': [74.4, 31.5], 'radius_km': 5}) is None
+        assert validate_geofence_data({'type': 'circle', 'center': [74.4, 131.5], 'radius_km': 5})
+        assert validate_geofence_data({'type': 'polygon', 'polygon': [[0, 0], [1, 1]]})
+        assert validate_geofence_data({'type': 'hexagon'})
+
+class TestGeofenceService:
+    def setup_method(self):
+        self.storage = MemoryStorage()
+        self.engine = GeofenceEngine()
+        self.storage.upsert_flight('PK301', {
+            'origin': {'code': 'KHI', 'latitude': 24.9065, 'longitude': 67.1608},
+            'destination': {'code': 'LHE', 'latitude': LHE[0], 'longitude': LHE[1]}
+        })
+        self.service = GeofenceService(self.storage, self.engine)
+        self.tracking = TrackingService(self.storage)
+        self.tracking.geofence_service = self.service
+        self.tracking.flight_service = FlightService(self.storage, geofences=self.engine)
+
+    def update(self, minutes: int, latitude: float, longitude: float, altitude: float, speed: float) -> dict:
+        return self.tracking.process_tracking_update({
+            'flight_id': 'PK301', 'receiver_id': 'REC-001',
+            'position': {'latitude': latitude, 'longitude': longitude, 'altitude': altitude,
+                         'heading': 45, 'speed': speed},
+            'timestamp': (START + timedelta(minutes=minutes)).isoformat() + 'Z'
+        })
+
+    def test_entry_exit_events(self):
+        self.service.create_fence({'fence_id': 'box', 'type': 'polygon',
+                                   'polygon': [[70, 28], [71, 28], [71, 29], [70, 29]]})
+        self.update(0, 27.9, 70.5, 35000, 450)
+        self.update(1, 28.5, 70.5, 35000, 450)
+        self.update(2, 29.5, 70.5, 35000, 450)
+        events = self.service.get_events(flight_id='PK301', fence_id='box')
+        assert [e['event'] for e in events] == ['exit', 'enter']
+        assert events[1]['timestamp'] == START + timedelta(minutes=1)
+        assert {f['fence_id'] for f in self.service.get_fences()} == {'box', 'airport:KHI', 'airport:LHE'}
+
+    def test_landing_at_destination_completes_flight(self):
+        assert 'completed' not in self.update(0, LHE[0] + 0.03, LHE[1], 1500, 140)  # on approach
+        assert self.update(3, *LHE, 700, 20)['completed']
+        assert self.storage.get_flight('PK301') is None
+        assert self.storage.get_flight_log('PK301')['actual_arrival'] == START + timedelta(minutes=3)
+        assert len(self.storage.get_flight_log('PK301')['tracking_path']) == 2
+        assert self.update(3, *LHE, 700, 20)['ignored']  # same position from another receiver
+        assert self.storage.get_flight('PK301') is None
+        assert [e['event'] for e in self.service.get_events(flight_id='PK301')] == ['arrival', 'enter']
+
+    def test_fences_changed_by_another_process(self, monkeypatch):
+        monkeypatch.setattr(Config, 'GEOFENCE_GENERATION_CHECK', 0)
+        other = GeofenceService(self.storage, GeofenceEngine())  # another process: same storage, own engine
+        assert other.get_fences() == []
+        self.service.create_fence({'fence_id': 'box', 'type': 'polygon',
+                                   'polygon': [[70, 28], [71, 28], [71, 29], [70, 29]]})
+        assert [f['fence_id'] for f in other.get_fences()] == ['box']
+        other.process_position('PK301', {'latitude': 28.5, 'longitude': 70.5}, START)
+        assert other.engine.state('PK301').inside == {'box'}
+
+        self.service.delete_fence('box')
+        assert other.process_position('PK301', {'latitude': 28.6, 'longitude': 70.5}, START) is False
+        assert other.engine.state('PK301').inside == set()
+        assert [e['event'] for e in self.service.get_events(fence_id='box')] == ['enter']  # no exit
+
+    def test_destination_set_after_the_first_position(self):
+        self.storage.upsert_flight('PK301', {'destination': None})
+        self.update(0, LHE[0] + 0.03, LHE[1], 1500, 140)
+        self.storage.upsert_flight('PK301', {'destination': {'code': 'LHE', 'latitude': LHE[0],
+                                                             'longitude': LHE[1]}})
+        assert 'completed' not in self.update(1, LHE[0] + 0.02, LHE[1], 1000, 120)  # not re-read yet
+        self.engine.state('PK301').refresh_at = 0  # GEOFENCE_FLIGHT_REFRESH seconds later
+        assert self.update(3, *LHE, 700, 20)['completed']
+
+class TestGeofenceAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_create_list_delete(self):
+        response = self.client.post('/api/geofences', json={
+            'fence_id': 'test-zone', 'type': 'circle', 'center': [10.0, 50.0], 'radius_km': 20})
+        assert response.status_code == 201
+        assert 'test-zone' in [f['fence_id'] for f in self.client.get('/api/geofences').json['geofences']]
+        assert self.client.post('/api/geofences', json={'type': 'circle'}).status_code == 400
+        assert self.client.delete('/api/geofences/test-zone').status_code == 200
+        assert self.client.delete('/api/geofences/test-zone').status_code == 404
+        assert self.client.get('/api/geofences/events?from=yesterday').status_code == 400
@@ -0,0 +1,98 @@
+import queue
+import pytest
+from datetime import datetime, timedelta
+from config import Config
+from services.ingest_workers import IngestPool, shard_for
+
+START = datetime(2024, 1, 15, 10, 0)
+
+def update(flight_id: str, seconds: int) -> dict:
+    return {
+        'flight_id': flight_id, 'receiver_id': 'REC-001',
+        'position': {'latitude': 40.0 + seconds / 1000, 'longitude': -74.0, 'altitude': 35000,
+                     'heading': 90, 'speed': 450},
+        'timestamp': (START + timedelta(seconds=seconds)).isoformat() + 'Z'
+    }
+
+class TestSharding:
+    def test_shard_is_stable_and_spread(self):
+        assert shard_for('PK301', 4) == shard_for('PK301', 4)
+        shards = {shard_for(f'PK{i}', 4) for i in range(100)}
+        assert shards == {0, 1, 2, 3}
+
+    def test_memory_backend_needs_opt_in(self):
+        with pytest.raises(ValueError):
+            IngestPool(2, storage_backend='memory')
+
+class TestIngestPool:
+    def test_updates_are_applied_in_order_per_flight(self):
+        published = []
+        pool = IngestPool(2, publish=lambda data, result: published.append((data['flight_id'], result)),
+                          storage_backend='memory', allow_private_storage=True)
+        try:
+            pool.submit_many([update(f'PK{i}', s) for s in range(20) for i in range(5)])
+            pool.submit(update('PK0', 5))  # late duplicate timestamp
+            assert pool.drain(timeout=60)
+        finally:
+            pool.close()
+
+        assert pool.stats()['processed'] == 101
+        assert pool.stats()['out_of_order'] == 0 and pool.stats()['errors'] == 0
+        results = [result for flight_id, result in published if flight_id == 'PK0']
+        assert [r['timestamp'] for r in results] == [START + timedelta(seconds=s) for s in list(range(20)) + [5]]
+        assert results[-1]['current'] is False
+
+    def test_a_backed_up_worker_rejects_the_whole_batch(self, monkeypatch):
+        monkeypatch.setattr(Config, 'INGEST_SUBMIT_TIMEOUT', 0.05)
+        pool = IngestPool(2, storage_backend='memory', queue_size=1, allow_private_storage=True)
+        pool.started = True  # workers are not started, so nothing drains the queues
+        first, second = 'PK0', next(f'PK{i}' for i in range(1, 100) if shard_for(f'PK{i}', 2) != shard_for('PK0', 2))
+        pool.submit(update(first, 0))
+        with pytest.raises(queue.Full):
+            pool.submit_many([update(second, 0), update(first, 1)])
+        assert pool._inboxes[shard_for(second, 2)].empty() and pool.submitted == 1
+        pool.submit(update(second, 0))  # the other worker still has room
+        assert pool.submitted == 2
+        for inbox in pool._inboxes:
+            inbox.cancel_join_thread()
+
+    def test_sequence_bookkeeping_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(Config, 'TRACKING_LATEST_RETAINED', 3)
+        pool = IngestPool(1, storage_backend='memory', allow_private_storage=True)
+        try:
+            pool.submit_many([update(f'PK{i}', 0) for i in range(5)])
+            assert pool.drain(timeout=60)
+        finally:
+            pool.close()
+        assert list(pool._last_sequence) == ['PK2', 'PK3', 'PK4']
+
+    def test_a_dead_worker_is_replaced(self, monkeypatch):
+        monkeypatch.setattr(Config, 'INGEST_WORKER_CHECK_INTERVAL', 0.05)
+        pool = IngestPool(2, storage_backend='memory', allow_private_storage=True)
+        try:
+            pool.submit_many([update(f'PK{i}', 0) for i in range(10)])
+            assert pool.drain(timeout=60)
+            pool._processes[0].kill()
+            pool._processes[0].join()
+            pool.submit_many([update(f'PK{i}', 1000) for i in range(10)])  # queued for the dead worker too
+            assert pool.drain(timeout=60)
+            pool.submit_many([update(f'PK{i}', 2000) for i in range(10)])
+            assert pool.drain(timeout=60)
+        finally:
+            pool.close()
+        stats = pool.stats()
+        assert stats['restarts'] == 1 and stats['processed'] == stats['submitted'] == 30
+        assert stats['errors'] == len([i for i in range(10) if shard_for(f'PK{i}', 2) == 0])  # the lost batch
+
+    def test_one_pool_per_host(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Config, 'INGEST_LOCK_PATH', str(tmp_path / 'ingest.lock'))
+        pool = IngestPool(1, storage_backend='memory', allow_private_storage=True)
+        other = IngestPool(1, storage_backend='memory', allow_private_storage=True)
+        try:
+            pool.start()
+            with pytest.raises(RuntimeError, match='single process'):
+                other.submit(update('PK0', 0))  # e.g. a second web worker
+        finally:
+            pool.close()
+        other.start()  # the lock went with the first pool
+        other.close()
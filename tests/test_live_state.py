@@ -0,0 +1,160 @@
+import pytest
+from datetime import datetime, timedelta
+from config import Config
+from models.live_state import LiveStateTable
+from models.memory_storage import MemoryStorage
+from services.flight_service import FlightService
+from services.ingest_workers import IngestPool
+from services.tracking_service import TrackingService
+
+START = datetime(2024, 1, 15, 10, 0)
+
+def position(latitude: float) -> dict:
+    return {'latitude': latitude, 'longitude': 70.0, 'altitude': 35000, 'heading': 90, 'speed': 450}
+
+def flight(airline: str, origin: str, destination: str) -> dict:
+    return {'airline': airline, 'flight_number': 'PK-303', 'status': 'active',
+            'origin': {'code': origin, 'name': 'Jinnah International'}, 'destination': {'code': destination}}
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'flights.live')
+
+class TestLiveStateTable:
+    def test_put_get_and_remove(self, path):
+        table = LiveStateTable(path, capacity=8, storage=MemoryStorage())
+        assert table.put('PK303', position(30.0), START, lambda: flight('PIA', 'KHI', 'LHE'))
+        assert table.put('PK303', position(30.1), START + timedelta(seconds=5))
+        assert not table.put('PK303', position(29.0), START)  # older than the stored position
+        record = table.get('PK303')
+        assert record['current_position'] == position(30.1)
+        assert record['position_timestamp'] == START + timedelta(seconds=5)
+        assert record['airline'] == 'PIA' and record['origin'] == {'code': 'KHI'}
+        table.remove('PK303')
+        assert table.get('PK303') is None and table.flights() == []
+
+    def test_shared_between_mappings(self, path):
+        # Two mappings of one file behave like two processes: separate slot maps, one record array
+        writer = LiveStateTable(path, capacity=8, storage=MemoryStorage())
+        reader = LiveStateTable(path, capacity=99, storage=MemoryStorage())
+        assert reader.capacity == 8  # an existing table keeps its layout
+        writer.put('PK303', position(30.0), START, lambda: flight('PIA', 'KHI', 'LHE'))
+        writer.put('EK600', position(25.0), START, lambda: flight('Emirates', 'DXB', 'KHI'))
+        assert reader.get('PK303')['current_position']['latitude'] == 30.0
+        writer.put('PK303', position(31.0), START + timedelta(seconds=1))
+        assert reader.get('PK303')['current_position']['latitude'] == 31.0
+        writer.remove('PK303')
+        writer.put('PK304', position(32.0), START, lambda: flight('PIA', 'LHE', 'KHI'))  # reuses the slot
+        assert reader.get('PK303') is None
+        assert reader.get('PK304')['current_position']['latitude'] == 32.0
+        assert [f['flight_id'] for f in reader.flights(airline='PIA')] == ['PK304']
+        assert [f['flight_id'] for f in reader.flights(destination='KHI')] == ['PK304', 'EK600']
+
+    def test_records_being_written_are_not_read(self, path, monkeypatch):
+        monkeypatch.setattr(Config, 'LIVE_STATE_READ_RETRIES', 3)
+        table = LiveStateTable(path, capacity=8, storage=MemoryStorage())
+        table.put('PK303', position(30.0), START, lambda: {})
+        table.put('EK600', position(25.0), START, lambda: {})
+        slot = table._slots[b'PK303']
+        table._records['seq'][slot] += 1  # a writer is half-way through the record
+        assert table.get('PK303') is None
+        assert [f['flight_id'] for f in table.flights()] == ['EK600']
+        table.put('PK303', position(30.5), START + timedelta(seconds=1))  # recovers the counter
+        assert table.get('PK303')['current_position']['latitude'] == 30.5
+
+    def test_full_table_and_rebuild(self, path):
+        storage = MemoryStorage()
+        storage.upsert_flight('PK303', flight('PIA', 'KHI', 'LHE'))
+        storage.update_current_position('PK303', position(30.0), START)
+        storage.upsert_flight('EK600', flight('Emirates', 'DXB', 'KHI'))
+        table = LiveStateTable(path, capacity=2, storage=storage)  # a new file is loaded from storage
+        assert table.get('PK303')['current_position'] == position(30.0)
+        assert table.get('EK600')['current_position'] is None
+
+        storage.upsert_flight('QR601', flight('Qatar', 'DOH', 'KHI'))
+        storage.update_current_position('QR601', position(20.0), START)
+        assert not table.put('QR601', position(20.0), START, lambda: {})
+        assert table.overflowed
+        storage.delete_flight('EK600')
+        table.remove('EK600')  # the freed slot takes in the flight that did not fit
+        assert not table.overflowed and table.get('QR601')['current_position'] == position(20.0)
+
+        storage.upsert_flight('EK601', flight('Emirates', 'DXB', 'LHE'))
+        assert table.rebuild() == 2 and table.overflowed  # EK601 does not fit
+        storage.delete_flight('QR601')
+        assert table.rebuild() == 2 and not table.overflowed
+        assert [f['flight_id'] for f in table.flights()] == ['PK303', 'EK601']
+
+    def test_reload_reads_storage_outside_the_lock(self, path, monkeypatch):
+        storage = MemoryStorage()
+        for flight_id in ('PK303', 'EK600', 'QR601', 'EY201'):
+            storage.upsert_flight(flight_id, flight('PIA', 'KHI', 'LHE'))
+        table = LiveStateTable(path, capacity=2, storage=storage)  # QR601 and EY201 do not fit
+        other = LiveStateTable(path, storage=storage)
+        find_flights = storage.find_flights
+
+        def complete_qr601_meanwhile(*args):
+            flights = find_flights(*args)
+            if storage.get_flight('QR601'):
+                storage.delete_flight('QR601')
+                other.remove('QR601')  # would block if the scan held the lock
+            return flights
+
+        monkeypatch.setattr(storage, 'find_flights', complete_qr601_meanwhile)
+        storage.delete_flight('PK303')
+        table.remove('PK303')
+        assert table.get('QR601') is None  # the scan that still had it was read again
+        assert table.get('EY201') is not None and not table.overflowed
+
+    def test_long_flight_ids(self, path):
+        table = LiveStateTable(path, capacity=4, storage=MemoryStorage())
+        for s in range(3):
+            assert table.put('PIA-PK303-20240115', position(30.0 + s), START + timedelta(seconds=s), lambda: {})
+        assert table.stats()['flights'] == 1  # one slot, found again on every put
+        assert table.get('PIA-PK303-20240115')['current_position']['latitude'] == 32.0
+
+        too_long = 'PIA-PK303-20240115-KHI-LHE-A320-AP-BHV'  # never cut: it could name another flight
+        assert not table.put(too_long, position(30.0), START, lambda: {})
+        assert table.get(too_long) is None and table.stats()['flights'] == 1
+        assert table.overflowed  # flights() misses it, so listings go to storage
+
+class TestLiveStateServices:
+    def test_ingest_and_reads_use_the_table(self, path, monkeypatch):
+        monkeypatch.setattr(Config, 'LIVE_STATE_PATH', path)
+        storage = MemoryStorage()
+        storage.upsert_flight('PK303', flight('PIA', 'KHI', 'LHE'))
+        tracking = TrackingService(storage)
+        flights = FlightService(storage)
+        tracking.process_tracking_update({'flight_id': 'PK303', 'receiver_id': 'REC-001',
+                                          'position': position(30.0), 'timestamp': '2024-01-15T10:00:00Z'})
+
+        assert tracking.live_state is flights.live_state
+        storage.update_current_position('PK303', position(10.0), START + timedelta(hours=1))  # not in the table
+        assert flights.get_flights('active', compact=True)[0]['current_position']['latitude'] == 30.0
+        assert tracking.get_flight_position('PK303', compact=True)['position']['latitude'] == 30.0
+        historical = tracking.get_flight_position('PK303', '2024-01-15T10:00:00Z', compact=True)
+        assert historical['position']['latitude'] == 30.0
+        # Without `compact`, full documents from storage
+        full = flights.get_flights('active')[0]
+        assert full['current_position']['latitude'] == 10.0 and full['origin']['name'] == 'Jinnah International'
+        assert tracking.get_flight_position('PK303')['origin']['name'] == 'Jinnah International'
+
+        flights.complete_flight('PK303')
+        assert flights.get_flights(compact=True) == []
+        with pytest.raises(ValueError):
+            tracking.get_flight_position('PK303')
+
+    def test_ingest_workers_write_the_table(self, path, monkeypatch):
+        monkeypatch.setattr(Config, 'LIVE_STATE_PATH', path)
+        table = LiveStateTable(path, storage=MemoryStorage())
+        pool = IngestPool(2, storage_backend='memory', allow_private_storage=True)
+        try:
+            pool.submit_many([{'flight_id': f'PK{i}', 'receiver_id': 'REC-001', 'position': position(30.0 + s),
+                               'timestamp': (START + timedelta(seconds=s)).isoformat() + 'Z'}
+                              for s in range(5) for i in range(6)])
+            assert pool.drain(timeout=60)
+        finally:
+            pool.close()
+        flights = table.flights()
+        assert sorted(f['flight_id'] for f in flights) == [f'PK{i}' for i in range(6)]
+        assert {f['current_position']['latitude'] for f in flights} == {34.0}
@@ -0,0 +1,92 @@
+import pytest
+from types import SimpleNamespace
+from app import create_app
+from utils.metrics import (HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION, HTTP_REQUESTS, MONGO_COMMAND_DURATION,
+                           MONGO_COMMAND_FAILURES, MONGO_POOL_CHECKED_OUT, MONGO_POOL_WAIT,
+                           CommandMetricsListener, MetricsRegistry, PoolMetricsListener)
+
+def observations(histogram) -> int:
+    return sum(histogram.counts)
+
+class TestMetricsRegistry:
+    def setup_method(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_with_labels(self):
+        counter = self.registry.counter('requests_total', 'Requests', ('route',))
+        counter.labels('/api/flights').inc()
+        counter.labels('/api/flights').inc(2)
+        assert 'requests_total{route="/api/flights"} 3' in self.registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+        lines = self.registry.render().splitlines()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert 'latency_seconds_count 4' in lines
+        assert 'latency_seconds_sum 6.05' in lines
+
+    def test_label_values_are_escaped(self):
+        gauge = self.registry.gauge('in_flight', 'In flight', ('route',))
+        gauge.labels('/a"b').set(1)
+        assert 'in_flight{route="/a\\"b"} 1' in self.registry.render()
+
+class TestRequestMetrics:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_requests_show_up_in_metrics_endpoint(self):
+        route = ('GET', '/api/flights/<flight_id>/position')
+        requests, timed = HTTP_REQUESTS.labels(*route, 404).value, observations(HTTP_REQUEST_DURATION.labels(*route))
+        assert self.client.get('/api/flights/NOPE/position').status_code == 404
+
+        assert HTTP_REQUESTS.labels(*route, 404).value == requests + 1
+        assert observations(HTTP_REQUEST_DURATION.labels(*route)) == timed + 1
+        assert HTTP_IN_FLIGHT.labels(*route).value == 0
+        response = self.client.get('/metrics')
+        assert response.status_code == 200 and response.mimetype == 'text/plain'
+        body = response.get_data(as_text=True)
+        assert (f'http_requests_total{{method="GET",route="/api/flights/<flight_id>/position",status="404"}} '
+                f'{requests + 1}') in body
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/flights/<flight_id>/position"}' in body
+
+class TestMongoListeners:
+    def event(self, command_name: str, command: dict = None, **fields):
+        return SimpleNamespace(command_name=command_name, command=command or {}, request_id=7,
+                               connection_id=('localhost', 27017), **fields)
+
+    def test_commands_are_timed_by_collection(self):
+        listener = CommandMetricsListener()
+        find = MONGO_COMMAND_DURATION.labels('flight_logs', 'find')
+        get_more = MONGO_COMMAND_DURATION.labels('flight_logs', 'getMore')
+        found, more = observations(find), observations(get_more)
+        failures = MONGO_COMMAND_FAILURES.labels('flight_logs', 'getMore').value
+
+        listener.started(self.event('find', {'find': 'flight_logs'}))
+        listener.succeeded(self.event('find', duration_micros=2500))
+        listener.started(self.event('getMore', {'getMore': 123, 'collection': 'flight_logs'}))
+        listener.failed(self.event('getMore', duration_micros=1000))
+
+        assert observations(find) == found + 1 and observations(get_more) == more + 1
+        assert MONGO_COMMAND_FAILURES.labels('flight_logs', 'getMore').value == failures + 1
+        assert listener._collections == {}
+
+    def test_pool_checkout_wait_and_checked_out(self):
+        listener = PoolMetricsListener()
+        waits, checked_out = observations(MONGO_POOL_WAIT.labels()), MONGO_POOL_CHECKED_OUT.labels().value
+        listener.connection_check_out_started(None)
+        listener.connection_checked_out(None)
+        assert observations(MONGO_POOL_WAIT.labels()) == waits + 1
+        assert MONGO_POOL_CHECKED_OUT.labels().value == checked_out + 1
+        listener.connection_checked_in(None)
+        assert MONGO_POOL_CHECKED_OUT.labels().value == checked_out
+
+        listener.connection_check_out_started(None)
+        listener.connection_check_out_failed(None)
+        listener.connection_checked_out(None)  # no wait recorded without a started checkout
+        assert observations(MONGO_POOL_WAIT.labels()) == waits + 1
+        listener.connection_checked_in(None)
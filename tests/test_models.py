@@ -0,0 +1,57 @@
+import pytest
+from datetime import datetime, timedelta
+from models.flight_models import Position
+from models.track_buffer import TrackBuffer, TRACK_DTYPE
+
+START = datetime(2024, 1, 15, 10, 0)
+
+def point(latitude: float, altitude: float = 35000) -> dict:
+    return {'latitude': latitude, 'longitude': -74.0, 'altitude': altitude,
+            'heading': 85.5, 'speed': 450, 'vertical_rate': 0}
+
+class TestModels:
+    def test_models_have_no_instance_dict(self):
+        position = Position(40.7, -74.0, 35000, 85.5, 450)
+        assert not hasattr(position, '__dict__')
+        with pytest.raises(AttributeError):
+            position.colour = 'red'
+
+class TestTrackBuffer:
+    def setup_method(self):
+        self.buffer = TrackBuffer(2)
+        for minute in range(5):
+            self.buffer.append(point(40.0 + minute), START + timedelta(minutes=minute))
+
+    def test_append_grows_and_keeps_order(self):
+        assert len(self.buffer) == 5
+        assert self.buffer.data.dtype == TRACK_DTYPE
+        assert self.buffer.timestamps() == [START + timedelta(minutes=m) for m in range(5)]
+
+    def test_late_point_is_inserted_in_order(self):
+        index = self.buffer.append(point(99.0), START + timedelta(minutes=2, seconds=30))
+        assert index == 3
+        assert self.buffer.position(3).latitude == 99.0
+        assert self.buffer.timestamps() == sorted(self.buffer.timestamps())
+
+    def test_index_at_and_slices(self):
+        assert self.buffer.index_at(START - timedelta(minutes=1)) == -1
+        assert self.buffer.index_at(START + timedelta(minutes=2, seconds=30)) == 2
+        window = self.buffer.slice(START + timedelta(minutes=1), START + timedelta(minutes=3))
+        assert [p['latitude'] for p in window.to_records()] == [41.0, 42.0, 43.0]
+        assert [p['latitude'] for p in self.buffer.tail(2).to_records()] == [43.0, 44.0]
+        assert len(self.buffer.tail(0)) == 0
+
+    def test_records_round_float32_columns(self):
+        buffer = TrackBuffer()
+        buffer.append({'latitude': 40.7128, 'longitude': -74.006, 'heading': 85.3}, START)
+        record = buffer.to_records()[0]
+        assert record['heading'] == 85.3
+        assert record['altitude'] is None
+        assert record['timestamp'] == START
+
+    def test_geojson_and_bounds(self):
+        feature = self.buffer.to_geojson({'flight_id': 'TEST123'})
+        assert feature['geometry']['type'] == 'LineString'
+        assert feature['geometry']['coordinates'][0] == [-74.0, 40.0, 35000.0]
+        assert feature['properties'] == {'flight_id': 'TEST123'}
+        assert self.buffer.bounds() == [[-74.0, 40.0], [-74.0, 44.0]]
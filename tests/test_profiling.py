@@ -0,0 +1,81 @@
+import os
+import time
+import pytest
+from flask import Flask, jsonify
+from config import Config
+from utils import profiling
+
+class TestRequestProfiling:
+    def setup_method(self):
+        self.app = Flask(__name__)
+        profiling.init_app(self.app)
+
+        @self.app.route('/api/flights/<flight_id>/position')
+        def position(flight_id):
+            with profiling.phase('validation'):
+                pass
+            profiling.record_phase('mongo', 0.002)
+            with profiling.phase('serialization'):
+                return jsonify({'flight_id': flight_id})
+
+        self.client = self.app.test_client()
+
+    @pytest.fixture(autouse=True)
+    def profile_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Config, 'PROFILING_DIR', str(tmp_path))
+        monkeypatch.setattr(Config, 'PROFILING_ENABLED', False)
+        return tmp_path
+
+    def test_unsigned_request_is_not_profiled(self, profile_dir):
+        response = self.client.get('/api/flights/TEST123/position')
+        assert 'X-Profile-Id' not in response.headers
+        assert os.listdir(profile_dir) == []
+
+    def test_signed_request_is_profiled(self, profile_dir):
+        path = '/api/flights/TEST123/position'
+        response = self.client.get(path, headers={
+            profiling.SIGNATURE_HEADER: profiling.sign_request('GET', path)
+        })
+        profile_id = response.headers['X-Profile-Id']
+        assert sorted(os.listdir(profile_dir)) == [f'{profile_id}.json', f'{profile_id}.pstats']
+
+        summary = profiling.list_profiles(str(profile_dir))[0]
+        assert summary['endpoint'] == 'position'
+        assert set(summary['phases_ms']) == {'validation', 'mongo', 'serialization'}
+        assert summary['phases_ms']['mongo'] == 2.0
+
+    def test_one_cprofile_at_a_time(self, profile_dir):
+        path = '/api/flights/TEST123/position'
+        running = profiling.RequestProfile('cprofile')
+        assert running.start()  # as if another request were being profiled
+        try:
+            response = self.client.get(path, headers={profiling.SIGNATURE_HEADER: profiling.sign_request('GET', path)})
+            assert response.status_code == 409
+        finally:
+            running.stop()
+        response = self.client.get(path, headers={profiling.SIGNATURE_HEADER: profiling.sign_request('GET', path)})
+        assert response.status_code == 200 and 'X-Profile-Id' in response.headers
+
+    def test_signature_covers_query_and_expires(self, profile_dir):
+        path = '/api/flights/TEST123/position'
+        signature = profiling.sign_request('GET', path)
+        assert profiling.verify_signature('GET', path, signature)
+        assert not profiling.verify_signature('GET', path + '?include_path=true', signature)
+        assert not profiling.verify_signature('POST', path, signature)
+        expired = profiling.sign_request('GET', path, time.time() - Config.PROFILING_SIGNATURE_MAX_AGE - 1)
+        assert not profiling.verify_signature('GET', path, expired)
+        assert not profiling.verify_signature('GET', path, signature.split(':')[1])
+        response = self.client.get(path, headers={profiling.SIGNATURE_HEADER: expired})
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_sampling_rate_and_retention(self, profile_dir, monkeypatch):
+        monkeypatch.setattr(Config, 'PROFILING_ENABLED', True)
+        monkeypatch.setattr(Config, 'PROFILING_SAMPLE_RATE', 1.0)
+        monkeypatch.setattr(Config, 'PROFILING_MODE', 'sampling')
+        monkeypatch.setattr(Config, 'PROFILING_MAX_RETAINED', 2)
+        for _ in range(4):
+            self.client.get('/api/flights/TEST123/position')
+
+        profiles = profiling.list_profiles(str(profile_dir))
+        assert len(profiles) == 2
+        assert all(p['file'].endswith('.folded') for p in profiles)
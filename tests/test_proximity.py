@@ -0,0 +1,75 @@
+import random
+import pytest
+from itertools import combinations
+from app import create_app
+from services.live_feed import LiveFeed
+from services.proximity_service import ProximityEngine
+from utils.helpers import calculate_distance
+
+def position(latitude: float, longitude: float, altitude: float = 35000) -> dict:
+    return {'latitude': latitude, 'longitude': longitude, 'altitude': altitude, 'heading': 90, 'speed': 450}
+
+class TestProximityEngine:
+    def setup_method(self):
+        self.feed = LiveFeed()
+        self.events = self.feed.subscribe()
+        self.engine = ProximityEngine(horizontal_nm=5, vertical_ft=1000, min_altitude_ft=1500, feed=self.feed)
+
+    def test_close_pair_raises_and_clears(self):
+        self.engine.update('A', position(40.0, -74.0))
+        self.engine.update('B', position(40.03, -74.0, 35500))  # ~1.8 nm, 500 ft
+        self.engine.update('C', position(40.03, -74.0, 37000))  # vertically separated
+        assert self.engine.tick()['raised'] == 1
+        assert [a['flight_ids'] for a in self.engine.get_alerts()] == [['A', 'B']]
+        assert self.events.get(timeout=0)[0] == 'alert'
+
+        self.engine.update('B', position(41.0, -74.0))
+        assert self.engine.tick()['cleared'] == 1
+        assert self.engine.get_alerts() == []
+        assert self.events.get(timeout=0)[0] == 'alert_cleared'
+
+    def test_pair_across_cell_and_antimeridian_boundaries(self):
+        self.engine.update('A', position(10.0, 179.99))
+        self.engine.update('B', position(10.0, -179.99))
+        assert len(self.engine.get_alerts()) == 1
+
+    def test_ground_traffic_and_removed_flights_are_ignored(self):
+        self.engine.update('A', position(40.0, -74.0, 0))
+        self.engine.update('B', position(40.0, -74.0, 0))
+        assert self.engine.get_alerts() == []
+
+        self.engine.update('A', position(40.0, -74.0))
+        self.engine.update('B', position(40.0, -74.0))
+        assert len(self.engine.get_alerts()) == 1
+        self.engine.remove('A')
+        assert self.engine.get_alerts() == []
+
+    def test_matches_pairwise_check(self):
+        rng = random.Random(7)
+        flights = {f'F{i}': position(rng.uniform(69.5, 70.5), rng.uniform(-1, 1), rng.choice([30000, 30500, 33000]))
+                   for i in range(150)}
+        for flight_id, p in flights.items():
+            self.engine.update(flight_id, p)
+        expected = {
+            (a, b) for a, b in combinations(sorted(flights), 2)
+            if calculate_distance(flights[a]['latitude'], flights[a]['longitude'],
+                                  flights[b]['latitude'], flights[b]['longitude']) <= 5 * 1.852
+            and abs(flights[a]['altitude'] - flights[b]['altitude']) < 1000
+        }
+        assert expected
+        assert {tuple(a['flight_ids']) for a in self.engine.get_alerts()} == expected
+
+class TestAlertsAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_alerts_endpoint(self):
+        for flight_id, longitude in (('PRX1', 120.0), ('PRX2', 120.01)):
+            self.client.post('/api/tracking/update', json={
+                'flight_id': flight_id, 'receiver_id': 'REC-001',
+                'position': position(-30.0, longitude), 'timestamp': '2024-01-15T10:30:00Z'
+            })
+        response = self.client.get('/api/alerts?flight_id=PRX1')
+        assert response.status_code == 200
+        assert response.json['alerts'][0]['flight_ids'] == ['PRX1', 'PRX2']
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from app import create_app
+from config import Config
+from models.memory_storage import MemoryStorage
+from models.storage import get_storage
+from services.receiver_service import ReceiverRollups, ReceiverService, receiver_rollups
+
+START = datetime(2024, 1, 15, 10, 0)
+
+def position(latitude: float = 40.5, longitude: float = -73.5) -> dict:
+    return {'latitude': latitude, 'longitude': longitude, 'altitude': 35000, 'heading': 90, 'speed': 450}
+
+class TestReceiverRollups:
+    def test_rollup_summary_and_detail(self):
+        storage = MemoryStorage()
+        service = ReceiverService(storage)
+        rollups = service.rollups
+        for minute in range(30):
+            rollups.record('REC-001', f'F{minute % 3}', position(), 0.25 if minute % 2 else 0.95,
+                           START + timedelta(minutes=minute))
+        rollups.record('REC-001', 'F9', position(41.5, -72.5), None, START + timedelta(minutes=30))
+        assert service.get_receivers() == []  # reads do not flush
+        rollups.flush()
+
+        receiver = service.get_receiver('REC-001')
+        assert receiver['messages'] == 31 and receiver['flights_heard'] == 4
+        assert receiver['last_seen'] == START + timedelta(minutes=30)
+        assert receiver['messages_per_minute'] == round(31 / 90, 2)
+        assert receiver['signal']['mean'] == 0.6 and receiver['signal']['p50'] == 0.3
+        assert [c['messages'] for c in receiver['coverage']] == [30, 1]
+        assert receiver['coverage'][0]['latitude'] == 40.0
+        assert receiver['hourly'] == [{'hour': START, 'messages': 31, 'flights': 4}]
+
+    def test_flushes_in_bulk_and_expires_old_hours(self, monkeypatch):
+        monkeypatch.setattr(Config, 'RECEIVER_RETAINED_HOURS', 2)
+        storage = MemoryStorage()
+        rollups = ReceiverRollups(storage)
+        for hour in range(4):
+            for receiver in ('A', 'B'):
+                rollups.record(receiver, 'F1', position(), 1.0, START + timedelta(hours=hour))
+            assert rollups.flush() == 2
+        assert sorted(storage.get_receiver('A')['hours']) == ['2024011512', '2024011513']
+        assert rollups.flush() == 0
+
+    def test_failed_flush_keeps_the_deltas(self, monkeypatch):
+        storage = MemoryStorage()
+        rollups = ReceiverRollups(storage)
+        rollups.record('A', 'F1', position(), 0.5, START)
+        write = storage.flush_receiver_stats
+        monkeypatch.setattr(storage, 'flush_receiver_stats', lambda deltas: 1 / 0)
+        assert rollups.flush() == 0 and rollups.flush_errors == 1
+        rollups.record('A', 'F2', position(), 0.5, START + timedelta(minutes=1))  # arrives meanwhile
+        monkeypatch.setattr(storage, 'flush_receiver_stats', write)
+        assert rollups.flush() == 1
+        document = storage.get_receiver('A')
+        assert document['messages'] == 2 and document['hours']['2024011510']['flights'] == ['F1', 'F2']
+
+    def test_timer_flushes_when_ingest_is_quiet(self, monkeypatch):
+        monkeypatch.setattr(Config, 'RECEIVER_FLUSH_INTERVAL', 0.01)
+        storage = MemoryStorage()
+        rollups = ReceiverRollups(storage)
+        rollups.record('A', 'F1', position(), 0.5, START)
+        timer = rollups._timer
+        timer.join(timeout=5)
+        assert not timer.is_alive() and storage.get_receiver('A')['messages'] == 1
+
+class TestReceiversAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_receivers_endpoints(self):
+        for receiver in ('RX-API-1', 'RX-API-2'):
+            self.client.post('/api/tracking/update', json={
+                'flight_id': 'RXF1', 'receiver_id': receiver, 'signal_strength': 0.8,
+                'position': position(), 'timestamp': '2024-01-15T10:30:00Z'
+            })
+        receiver_rollups(get_storage()).flush()  # the flush timer would within RECEIVER_FLUSH_INTERVAL
+        listed = {r['receiver_id'] for r in self.client.get('/api/receivers').json['receivers']}
+        assert {'RX-API-1', 'RX-API-2'} <= listed
+
+        response = self.client.get('/api/receivers/RX-API-1')
+        assert response.status_code == 200 and response.json['flights_heard'] == 1
+        assert self.client.get('/api/receivers/NOPE').status_code == 404
@@ -0,0 +1,102 @@
+from datetime import datetime
+from app import create_app
+from config import Config
+from models.memory_storage import MemoryStorage
+from services.search_service import PrefixIndex, SearchIndex
+
+def flight(flight_id: str, airline: str, origin: str, destination: str, registration: str = None) -> dict:
+    return {'status': 'active', 'flight_number': flight_id[:2] + '-' + flight_id[2:], 'airline': airline,
+            'origin': {'code': origin}, 'destination': {'code': destination},
+            'aircraft': {'registration': registration}}
+
+class TestPrefixIndex:
+    def test_scan_add_and_remove(self):
+        index = PrefixIndex()
+        index.add('a', {'PK303', 'KHI'})
+        index.add('b', {'PK304', 'LHE'})
+        index.add('c', {'PKA', 'KHI'})
+        assert [k for _, k in index.scan('PK30', 10)] == ['a', 'b']
+        assert [k for _, k in index.scan('KH', 10)] == ['a', 'c']
+        index.add('a', {'EK600'})  # re-adding replaces the terms
+        assert [k for _, k in index.scan('PK', 10)] == ['b', 'c']
+        index.remove('b')
+        assert [k for _, k in index.scan('PK', 10)] == ['c'] and len(index) == 3
+
+class TestSearchIndex:
+    def setup_method(self):
+        self.storage = MemoryStorage()
+        self.storage.upsert_flight('PK303', flight('PK303', 'Pakistan International', 'KHI', 'LHE', 'AP-BHV'))
+        self.storage.upsert_flight('PK3', flight('PK3', 'Pakistan International', 'LHE', 'KHI'))
+        self.storage.upsert_flight('EK600', flight('EK600', 'Emirates', 'DXB', 'KHI'))
+        self.storage.archive_flight({**flight('PK301', 'Pakistan International', 'KHI', 'ISB'),
+                                     'flight_id': 'PK301', 'completed_at': datetime(2024, 1, 15)})
+        self.index = SearchIndex(self.storage)
+
+    def ids(self, query: str, **filters) -> list:
+        return [f['flight_id'] for f in self.index.search(query, **filters)['results']]
+
+    def test_prefix_matching_and_ranking(self):
+        assert self.ids('pk3') == ['PK3', 'PK303', 'PK301']  # exact first, then active before completed
+        assert self.ids('PK-30') == ['PK303', 'PK301']
+        assert self.ids('APBH') == ['PK303']
+        assert self.ids('intern') == ['PK3', 'PK303', 'PK301']
+        assert self.ids('khi lhe') == ['PK3', 'PK303']
+        assert self.ids('khi', status='completed') == ['PK301']
+        assert self.ids('pk', destination='KHI') == ['PK3']
+        assert self.ids('zz') == [] and self.ids('  ') == []
+
+    def test_kept_current_by_ingest_and_completion(self, monkeypatch):
+        monkeypatch.setattr(Config, 'SEARCH_RECENT_LOGS', 1)
+        assert self.ids('EK') == ['EK600']
+        self.storage.upsert_flight('EK601', flight('EK601', 'Emirates', 'DXB', 'LHE'))
+        self.index.observe('EK601')
+        assert self.ids('EK') == ['EK600', 'EK601']
+
+        self.index.complete('EK600', {**flight('EK600', 'Emirates', 'DXB', 'KHI'), 'flight_id': 'EK600'})
+        assert self.index.search('EK600')['results'][0]['status'] == 'completed'
+        assert self.ids('PK301') == []  # pushed out of the recent completed flights
+
+    def test_filtered_scan_past_the_cap_is_truncated(self, monkeypatch):
+        monkeypatch.setattr(Config, 'SEARCH_SCAN_LIMIT', 4)
+        for i in range(5):
+            self.storage.upsert_flight(f'PK9{i}', flight(f'PK9{i}', 'Pakistan International', 'KHI', 'LHE'))
+        found = self.index.search('pk', destination='DXB')
+        assert found == {'results': [], 'truncated': True}  # the cap was reached before any match
+        assert self.index.search('pk', limit=2)['truncated'] is True  # matches are ranked within the cap
+        assert self.index.search('ek')['truncated'] is False
+
+    def test_ranked_before_the_limit(self):
+        assert self.ids('pk30', limit=1) == ['PK303']  # the active flight, though PK301 sorts first
+        assert self.ids('khi', limit=1) == ['EK600']
+
+    def test_synced_with_changes_made_elsewhere(self, monkeypatch):
+        monkeypatch.setattr(Config, 'SEARCH_SYNC_INTERVAL', 0)
+        assert self.ids('EK') == ['EK600']
+        # another process activates EK601 and completes EK600
+        self.storage.upsert_flight('EK601', flight('EK601', 'Emirates', 'DXB', 'LHE'))
+        self.storage.archive_flight({**flight('EK600', 'Emirates', 'DXB', 'KHI'), 'flight_id': 'EK600',
+                                     'completed_at': datetime(2024, 1, 16)})
+        assert self.ids('EK', status='completed') == ['EK600']
+        assert self.ids('EK', status='active') == ['EK601']
+
+class TestSearchAPI:
+    def setup_method(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_search_endpoint(self):
+        self.client.post('/api/tracking/update', json={
+            'flight_id': 'SRCH01', 'receiver_id': 'REC-001', 'timestamp': '2024-01-15T10:30:00Z',
+            'position': {'latitude': 30.0, 'longitude': 70.0, 'altitude': 35000, 'heading': 90, 'speed': 450}
+        })
+        self.client.get('/api/search?q=x')  # loads the index
+        self.client.post('/api/tracking/update', json={
+            'flight_id': 'SRCH02', 'receiver_id': 'REC-001', 'timestamp': '2024-01-15T10:30:00Z',
+            'position': {'latitude': 30.0, 'longitude': 70.0, 'altitude': 35000, 'heading': 90, 'speed': 450}
+        })
+        response = self.client.get('/api/search?q=srch&limit=5')
+        assert response.status_code == 200
+        assert [r['flight_id'] for r in response.json['results']] == ['SRCH01', 'SRCH02']
+        assert response.json['truncated'] is False
+        assert self.client.get('/api/search').status_code == 400
+        assert self.client.get('/api/search?q=a&limit=1000').status_code == 400
@@ -0,0 +1,202 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from config import Config
+from models.memory_storage import MemoryStorage
+
+TEST_DATABASE = 'flight_tracking_test'
+START = datetime(2024, 1, 15, 10, 0)
+
+def mongo_storage():
+    try:
+        MongoClient(Config.MONGODB_URI, serverSelectionTimeoutMS=300).admin.command('ping')
+    except PyMongoError:
+        pytest.skip('MongoDB is not reachable')
+    from models.database import Database, MongoStorage
+    database = Database(database_name=TEST_DATABASE)
+    database.client.drop_database(TEST_DATABASE)
+    return MongoStorage(Database(database_name=TEST_DATABASE))
+
+@pytest.fixture(params=['memory', 'mongo'])
+def storage(request):
+    if request.param == 'memory':
+        return MemoryStorage()
+    return mongo_storage()
+
+def update(flight_id: str, minutes: int, latitude: float = 40.0) -> dict:
+    return {
+        'flight_id': flight_id,
+        'position': {'latitude': latitude, 'longitude': -74.0, 'altitude': 35000, 'heading': 90, 'speed': 450},
+        'timestamp': START + timedelta(minutes=minutes),
+        'receiver': {'id': 'REC-001', 'signal_strength': 1.0},
+        'created_at': START
+    }
+
+class TestStorageConformance:
+    def test_upsert_and_find_flights(self, storage):
+        storage.upsert_flight('TEST123', {'status': 'active', 'airline': 'PIA'})
+        storage.upsert_flight('TEST123', {'status': 'delayed'})
+        storage.upsert_flight('TEST456', {'status': 'active'})
+
+        flight = storage.get_flight('TEST123')
+        assert flight['airline'] == 'PIA' and flight['status'] == 'delayed'
+        assert [f['flight_id'] for f in storage.find_flights('active')] == ['TEST456']
+        assert len(storage.find_flights()) == 2
+        assert storage.get_flight('NOPE') is None
+
+    def test_find_flights_filters(self, storage):
+        storage.upsert_flight('A', {'status': 'active', 'airline': 'PIA', 'origin': {'code': 'KHI'}, 'destination': {'code': 'LHE'}})
+        storage.upsert_flight('B', {'status': 'active', 'airline': 'EK', 'origin': {'code': 'KHI'}, 'destination': {'code': 'DXB'}})
+        storage.upsert_flight('C', {'status': 'delayed', 'airline': 'PIA', 'origin': {'code': 'LHE'}, 'destination': {'code': 'KHI'}})
+
+        def ids(**filters):
+            return sorted(f['flight_id'] for f in storage.find_flights(**filters))
+        assert ids(airline='PIA') == ['A', 'C']
+        assert ids(status='active', airline='PIA') == ['A']
+        assert ids(origin='KHI') == ['A', 'B']
+        assert ids(origin='KHI', destination='DXB') == ['B']
+
+    def test_current_position_only_moves_forward(self, storage):
+        storage.update_current_position('TEST123', {'latitude': 41.0}, START + timedelta(minutes=5), {'status': 'active'})
+        storage.update_current_position('TEST123', {'latitude': 40.0}, START, {'status': 'delayed'})
+        flight = storage.get_flight('TEST123')
+        assert flight['current_position'] == {'latitude': 41.0}
+        assert flight['position_timestamp'] == START + timedelta(minutes=5)
+        assert flight['status'] == 'delayed'
+
+        storage.update_current_position('TEST123', {'latitude': 42.0}, START + timedelta(minutes=6))
+        assert storage.get_flight('TEST123')['current_position'] == {'latitude': 42.0}
+
+    def test_latest_and_lte_lookup(self, storage):
+        for minutes in (0, 10, 5, 20):  # one out of order
+            storage.insert_position(update('TEST123', minutes, latitude=40 + minutes))
+
+        assert storage.latest_position('TEST123')['position']['latitude'] == 60
+        assert storage.latest_position('TEST123', START + timedelta(minutes=7))['position']['latitude'] == 45
+        assert storage.latest_position('TEST123', START + timedelta(minutes=10))['position']['latitude'] == 50
+        assert storage.latest_position('TEST123', START - timedelta(minutes=1)) is None
+        assert storage.latest_position('NOPE') is None
+
+    def test_aware_timestamps_match_naive_utc(self, storage):
+        storage.insert_position(update('TEST123', 0))
+        at = datetime(2024, 1, 15, 12, 0, tzinfo=timezone(timedelta(hours=2)))  # 10:00 UTC
+        assert storage.latest_position('TEST123', at) is not None
+
+    def test_recent_and_range(self, storage):
+        for minutes in range(6):
+            storage.insert_position(update('TEST123', minutes))
+        storage.insert_position(update('OTHER', 3))
+
+        recent = storage.recent_positions('TEST123', 3)
+        assert [p['timestamp'] for p in recent] == [START + timedelta(minutes=m) for m in (3, 4, 5)]
+
+        window = storage.position_range('TEST123', START + timedelta(minutes=1), START + timedelta(minutes=3))
+        assert [p['timestamp'] for p in window] == [START + timedelta(minutes=m) for m in (1, 2, 3)]
+        assert len(storage.position_range('TEST123')) == 6
+
+    def test_archive_removes_active_data(self, storage):
+        storage.upsert_flight('TEST123', {'status': 'active'})
+        storage.insert_position(update('TEST123', 0))
+        storage.archive_flight({'flight_id': 'TEST123', 'tracking_path': [], 'completed_at': START})
+
+        assert storage.get_flight('TEST123') is None
+        assert storage.position_range('TEST123') == []
+        assert storage.get_flight_log('TEST123')['completed_at'] == START
+        assert [log['flight_id'] for log in storage.iter_flight_logs()] == ['TEST123']
+
+    def test_flight_log_slicing(self, storage):
+        path = [{'latitude': float(m), 'longitude': 0.0, 'timestamp': START + timedelta(minutes=m)}
+                for m in range(10)]
+        storage.archive_flight({'flight_id': 'TEST123', 'tracking_path': path, 'completed_at': START})
+
+        def minutes(log):
+            return [int(p['latitude']) for p in log['tracking_path']]
+
+        assert minutes(storage.get_flight_log('TEST123')) == list(range(10))
+        window = storage.get_flight_log('TEST123', START + timedelta(minutes=2), START + timedelta(minutes=7))
+        assert minutes(window) == [2, 3, 4, 5, 6, 7]
+        assert window['tracking_path_count'] == 6
+        sampled = storage.get_flight_log('TEST123', start=START + timedelta(minutes=1), every=3)
+        assert minutes(sampled) == [1, 4, 7]
+        page = storage.get_flight_log('TEST123', every=2, offset=1, limit=2)
+        assert minutes(page) == [2, 4] and page['tracking_path_count'] == 5
+        assert minutes(storage.get_flight_log('TEST123', offset=8)) == [8, 9]
+        assert storage.get_flight_log('TEST123', START + timedelta(hours=1))['tracking_path'] == []
+
+    def test_recent_flight_logs(self, storage):
+        for minutes, flight_id in ((0, 'OLD'), (10, 'NEW'), (5, 'MID')):
+            storage.archive_flight({'flight_id': flight_id, 'tracking_path': [{'latitude': 1.0}],
+                                    'completed_at': START + timedelta(minutes=minutes)})
+        logs = storage.find_recent_flight_logs(2)
+        assert [log['flight_id'] for log in logs] == ['NEW', 'MID']
+        assert 'tracking_path' not in logs[0]
+
+    def test_archive_generation(self, storage):
+        generation = storage.archive_generation()
+        assert storage.bump_archive_generation() == generation + 1
+        assert storage.archive_generation() == generation + 1
+        generation = storage.geofence_generation()
+        assert storage.bump_geofence_generation() == generation + 1
+        assert storage.geofence_generation() == generation + 1
+
+    def test_receiver_stats_merge(self, storage):
+        def delta(minutes: int, flights: list, expire: list = ()) -> dict:
+            return {
+                'receiver_id': 'REC-001', 'first_seen': START + timedelta(minutes=minutes),
+                'last_seen': START + timedelta(minutes=minutes + 1), 'messages': 2,
+                'signal': {'count': 2, 'sum': 1.5, 'sum_sq': 1.25, 'min': 0.5, 'max': 1.0, 'histogram': {'5': 1, '9': 1}},
+                'coverage': {'40:-74': 2}, 'hours': {'2024011510': {'messages': 2, 'flights': flights}},
+                'expire_hours': list(expire)
+            }
+        storage.flush_receiver_stats([delta(5, ['A', 'B'])])
+        storage.flush_receiver_stats([delta(0, ['B', 'C'], expire=['2024011409'])])
+
+        receiver = storage.get_receiver('REC-001')
+        assert receiver['messages'] == 4 and receiver['first_seen'] == START
+        assert receiver['last_seen'] == START + timedelta(minutes=6)
+        assert receiver['signal']['count'] == 4 and receiver['signal']['histogram'] == {'5': 2, '9': 2}
+        assert receiver['coverage'] == {'40:-74': 4}
+        assert sorted(receiver['hours']['2024011510']['flights']) == ['A', 'B', 'C']
+        assert [r['receiver_id'] for r in storage.find_receivers()] == ['REC-001']
+        assert storage.get_receiver('NOPE') is None
+
+    def test_delete_flight(self, storage):
+        storage.upsert_flight('TEST123', {'status': 'active'})
+        storage.insert_position(update('TEST123', 0))
+        storage.delete_flight('TEST123')
+        assert storage.get_flight('TEST123') is None
+        assert storage.latest_position('TEST123') is None
+        assert storage.get_flight_log('TEST123') is None
+
+    def test_rollups(self, storage):
+        key = {'origin': 'KHI', 'destination': 'LHE'}
+        storage.increment_rollup('route', key, {'flights': 1, 'delay_total': 5.0}, START)
+        storage.increment_rollup('route', key, {'flights': 1, 'delay_total': 10.0}, START)
+        storage.increment_rollup('route', {'origin': 'KHI', 'destination': 'ISB'}, {'flights': 1}, START)
+
+        rollups = storage.find_rollups('route', {'destination': 'LHE'})
+        assert len(rollups) == 1
+        assert rollups[0]['flights'] == 2 and rollups[0]['delay_total'] == 15.0
+
+        for hours in (0, 1, 2):
+            storage.increment_rollup('hourly', {'hour': START + timedelta(hours=hours)}, {'flights': 1}, START)
+        hourly = storage.find_hourly_rollups(START + timedelta(hours=1), START + timedelta(hours=5))
+        assert [r['hour'] for r in hourly] == [START + timedelta(hours=1), START + timedelta(hours=2)]
+
+        storage.replace_rollups('route', [{'origin': 'ISB', 'destination': 'KHI', 'flights': 3}])
+        assert [r['flights'] for r in storage.find_rollups('route')] == [3]
+
+    def test_geofences_and_events(self, storage):
+        storage.upsert_geofence({'fence_id': 'airport:LHE', 'type': 'circle', 'radius_km': 8})
+        storage.upsert_geofence({'fence_id': 'airport:LHE', 'type': 'circle', 'radius_km': 10})
+        assert [f['radius_km'] for f in storage.find_geofences()] == [10]
+        assert storage.delete_geofence('airport:LHE') and not storage.delete_geofence('airport:LHE')
+
+        for minutes, event in ((0, 'enter'), (5, 'exit')):
+            storage.insert_geofence_event({'flight_id': 'TEST123', 'fence_id': 'airport:LHE',
+                                           'event': event, 'timestamp': START + timedelta(minutes=minutes)})
+        events = storage.find_geofence_events(flight_id='TEST123')
+        assert [e['event'] for e in events] == ['exit', 'enter']
+        assert [e['event'] for e in storage.find_geofence_events(end=START + timedelta(minutes=1))] == ['enter']
+        assert storage.find_geofence_events(fence_id='other') == []
@@ -1,6 +1,9 @@
 import pytest
 from app import create_app
-from models.database import db
+from config import Config
+from models.memory_storage import MemoryStorage
+from models.storage import get_storage
+from services.tracking_service import TrackingService
 
 class TestTrackingAPI:
     def setup_method(self):
@@ -24,4 +27,23 @@ class TestTrackingAPI:
         
         response = self.client.post('/api/tracking/update', json=data)
         assert response.status_code == 200
-        assert response.json['status'] == 'success'
\ No newline at end of file
+        assert response.json['status'] == 'success'
+    
+    def test_null_signal_strength_uses_the_default(self):
+        response = self.client.post('/api/tracking/update', json={
+            "flight_id": "TEST124", "receiver_id": "REC-001", "signal_strength": None,
+            "position": {"latitude": 40.7128, "longitude": -74.0060, "altitude": 35000, "heading": 85.5, "speed": 450},
+            "timestamp": "2024-01-15T10:30:00Z"
+        })
+        assert response.status_code == 200
+        assert get_storage().latest_position('TEST124')['receiver']['signal_strength'] == 1.0
+
+    def test_newest_update_times_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(Config, 'TRACKING_LATEST_RETAINED', 2)
+        service = TrackingService(MemoryStorage())
+        for second, flight_id in enumerate(('TEST1', 'TEST2', 'TEST1', 'TEST3')):
+            service.process_tracking_update({
+                "flight_id": flight_id, "receiver_id": "REC-001", "timestamp": f"2024-01-15T10:30:0{second}Z",
+                "position": {"latitude": 40.7128, "longitude": -74.0060, "altitude": 35000, "heading": 85.5, "speed": 450}
+            })
+        assert list(service._latest) == ['TEST1', 'TEST3']
@@ -1,9 +1,19 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 def parse_iso_timestamp(timestamp_str: str) -> datetime:
     """Parse ISO timestamp string to datetime object"""
     return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
 
+def to_utc_naive(value) -> datetime:
+    """Normalise a datetime or ISO string to a naive UTC datetime (the form Mongo returns)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = parse_iso_timestamp(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates in kilometers"""
     # Simplified calculation - in production use geopy or similar
@@ -17,4 +27,12 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     
-    return R * c
\ No newline at end of file
+    return R * c
+
+def path_distance(points: list) -> float:
+    """Total distance in kilometers along a list of {'latitude', 'longitude'} points"""
+    total = 0.0
+    for prev, point in zip(points, points[1:]):
+        total += calculate_distance(prev['latitude'], prev['longitude'],
+                                    point['latitude'], point['longitude'])
+    return total
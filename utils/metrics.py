@@ -0,0 +1,313 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pymongo import monitoring
+from utils.profiling import record_phase
+#Lightweight Prometheus-style metrics (counters, gauges, histograms) rendered by GET /metrics.
+#Recording is a dict lookup plus a few additions under a lock, so it is cheap enough to leave on.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        """Child metric for one combination of label values"""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name, labelnames, values):
+        return [f'{name}{_format_labels(labelnames, values)} {_format_value(self.value)}']
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default.dec(amount)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+class _HistogramValue:
+    def __init__(self, buckets: tuple):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f'{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}')
+        labels = _format_labels(labelnames, values)
+        lines.append(f'{name}_sum{labels} {_format_value(self.sum)}')
+        lines.append(f'{name}_count{labels} {cumulative}')
+        return lines
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Global registry and the metrics the app records
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+HTTP_REQUESTS = metrics.counter(
+    'http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status'))
+HTTP_IN_FLIGHT = metrics.gauge(
+    'http_requests_in_flight', 'HTTP requests currently being served', ('method', 'route'))
+MONGO_COMMAND_DURATION = metrics.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency by collection and operation',
+    ('collection', 'command'))
+MONGO_COMMAND_FAILURES = metrics.counter(
+    'mongodb_command_failures_total', 'Failed MongoDB commands by collection and operation',
+    ('collection', 'command'))
+MONGO_POOL_WAIT = metrics.histogram(
+    'mongodb_pool_wait_seconds', 'Time spent waiting to check a connection out of the pool')
+MONGO_POOL_CHECKED_OUT = metrics.gauge(
+    'mongodb_pool_checked_out_connections', 'Connections currently checked out of the pool')
+TRACKING_UPDATES = metrics.counter(
+    'tracking_updates_ingested_total', 'Tracking updates accepted by the ingest path')
+INGEST_BACKLOG = metrics.gauge(
+    'ingest_worker_backlog', 'Updates queued for the ingestion workers but not applied yet')
+INGEST_REJECTED = metrics.counter(
+    'ingest_rejected_total', 'Updates refused because an ingestion worker queue was full')
+INGEST_WORKER_ERRORS = metrics.counter(
+    'ingest_worker_errors_total', 'Updates that failed in an ingestion worker')
+INGEST_WORKER_RESTARTS = metrics.counter(
+    'ingest_worker_restarts_total', 'Ingestion workers replaced after they died')
+PROXIMITY_EVALUATION = metrics.histogram(
+    'proximity_evaluation_seconds', 'Time to re-evaluate the dirty proximity grid cells per tick')
+PROXIMITY_ACTIVE_ALERTS = metrics.gauge(
+    'proximity_active_alerts', 'Aircraft pairs currently closer than the separation thresholds')
+GEOFENCE_EVENTS = metrics.counter(
+    'geofence_events_total', 'Geofence entries, exits and automatic arrivals', ('event',))
+LIVE_SUBSCRIBERS = metrics.gauge(
+    'live_feed_subscribers', 'Clients connected to the /api/live event stream')
+LIVE_EVENTS_DROPPED = metrics.counter(
+    'live_feed_events_dropped_total', 'Live feed events dropped for subscribers that fell behind')
+RECEIVER_FLUSH = metrics.histogram(
+    'receiver_rollup_flush_seconds', 'Time to bulk-write the pending receiver rollups')
+RECEIVER_FLUSH_ERRORS = metrics.counter(
+    'receiver_rollup_flush_errors_total', 'Receiver rollup bulk writes that failed (their deltas are retried)')
+FLIGHT_LOG_CACHE_REQUESTS = metrics.counter(
+    'flight_log_cache_requests_total', 'Flight log lookups by result (hit, miss, coalesced)', ('result',))
+FLIGHT_LOG_CACHE_EVICTIONS = metrics.counter(
+    'flight_log_cache_evictions_total', 'Flight logs evicted to stay within FLIGHT_LOG_CACHE_BYTES')
+FLIGHT_LOG_CACHE_BYTES = metrics.gauge(
+    'flight_log_cache_bytes', 'Estimated size of the cached flight logs and response bodies')
+LIVE_STATE_RETRIES = metrics.counter(
+    'live_state_read_retries_total', 'Live-state record reads retried because a writer was changing the record')
+LIVE_STATE_REJECTED = metrics.counter(
+    'live_state_rejected_total', 'Flights left out of the live-state table (table full or flight_id too long)')
+EXTRAPOLATION_DRIFT = metrics.histogram(
+    'extrapolation_drift_nm', 'Distance between a dead-reckoned position and the next actual report, by horizon',
+    ('horizon',), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+RENDER_DURATION = metrics.histogram(
+    'visualization_render_seconds', 'Map and chart render time by kind', ('kind',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Times every MongoDB command by collection and operation"""
+
+    def __init__(self):
+        self._collections = {}  # (request_id, connection_id) -> collection name
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get('collection', '')  # getMore carries the cursor id
+        self._collections[(event.request_id, event.connection_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), '')
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        record_phase('mongo', event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), '')
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+        record_phase('mongo', event.duration_micros / 1e6)
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Measures connection checkout wait (checkout happens on the requesting thread)"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            MONGO_POOL_WAIT.observe(time.perf_counter() - started)
+            self._local.started = None
+        MONGO_POOL_CHECKED_OUT.inc()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+
+def mongo_listeners() -> list:
+    """Event listeners to pass to MongoClient(event_listeners=...)"""
+    return [CommandMetricsListener(), PoolMetricsListener()]
+
+def init_app(app):
+    """Record latency, status and in-flight counts for every request"""
+    from flask import g, request
+
+    def _labels():
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        return request.method, rule
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.labels(*_labels()).inc()
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        labels = _labels()
+        HTTP_IN_FLIGHT.labels(*labels).dec()
+        HTTP_REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started)
+        status = 500 if exc is not None else g.pop('metrics_status', 200)
+        HTTP_REQUESTS.labels(*labels, status).inc()
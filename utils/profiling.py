@@ -0,0 +1,219 @@
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+#On-demand request profiling. A request is profiled when PROFILING_ENABLED samples it or when it
+#carries a valid X-Profile-Signature header. Each profile is saved as a .pstats (cProfile) or
+#.folded (sampling, flamegraph.pl / speedscope format) file plus a .json summary with the time
+#spent per phase (validation, mongo, serialization, rendering).
+
+SIGNATURE_HEADER = 'X-Profile-Signature'
+ADMIN_SIGNATURE_HEADER = 'X-Admin-Signature'  # admin endpoints (routes/cache_routes.py), never profiled
+
+_local = threading.local()
+# cProfile allows one active profiler per process (Python 3.12+ raises on a second one)
+_cprofile_lock = threading.Lock()
+
+def sign_request(method: str, path: str, timestamp: int = None, scope: str = 'profile') -> str:
+    """`timestamp:signature` that forces profiling of `METHOD /path?query` (scope 'profile') or
+    authorizes an admin call (scope 'admin') for PROFILING_SIGNATURE_MAX_AGE seconds
+    (HMAC-SHA256 with SECRET_KEY)"""
+    timestamp = int(time.time()) if timestamp is None else int(timestamp)
+    message = f'{scope} {timestamp} {method.upper()} {path}'.encode()
+    return f'{timestamp}:' + hmac.new(Config.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+def verify_signature(method: str, path: str, signature: str, scope: str = 'profile') -> bool:
+    timestamp, _, digest = (signature or '').partition(':')
+    if not digest or not timestamp.isdigit():
+        return False
+    if abs(time.time() - int(timestamp)) > Config.PROFILING_SIGNATURE_MAX_AGE:
+        return False
+    return hmac.compare_digest(sign_request(method, path, int(timestamp), scope), signature)
+
+def signed_path(request) -> str:
+    """The path and query string a signature covers"""
+    return request.full_path.rstrip('?')
+
+def record_phase(name: str, seconds: float):
+    """Add time to a phase of the profile running on this thread (no-op otherwise)"""
+    phases = getattr(_local, 'phases', None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+@contextmanager
+def phase(name: str):
+    """Time a block as one phase of the current request's profile"""
+    if getattr(_local, 'phases', None) is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, one `frame;frame;frame count` line per distinct stack"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+class RequestProfile:
+    def __init__(self, mode: str):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.phases = {}
+        self._profiler = None
+
+    def start(self) -> bool:
+        """Start profiling this thread; False if another request holds the cProfile profiler"""
+        if self.mode != 'sampling' and not _cprofile_lock.acquire(blocking=False):
+            return False
+        _local.phases = self.phases
+        self.started = time.perf_counter()
+        if self.mode == 'sampling':
+            self._profiler = SamplingProfiler(threading.get_ident(), Config.PROFILING_SAMPLE_INTERVAL)
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return True
+
+    def stop(self):
+        if self.mode == 'sampling':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+            _cprofile_lock.release()
+        self.total = time.perf_counter() - self.started
+        _local.phases = None
+
+    def save(self, directory: str, details: dict) -> dict:
+        """Write the profile and its summary, returning the summary"""
+        os.makedirs(directory, exist_ok=True)
+        if self.mode == 'sampling':
+            profile_file = f'{self.id}.folded'
+            with open(os.path.join(directory, profile_file), 'w') as f:
+                f.write(self._profiler.folded())
+        else:
+            profile_file = f'{self.id}.pstats'
+            self._profiler.dump_stats(os.path.join(directory, profile_file))
+
+        summary = {
+            'id': self.id,
+            'mode': self.mode,
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'total_ms': round(self.total * 1000, 3),
+            # Phases can nest (e.g. mongo time inside rendering), so they need not sum to total
+            'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            'file': profile_file,
+            **details
+        }
+        with open(os.path.join(directory, f'{self.id}.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+def list_profiles(directory: str = None) -> list:
+    """Summaries of retained profiles, newest first"""
+    directory = directory or Config.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                summaries.append(json.load(f))
+    return summaries
+
+def prune_profiles(directory: str, keep: int):
+    """Delete all but the newest `keep` profiles (ids sort by creation time)"""
+    ids = sorted({name.rsplit('.', 1)[0] for name in os.listdir(directory)}, reverse=True)
+    for profile_id in ids[keep:]:
+        for extension in ('json', 'pstats', 'folded'):
+            path = os.path.join(directory, f'{profile_id}.{extension}')
+            if os.path.exists(path):
+                os.remove(path)
+
+def should_profile(method: str, path: str, endpoint: str, signature: str) -> bool:
+    if verify_signature(method, path, signature):
+        return True
+    if not Config.PROFILING_ENABLED:
+        return False
+    if Config.PROFILING_ENDPOINTS and endpoint not in Config.PROFILING_ENDPOINTS:
+        return False
+    return random.random() < Config.PROFILING_SAMPLE_RATE
+
+def init_app(app):
+    """Profile selected requests and save the results to PROFILING_DIR"""
+    from flask import g, jsonify, request
+
+    @app.before_request
+    def _start_profile():
+        if request.blueprint in ('profiling', 'cache'):  # admin endpoints
+            return
+        signature = request.headers.get(SIGNATURE_HEADER)
+        if should_profile(request.method, signed_path(request), request.endpoint, signature):
+            profile = RequestProfile(Config.PROFILING_MODE)
+            if profile.start():
+                g.profile = profile
+            elif verify_signature(request.method, signed_path(request), signature):
+                # A sampled request just goes unprofiled; an explicitly signed one is told to retry
+                return jsonify({'error': 'Another request is being profiled, retry later'}), 409
+
+    @app.after_request
+    def _save_profile(response):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.stop()
+            summary = profile.save(Config.PROFILING_DIR, {
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'status': response.status_code
+            })
+            prune_profiles(Config.PROFILING_DIR, Config.PROFILING_MAX_RETAINED)
+            response.headers['X-Profile-Id'] = summary['id']
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # Only reached with a profile still running if the request blew up before after_request
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.stop()
@@ -21,6 +21,34 @@ def validate_tracking_data(data: dict) -> str:
     
     return None
 
+def validate_geofence_data(data: dict) -> str:
+    """Validate a geofence: a circle (center [lon, lat] + radius_km) or a polygon ([[lon, lat], ...])"""
+    if not isinstance(data, dict):
+        return 'Request body must be a JSON object'
+    
+    def valid_point(point) -> bool:
+        return (isinstance(point, (list, tuple)) and len(point) == 2
+                and all(isinstance(v, (int, float)) for v in point)
+                and -180 <= point[0] <= 180 and -90 <= point[1] <= 90)
+    
+    fence_type = data.get('type')
+    if fence_type == 'circle':
+        if not valid_point(data.get('center')):
+            return 'center must be [longitude, latitude]'
+        radius = data.get('radius_km')
+        if not isinstance(radius, (int, float)) or radius <= 0:
+            return 'radius_km must be a positive number'
+    elif fence_type == 'polygon':
+        polygon = data.get('polygon')
+        if not isinstance(polygon, list) or len(polygon) < 3:
+            return 'polygon must have at least 3 points'
+        if not all(valid_point(point) for point in polygon):
+            return 'polygon points must be [longitude, latitude]'
+    else:
+        return "type must be 'circle' or 'polygon'"
+    
+    return None
+
 def validate_flight_id(flight_id: str) -> bool:
     """Validate flight ID format"""
     if not flight_id or len(flight_id) < 3: